@@ -0,0 +1,131 @@
+import os
+import tempfile
+from contextlib import contextmanager
+from typing import Any, Callable, Iterator, NamedTuple, Optional
+
+import mongoengine
+from mongomock import MongoClient
+from pydantic import BaseModel
+from sqlalchemy import Column, Integer, String, create_engine
+from sqlalchemy.orm import Session
+
+from easyrepo.model.mongo import Document
+from easyrepo.model.sql import Entity
+from easyrepo.repository.index import SortedIndex
+from easyrepo.repository.memory import MemoryRepository
+from easyrepo.repository.mongo import MongoRepository
+from easyrepo.repository.mongoengine import MongoEngineRepository
+from easyrepo.repository.sql import SqlRepository
+
+
+class MemoryModel(BaseModel):
+    id: Optional[int]
+    value: str
+    rank: int
+
+
+class SqlModel(Entity):
+    id = Column(Integer, primary_key=True)
+    value: str = Column(String, nullable=False)
+    rank: int = Column(Integer, nullable=False)
+
+
+class MongoModel(Document):
+    value: str
+    rank: int
+
+
+class MongoEngineModel(mongoengine.Document):
+    value = mongoengine.StringField(required=True)
+    rank = mongoengine.IntField(required=True)
+
+
+class MemoryRepo(MemoryRepository[MemoryModel]):
+    pass
+
+
+class SqlRepo(SqlRepository[SqlModel]):
+    pass
+
+
+class MongoRepo(MongoRepository[MongoModel]):
+    pass
+
+
+class MongoEngineRepo(MongoEngineRepository[MongoEngineModel]):
+    pass
+
+
+class Backend(NamedTuple):
+    """
+    Repository under benchmark.
+
+    new: creates an unsaved entity from its number.
+    clear: forgets the entities loaded by the repository client, so that reads hit the database.
+    thread_safe: whether the repository can be called by concurrent threads.
+    """
+    repository: Any
+    new: Callable[[int], Any]
+    clear: Callable[[], None] = lambda: None
+    thread_safe: bool = False
+
+
+@contextmanager
+def memory() -> Iterator[Backend]:
+    yield Backend(MemoryRepo(indexes=[SortedIndex("rank")]), lambda i: MemoryModel(value=f"value {i}", rank=i))
+
+
+@contextmanager
+def memory_concurrent() -> Iterator[Backend]:
+    repository = MemoryRepo(indexes=[SortedIndex("rank")], concurrent=True)
+    yield Backend(repository, lambda i: MemoryModel(value=f"value {i}", rank=i), thread_safe=True)
+
+
+@contextmanager
+def sqlite_memory() -> Iterator[Backend]:
+    with _sqlite("sqlite:///:memory:") as backend:
+        yield backend
+
+
+@contextmanager
+def sqlite_file() -> Iterator[Backend]:
+    with tempfile.TemporaryDirectory() as directory:
+        with _sqlite(f"sqlite:///{os.path.join(directory, 'benchmark.db')}") as backend:
+            yield backend
+
+
+@contextmanager
+def _sqlite(url: str) -> Iterator[Backend]:
+    engine = create_engine(url)
+    Entity.metadata.create_all(engine)
+    session = Session(bind=engine)
+    try:
+        yield Backend(SqlRepo(session), lambda i: SqlModel(value=f"value {i}", rank=i), session.expunge_all)
+    finally:
+        session.close()
+        engine.dispose()
+
+
+@contextmanager
+def mongo() -> Iterator[Backend]:
+    collection = MongoClient().benchmark.models
+    yield Backend(MongoRepo(collection), lambda i: MongoModel(value=f"value {i}", rank=i))
+
+
+@contextmanager
+def mongoengine_mongomock() -> Iterator[Backend]:
+    mongoengine.connect("benchmark", host="mongomock://localhost")
+    try:
+        yield Backend(MongoEngineRepo(), lambda i: MongoEngineModel(value=f"value {i}", rank=i))
+    finally:
+        mongoengine.disconnect()
+
+
+BACKENDS = {
+    "memory": memory,
+    "memory-concurrent": memory_concurrent,
+    "sqlite-memory": sqlite_memory,
+    "sqlite-file": sqlite_file,
+    "mongo": mongo,
+    "mongoengine": mongoengine_mongomock
+}
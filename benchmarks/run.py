@@ -0,0 +1,253 @@
+"""
+Benchmarks the repository operations of each backend on datasets of the given sizes.
+
+    python -m benchmarks.run --sizes 1000 10000 100000 1000000
+
+Each operation reports its throughput, p50/p99 latencies and the peak memory allocated by a call. Thread-safe backends
+are also benchmarked on a mix of reads and writes called by each of the given numbers of threads. Results are compared
+to the JSON baseline, which is written on the first run or with --update, and the run fails when an operation
+regresses by more than the tolerance. Latencies vary across machines, so baselines are only meant to be compared
+on the machine that wrote them.
+"""
+import argparse
+import gc
+import json
+import os
+import platform
+import random
+import sys
+import threading
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from benchmarks.backends import BACKENDS, Backend
+from easyrepo.model.paging import PageRequest
+
+OPERATIONS = ["find_by_id", "find_all_by_id", "find_page", "find_all", "save", "save_all"]
+SEED_BATCH = 10000
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.run", description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("--backends", nargs="+", choices=list(BACKENDS), default=list(BACKENDS))
+    parser.add_argument("--operations", nargs="+", choices=OPERATIONS, default=OPERATIONS)
+    parser.add_argument("--sizes", nargs="+", type=int, default=[1000, 10000])
+    parser.add_argument("--calls", type=int, default=200, help="maximum number of timed calls per operation")
+    parser.add_argument("--max-time", type=float, default=2.0, help="maximum timed seconds per operation")
+    parser.add_argument("--batch", type=int, default=100, help="entities per save_all and find_all_by_id call")
+    parser.add_argument("--page-size", type=int, default=50)
+    parser.add_argument("--threads", nargs="+", type=int, default=[1, 2, 4, 8],
+                        help="thread counts of the read/write mix of thread-safe backends")
+    parser.add_argument("--read-ratio", type=float, default=0.9, help="share of reads in the read/write mix")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--baseline", default=".benchmarks/baseline.json")
+    parser.add_argument("--update", action="store_true", help="overwrite the baseline with the results")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed relative regression")
+    parser.add_argument("--min-delta-ms", type=float, default=0.05, help="ignored p50 regression in milliseconds")
+    args = parser.parse_args(argv)
+
+    results = []
+    for name in args.backends:
+        for size in args.sizes:
+            with BACKENDS[name]() as backend:
+                for result in run_backend(backend, size, args):
+                    result["backend"] = name
+                    results.append(result)
+                    _print_result(result)
+
+    baseline = _load(args.baseline)
+    regressions = []
+    if baseline is not None and not args.update:
+        regressions = compare(baseline["results"], results, args.tolerance, args.min_delta_ms)
+        for regression in regressions:
+            print(f"REGRESSION {regression}", file=sys.stderr)
+    if baseline is None or args.update:
+        _save(args.baseline, results)
+        print(f"baseline written to {args.baseline}")
+    return 1 if regressions else 0
+
+
+def run_backend(backend: Backend, size: int, args: argparse.Namespace) -> List[Dict[str, Any]]:
+    """
+    Seeds the backend with `size` entities and benchmarks the selected operations, reads first so that they all see
+    the same dataset.
+    """
+    rng = random.Random(args.seed)
+    ids = []
+    for start in range(0, size, SEED_BATCH):
+        saved = backend.repository.save_all(backend.new(i) for i in range(start, min(size, start + SEED_BATCH)))
+        ids.extend(entity.id for entity in saved)
+    backend.clear()
+    counter = iter(range(size, sys.maxsize))
+    repository = backend.repository
+    batch = min(args.batch, size)
+    pages = max(1, size // args.page_size)
+    calls: Dict[str, Callable[[], int]] = {
+        "find_by_id": lambda: int(repository.find_by_id(rng.choice(ids)) is not None),
+        "find_all_by_id": lambda: len(repository.find_all_by_id(rng.sample(ids, batch))),
+        "find_page": lambda: len(repository.find_page(PageRequest(number=rng.randrange(pages), size=args.page_size))
+                                 .content),
+        "find_all": lambda: len(repository.find_all()),
+        "save": lambda: int(repository.save(backend.new(next(counter))) is not None),
+        "save_all": lambda: len(repository.save_all([backend.new(next(counter)) for _ in range(batch)]))
+    }
+    results = []
+    for operation in OPERATIONS:
+        if operation in args.operations:
+            result = measure(calls[operation], args.calls, args.max_time)
+            backend.clear()
+            result.update(operation=operation, size=size)
+            results.append(result)
+    if backend.thread_safe:
+        for threads in args.threads:
+            result = measure_concurrent(calls["find_by_id"], calls["save"], threads, args)
+            backend.clear()
+            result.update(operation="read_write", size=size, threads=threads)
+            results.append(result)
+    return results
+
+
+def measure(call: Callable[[], int], max_calls: int, max_time: float) -> Dict[str, Any]:
+    """
+    Times calls returning their number of rows until either limit is reached. Two first untimed calls warm the
+    backend up and measure the peak memory allocated by a call.
+    """
+    call()
+    gc.collect()
+    tracemalloc.start()
+    try:
+        call()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    latencies = []
+    rows = 0
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        deadline = time.perf_counter() + max_time
+        while len(latencies) < max_calls and (not latencies or time.perf_counter() < deadline):
+            start = time.perf_counter()
+            rows += call()
+            latencies.append(time.perf_counter() - start)
+    finally:
+        if gc_enabled:
+            gc.enable()
+    elapsed = sum(latencies)
+    return {
+        "calls": len(latencies),
+        "ops_per_sec": len(latencies) / elapsed,
+        "rows_per_sec": rows / elapsed,
+        "p50_ms": _percentile(latencies, 0.5) * 1000,
+        "p99_ms": _percentile(latencies, 0.99) * 1000,
+        "peak_kib": peak / 1024
+    }
+
+
+def measure_concurrent(
+        read: Callable[[], int],
+        write: Callable[[], int],
+        threads: int,
+        args: argparse.Namespace
+) -> Dict[str, Any]:
+    """
+    Times a mix of reads and writes, in the proportion of `args.read_ratio`, called concurrently by `threads` threads
+    until each made `args.calls` calls or `args.max_time` seconds elapsed. Throughputs are measured on the wall time of
+    the run and latencies over the calls of all threads, memory is not measured.
+    """
+    read()
+    write()
+    latencies: List[List[float]] = [[] for _ in range(threads)]
+    rows = [0] * threads
+    barrier = threading.Barrier(threads + 1)
+
+    def run(worker: int):
+        rng = random.Random(args.seed + worker)
+        barrier.wait()
+        deadline = time.perf_counter() + args.max_time
+        while len(latencies[worker]) < args.calls and (not latencies[worker] or time.perf_counter() < deadline):
+            call = read if rng.random() < args.read_ratio else write
+            start = time.perf_counter()
+            rows[worker] += call()
+            latencies[worker].append(time.perf_counter() - start)
+
+    workers = [threading.Thread(target=run, args=(i,)) for i in range(threads)]
+    for worker in workers:
+        worker.start()
+    barrier.wait()
+    start = time.perf_counter()
+    for worker in workers:
+        worker.join()
+    elapsed = time.perf_counter() - start
+    merged = [latency for worker in latencies for latency in worker]
+    return {
+        "calls": len(merged),
+        "ops_per_sec": len(merged) / elapsed,
+        "rows_per_sec": sum(rows) / elapsed,
+        "p50_ms": _percentile(merged, 0.5) * 1000,
+        "p99_ms": _percentile(merged, 0.99) * 1000,
+        "peak_kib": 0.0
+    }
+
+
+def compare(
+        baseline: List[Dict[str, Any]],
+        results: List[Dict[str, Any]],
+        tolerance: float,
+        min_delta_ms: float
+) -> List[str]:
+    """
+    Returns the descriptions of the results slower or allocating more than their baseline beyond the tolerance.
+    Latencies are compared on their median, ignoring differences below `min_delta_ms` which are mostly noise.
+    """
+    previous = {_key(r): r for r in baseline}
+    regressions = []
+    for result in results:
+        base = previous.get(_key(result))
+        if base is None:
+            continue
+        name = "/".join(map(str, _key(result)))
+        p50, base_p50 = result["p50_ms"], base["p50_ms"]
+        if p50 > base_p50 * (1 + tolerance) and p50 - base_p50 > min_delta_ms:
+            regressions.append(f"{name} p50_ms: {base_p50:.3f} -> {p50:.3f}")
+        if result["peak_kib"] > base["peak_kib"] * (1 + tolerance):
+            regressions.append(f"{name} peak_kib: {base['peak_kib']:.1f} -> {result['peak_kib']:.1f}")
+    return regressions
+
+
+def _key(result: Dict[str, Any]) -> Tuple[str, str, int, int]:
+    return result["backend"], result["operation"], result["size"], result.get("threads", 1)
+
+
+def _percentile(values: List[float], q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, round(q * len(ordered)) - 1))]
+
+
+def _print_result(result: Dict[str, Any]):
+    operation = result["operation"] if "threads" not in result else f"{result['operation']} x{result['threads']}"
+    print(
+        f"{result['backend']:<17} {operation:<15} {result['size']:>8} "
+        f"{result['ops_per_sec']:>10.1f} ops/s {result['rows_per_sec']:>12.1f} rows/s "
+        f"p50 {result['p50_ms']:>9.3f}ms p99 {result['p99_ms']:>9.3f}ms peak {result['peak_kib']:>10.1f}KiB"
+    )
+
+
+def _load(path: str) -> Optional[Dict[str, Any]]:
+    try:
+        with open(path) as file:
+            return json.load(file)
+    except FileNotFoundError:
+        return None
+
+
+def _save(path: str, results: List[Dict[str, Any]]):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w") as file:
+        json.dump({"python": platform.python_version(), "machine": platform.machine(), "results": results}, file,
+                  indent=2)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
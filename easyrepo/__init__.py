@@ -1,2 +1,5 @@
 from easyrepo.interface.crud import CRUDRepository
 from easyrepo.interface.paging import PagingRepository
+from easyrepo.interface.async_crud import AsyncCRUDRepository
+from easyrepo.interface.async_paging import AsyncPagingRepository
+from easyrepo.interface.hook import RepositoryHook, add_hook, remove_hook
@@ -0,0 +1,77 @@
+import abc
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+from easyrepo.interface.hook import RepositoryHook, instrument_operations
+from easyrepo.model.criteria import Criteria
+from easyrepo.model.sorting import Sort
+
+
+class AsyncCRUDRepository(abc.ABC):
+    """
+    Interface for generic CRUD operations for a specific type, with asyncio. The operations of implementations are
+    reported to the registered hooks, see `easyrepo.interface.hook`.
+    """
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        instrument_operations(cls)
+
+    def add_hook(self, hook: RepositoryHook):
+        """
+        Registers a hook notified of the operations of this repository only.
+        """
+        self._hooks = getattr(self, "_hooks", []) + [hook]
+
+    def remove_hook(self, hook: RepositoryHook):
+        """
+        Unregisters a hook of this repository.
+        """
+        self._hooks = [h for h in getattr(self, "_hooks", []) if h is not hook]
+
+    @abc.abstractmethod
+    async def count(self, criteria: Criteria = None) -> int:
+        raise NotImplementedError()
+
+    @abc.abstractmethod
+    async def delete_all(self):
+        raise NotImplementedError()
+
+    @abc.abstractmethod
+    async def delete_all_by_id(self, ids: List[Any]):
+        raise NotImplementedError()
+
+    @abc.abstractmethod
+    async def delete_by_id(self, id: Any):
+        raise NotImplementedError()
+
+    @abc.abstractmethod
+    async def exists_by_id(self, id: Any) -> bool:
+        raise NotImplementedError()
+
+    @abc.abstractmethod
+    async def exists_all_by_id(self, ids: List[Any]) -> Dict[Any, bool]:
+        raise NotImplementedError()
+
+    @abc.abstractmethod
+    async def find_all(self, sort: Sort = None, criteria: Criteria = None, fields: List[str] = None) -> List[Any]:
+        raise NotImplementedError()
+
+    @abc.abstractmethod
+    async def find_all_by_id(self, ids: List[Any], fields: List[str] = None) -> List[Optional[Any]]:
+        raise NotImplementedError()
+
+    @abc.abstractmethod
+    async def find_by_id(self, id: Any) -> Any:
+        raise NotImplementedError()
+
+    @abc.abstractmethod
+    def iter_all(self, sort: Sort = None, batch_size: int = 1000, fields: List[str] = None) -> AsyncIterator[Any]:
+        raise NotImplementedError()
+
+    @abc.abstractmethod
+    async def save(self, model: Any) -> Any:
+        raise NotImplementedError()
+
+    @abc.abstractmethod
+    async def save_all(self, models: List[Any]) -> List[Any]:
+        raise NotImplementedError()
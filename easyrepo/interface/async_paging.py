@@ -0,0 +1,28 @@
+import abc
+from typing import Any, List
+
+from easyrepo.interface.async_crud import AsyncCRUDRepository
+from easyrepo.model.criteria import Criteria
+from easyrepo.model.paging import PageRequest, Page, Slice, TotalCount
+from easyrepo.model.sorting import Sort
+
+
+class AsyncPagingRepository(AsyncCRUDRepository):
+    """
+    Extension of AsyncCRUDRepository to provide additional method to retrieve entities using the pagination.
+    """
+
+    @abc.abstractmethod
+    async def find_page(
+            self,
+            page_request: PageRequest,
+            sort: Sort = None,
+            criteria: Criteria = None,
+            fields: List[str] = None,
+            total: TotalCount = TotalCount.EXACT
+    ) -> Page[Any]:
+        raise NotImplementedError()
+
+    @abc.abstractmethod
+    async def find_slice(self, size: int, sort: Sort = None, after: str = None) -> Slice[Any]:
+        raise NotImplementedError()
@@ -0,0 +1,24 @@
+import abc
+from typing import Any, Hashable
+
+
+class Cache(abc.ABC):
+    """
+    Interface for key-value stores used to cache repository results.
+    """
+
+    @abc.abstractmethod
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        raise NotImplementedError()
+
+    @abc.abstractmethod
+    def set(self, key: Hashable, value: Any):
+        raise NotImplementedError()
+
+    @abc.abstractmethod
+    def delete(self, key: Hashable):
+        raise NotImplementedError()
+
+    @abc.abstractmethod
+    def clear(self):
+        raise NotImplementedError()
@@ -1,16 +1,35 @@
 import abc
-from typing import List, Any
+from typing import Dict, Iterator, List, Optional, Any
 
+from easyrepo.interface.hook import RepositoryHook, instrument_operations
+from easyrepo.model.criteria import Criteria
 from easyrepo.model.sorting import Sort
 
 
 class CRUDRepository(abc.ABC):
     """
-    Interface for generic CRUD operations for a specific type.
+    Interface for generic CRUD operations for a specific type. The operations of implementations are reported to the
+    registered hooks, see `easyrepo.interface.hook`.
     """
 
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        instrument_operations(cls)
+
+    def add_hook(self, hook: RepositoryHook):
+        """
+        Registers a hook notified of the operations of this repository only.
+        """
+        self._hooks = getattr(self, "_hooks", []) + [hook]
+
+    def remove_hook(self, hook: RepositoryHook):
+        """
+        Unregisters a hook of this repository.
+        """
+        self._hooks = [h for h in getattr(self, "_hooks", []) if h is not hook]
+
     @abc.abstractmethod
-    def count(self) -> int:
+    def count(self, criteria: Criteria = None) -> int:
         raise NotImplementedError()
 
     @abc.abstractmethod
@@ -29,18 +48,35 @@ class CRUDRepository(abc.ABC):
     def exists_by_id(self, id: Any) -> bool:
         raise NotImplementedError()
 
+    def exists_all_by_id(self, ids: List[Any]) -> Dict[Any, bool]:
+        """
+        Returns whether an entity exists for each of the given ids. Loads the entities with `find_all_by_id` by default,
+        repositories check their existence without loading them.
+        """
+        ids = list(ids)
+        return {id: model is not None for id, model in zip(ids, self.find_all_by_id(ids))}
+
     @abc.abstractmethod
-    def find_all(self, sort: Sort = None) -> List[Any]:
+    def find_all(self, sort: Sort = None, criteria: Criteria = None, fields: List[str] = None) -> List[Any]:
         raise NotImplementedError()
 
     @abc.abstractmethod
-    def find_all_by_id(self, ids: List[Any]) -> List[Any]:
+    def find_all_by_id(self, ids: List[Any], fields: List[str] = None) -> List[Optional[Any]]:
         raise NotImplementedError()
 
     @abc.abstractmethod
     def find_by_id(self, id: Any) -> Any:
         raise NotImplementedError()
 
+    def iter_all(self, sort: Sort = None, batch_size: int = 1000, fields: List[str] = None) -> Iterator[Any]:
+        """
+        Iterates over all the entities. Loads them in a list with `find_all` by default, repositories stream them by
+        batches of the given size.
+        """
+        if fields is None:
+            return iter(self.find_all(sort))
+        return iter(self.find_all(sort, fields=fields))
+
     @abc.abstractmethod
     def save(self, model: Any) -> Any:
         raise NotImplementedError()
@@ -0,0 +1,238 @@
+import abc
+import contextvars
+import functools
+import inspect
+import threading
+import time
+from typing import Any, AsyncIterator, Callable, Iterator, List, Optional
+
+from easyrepo.model.hook import OperationEvent
+
+OPERATIONS = frozenset([
+    "count", "delete_all", "delete_all_by_id", "delete_by_id", "exists_by_id", "exists_all_by_id", "find_all",
+    "find_all_by_id", "find_by_id", "iter_all", "save", "save_all", "find_page", "find_slice", "find_by",
+    "find_all_where"
+])
+
+_ENTITY_OPERATIONS = frozenset([
+    "find_all", "find_all_by_id", "find_by_id", "iter_all", "save", "save_all", "find_page", "find_slice", "find_by",
+    "find_all_where"
+])
+
+
+class RepositoryHook(abc.ABC):
+    """
+    Interface for the observers of repository operations, registered with `add_hook`.
+    """
+
+    @abc.abstractmethod
+    def on_operation(self, event: OperationEvent):
+        raise NotImplementedError()
+
+
+_hooks: List[RepositoryHook] = []
+_current_operation: contextvars.ContextVar = contextvars.ContextVar("easyrepo.operation", default=None)
+
+
+def add_hook(hook: RepositoryHook):
+    """
+    Registers a hook notified of the operations of all repositories.
+    """
+    global _hooks
+    _hooks = _hooks + [hook]
+
+
+def remove_hook(hook: RepositoryHook):
+    """
+    Unregisters a hook.
+    """
+    global _hooks
+    _hooks = [h for h in _hooks if h is not hook]
+
+
+def record_round_trip(count: int = 1):
+    """
+    Records round trips to the database for the current repository operations, called by repositories for each command
+    or statement sent. Round trips are also counted for the operations calling the current one.
+    """
+    operation = _current_operation.get()
+    while operation is not None:
+        operation.add_round_trips(count)
+        operation = operation.parent
+
+
+class _Operation:
+    """
+    State of a repository operation being reported.
+    """
+    __slots__ = ("repository", "name", "parent", "round_trips", "started_at", "_start", "_lock")
+
+    def __init__(self, repository: Any, name: str, parent: Optional["_Operation"]):
+        self.repository = repository
+        self.name = name
+        self.parent = parent
+        self.round_trips = 0
+        self.started_at = time.time()
+        self._start = time.perf_counter()
+        self._lock = threading.Lock()
+
+    def add_round_trips(self, count: int):
+        # chunks may be queried concurrently from executor threads
+        with self._lock:
+            self.round_trips += count
+
+    def report(self, rows: Optional[int], error: BaseException = None):
+        """
+        Notifies the global hooks and the hooks of the repository of the end of the operation.
+        """
+        event = OperationEvent.construct(
+            operation=self.name,
+            repository=type(self.repository),
+            model=getattr(self.repository, "_model", None),
+            started_at=self.started_at,
+            latency=time.perf_counter() - self._start,
+            rows=rows,
+            round_trips=self.round_trips,
+            error=error,
+            nested=self.parent is not None
+        )
+        for hook in _hooks + getattr(self.repository, "_hooks", []):
+            hook.on_operation(event)
+
+
+def instrument_operations(cls: type):
+    """
+    Wraps the operations implemented by a repository class so that their calls are reported to the registered hooks.
+    Calls from an operation to other operations of the same repository are reported as part of the outer one. Without
+    registered hooks, operations are called directly.
+    """
+    for name in OPERATIONS:
+        function = cls.__dict__.get(name)
+        if inspect.isfunction(function) and not getattr(function, "__isabstractmethod__", False):
+            setattr(cls, name, _instrument(function))
+
+
+def _instrument(function: Callable) -> Callable:
+    """
+    Wraps a repository operation, iterators are reported once exhausted or closed.
+    """
+    name = function.__name__
+
+    if inspect.isasyncgenfunction(function):
+        @functools.wraps(function)
+        def async_iterator_wrapper(self, *args, **kwargs):
+            operation = _start_operation(self, name)
+            iterator = function(self, *args, **kwargs)
+            return iterator if operation is None else _aiterate(operation, iterator)
+        return async_iterator_wrapper
+
+    if inspect.iscoroutinefunction(function):
+        @functools.wraps(function)
+        async def coroutine_wrapper(self, *args, **kwargs):
+            operation = _start_operation(self, name)
+            if operation is None:
+                return await function(self, *args, **kwargs)
+            token = _current_operation.set(operation)
+            try:
+                result = await function(self, *args, **kwargs)
+            except BaseException as e:
+                operation.report(None, e)
+                raise
+            finally:
+                _current_operation.reset(token)
+            operation.report(_rows_of(name, result))
+            return result
+        return coroutine_wrapper
+
+    @functools.wraps(function)
+    def wrapper(self, *args, **kwargs):
+        operation = _start_operation(self, name)
+        if operation is None:
+            return function(self, *args, **kwargs)
+        token = _current_operation.set(operation)
+        try:
+            result = function(self, *args, **kwargs)
+        except BaseException as e:
+            operation.report(None, e)
+            raise
+        finally:
+            _current_operation.reset(token)
+        if isinstance(result, Iterator):
+            return _iterate(operation, result)
+        operation.report(_rows_of(name, result))
+        return result
+    return wrapper
+
+
+def _start_operation(repository: Any, name: str) -> Optional[_Operation]:
+    """
+    Returns the state of a new operation to report, or None if the operation is not reported.
+    """
+    if not _hooks and not getattr(repository, "_hooks", None):
+        return None
+    current = _current_operation.get()
+    if current is not None and current.repository is repository:
+        return None
+    return _Operation(repository, name, current)
+
+
+def _iterate(operation: _Operation, iterator: Iterator[Any]) -> Iterator[Any]:
+    """
+    Iterates within the operation, reporting it once exhausted or closed.
+    """
+    rows = 0
+    error = None
+    try:
+        while True:
+            token = _current_operation.set(operation)
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+            finally:
+                _current_operation.reset(token)
+            rows += 1
+            yield item
+    except Exception as e:
+        error = e
+        raise
+    finally:
+        operation.report(rows, error)
+
+
+async def _aiterate(operation: _Operation, iterator: AsyncIterator[Any]) -> AsyncIterator[Any]:
+    """
+    Iterates asynchronously within the operation, reporting it once exhausted or closed.
+    """
+    rows = 0
+    error = None
+    try:
+        while True:
+            token = _current_operation.set(operation)
+            try:
+                item = await iterator.__anext__()
+            except StopAsyncIteration:
+                return
+            finally:
+                _current_operation.reset(token)
+            rows += 1
+            yield item
+    except Exception as e:
+        error = e
+        raise
+    finally:
+        operation.report(rows, error)
+
+
+def _rows_of(name: str, result: Any) -> Optional[int]:
+    """
+    Returns the number of entities returned by an operation, None for operations not returning entities.
+    """
+    if name not in _ENTITY_OPERATIONS:
+        return None
+    if result is None:
+        return 0
+    if isinstance(result, list):
+        return sum(1 for r in result if r is not None)
+    content = getattr(result, "content", None)
+    return len(content) if isinstance(content, list) else 1
@@ -1,8 +1,9 @@
 import abc
-from typing import Any
+from typing import Any, List
 
 from easyrepo.interface.crud import CRUDRepository
-from easyrepo.model.paging import PageRequest, Page
+from easyrepo.model.criteria import Criteria
+from easyrepo.model.paging import PageRequest, Page, Slice, TotalCount, decode_cursor, encode_cursor
 from easyrepo.model.sorting import Sort
 
 
@@ -12,5 +13,30 @@ class PagingRepository(CRUDRepository):
     """
 
     @abc.abstractmethod
-    def find_page(self, page_request: PageRequest, sort: Sort = None) -> Page[Any]:
+    def find_page(
+            self,
+            page_request: PageRequest,
+            sort: Sort = None,
+            criteria: Criteria = None,
+            fields: List[str] = None,
+            total: TotalCount = TotalCount.EXACT
+    ) -> Page[Any]:
         raise NotImplementedError()
+
+    def find_slice(self, size: int, sort: Sort = None, after: str = None) -> Slice[Any]:
+        """
+        Returns the slice of entities following the given cursor. Reads the pages of `find_page` with a cursor holding
+        the offset of the slice by default, repositories seek the slice from the sort values of its last entity.
+        """
+        offset = decode_cursor(after)[0] if after is not None else 0
+        if not isinstance(offset, int) or offset < 0:
+            raise ValueError(f"Invalid cursor {after}")
+        start = offset % size
+        page = self.find_page(PageRequest(number=offset // size, size=size), sort)
+        content = list(page.content[start:])
+        more = page.has_next()
+        if start and more:
+            page = self.find_page(PageRequest(number=offset // size + 1, size=size), sort)
+            content += page.content[:start]
+            more = len(page.content) > start or page.has_next()
+        return Slice(content=content, size=size, next_cursor=encode_cursor([offset + size]) if more else None)
@@ -0,0 +1,21 @@
+from pydantic import BaseModel
+
+
+class CacheStats(BaseModel):
+    """
+    Hits and misses of the lookups of a cache.
+    """
+    hits: int = 0
+    misses: int = 0
+
+    def lookups(self) -> int:
+        """
+        Returns the total number of lookups.
+        """
+        return self.hits + self.misses
+
+    def hit_ratio(self) -> float:
+        """
+        Returns the proportion of lookups answered by the cache.
+        """
+        return self.hits / self.lookups() if self.lookups() else 0.0
@@ -0,0 +1,74 @@
+from typing import Any, List
+
+from pydantic import BaseModel
+
+
+class Criteria(BaseModel):
+    """
+    Backend-neutral filter on entities, compiled to a query by each repository. Criteria are combined with the `&`, `|`
+    and `~` operators. Comparisons with null or missing properties follow the semantics of each backend.
+    """
+
+    def __and__(self, other: "Criteria") -> "And":
+        return And(criteria=[self, other])
+
+    def __or__(self, other: "Criteria") -> "Or":
+        return Or(criteria=[self, other])
+
+    def __invert__(self) -> "Not":
+        return Not(criteria=self)
+
+
+class Eq(Criteria):
+    """
+    Matches the entities whose property equals the given value.
+    """
+    key: str
+    value: Any
+
+
+class In(Criteria):
+    """
+    Matches the entities whose property equals one of the given values.
+    """
+    key: str
+    values: List[Any]
+
+
+class Range(Criteria):
+    """
+    Matches the entities whose property is within the given bounds, unset bounds are ignored.
+    """
+    key: str
+    gt: Any = None
+    gte: Any = None
+    lt: Any = None
+    lte: Any = None
+
+
+class Exists(Criteria):
+    """
+    Matches the entities whose property is set to a non-null value.
+    """
+    key: str
+
+
+class And(Criteria):
+    """
+    Matches the entities matching all the given criteria.
+    """
+    criteria: List[Criteria]
+
+
+class Or(Criteria):
+    """
+    Matches the entities matching at least one of the given criteria.
+    """
+    criteria: List[Criteria]
+
+
+class Not(Criteria):
+    """
+    Matches the entities not matching the given criteria.
+    """
+    criteria: Criteria
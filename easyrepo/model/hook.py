@@ -0,0 +1,77 @@
+import math
+from typing import List, Optional
+
+from pydantic import BaseModel
+
+
+class OperationEvent(BaseModel):
+    """
+    Record of a repository operation, reported to the registered hooks once the operation is done. Operations called
+    by other operations, such as the calls of a `CachingRepository` to the repository it wraps, are nested: their round
+    trips are also counted by the calling operation.
+    """
+    operation: str
+    repository: type
+    model: Optional[type]
+    started_at: float
+    latency: float
+    rows: Optional[int]
+    round_trips: int = 0
+    error: Optional[BaseException]
+    nested: bool = False
+
+    class Config:
+        arbitrary_types_allowed = True
+
+
+class Histogram(BaseModel):
+    """
+    Distribution of the latencies of operations, counted in buckets of the given upper bounds in seconds, plus an
+    overflow bucket.
+    """
+    bounds: List[float]
+    counts: List[int]
+    count: int = 0
+    total: float = 0.0
+    max: float = 0.0
+    errors: int = 0
+    rows: int = 0
+    round_trips: int = 0
+
+    @staticmethod
+    def of_bounds(bounds: List[float]) -> "Histogram":
+        return Histogram(bounds=sorted(bounds), counts=[0] * (len(bounds) + 1))
+
+    def record(self, event: OperationEvent):
+        """
+        Adds an operation to the distribution.
+        """
+        index = next((i for i, bound in enumerate(self.bounds) if event.latency <= bound), len(self.bounds))
+        self.counts[index] += 1
+        self.count += 1
+        self.total += event.latency
+        self.max = max(self.max, event.latency)
+        self.errors += event.error is not None
+        self.rows += event.rows or 0
+        self.round_trips += event.round_trips
+
+    def mean(self) -> float:
+        """
+        Returns the mean latency.
+        """
+        return self.total / self.count if self.count else 0.0
+
+    def quantile(self, q: float) -> float:
+        """
+        Returns an upper bound of the latency of the given quantile, the bound of the bucket holding it or the maximum
+        latency for the overflow bucket.
+        """
+        if not self.count:
+            return 0.0
+        rank = max(1, math.ceil(q * self.count))
+        seen = 0
+        for bound, count in zip(self.bounds, self.counts):
+            seen += count
+            if seen >= rank:
+                return min(bound, self.max)
+        return self.max
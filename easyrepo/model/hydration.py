@@ -0,0 +1,67 @@
+from functools import lru_cache
+from typing import Any, Callable, Optional, Tuple, Type, TypeVar
+
+from pydantic import BaseModel, Extra
+from pydantic.fields import ModelField, SHAPE_LIST, SHAPE_SINGLETON
+
+M = TypeVar("M", bound=BaseModel)
+
+
+@lru_cache(maxsize=None)
+def model_builder(model: Type[M]) -> Callable[[dict], M]:
+    """
+    Returns a function creating models of the given pydantic type from trusted data, such as documents read back from
+    the database, without validating them. Like `BaseModel.construct`, missing fields get their default value, and
+    nested models, alone or in lists, are created the same way. Values are not converted, so the data must be keyed by
+    field names and already hold values of the field types. Builders are compiled once per model type.
+    """
+    plan = [(name, field, _nested_model(field)) for name, field in model.__fields__.items()]
+    keep_extra = model.__config__.extra == Extra.allow
+
+    def build(data: dict) -> M:
+        values = {}
+        fields_set = set()
+        for name, field, nested in plan:
+            if name in data:
+                value = data[name]
+                if nested is not None and value is not None:
+                    value = _build_nested(nested, value)
+                values[name] = value
+                fields_set.add(name)
+            elif not field.required:
+                values[name] = field.get_default()
+        if keep_extra:
+            extra = {k: v for k, v in data.items() if k not in model.__fields__}
+            values.update(extra)
+            fields_set.update(extra)
+        instance = model.__new__(model)
+        object.__setattr__(instance, "__dict__", values)
+        object.__setattr__(instance, "__fields_set__", fields_set)
+        instance._init_private_attributes()
+        return instance
+
+    return build
+
+
+def _nested_model(field: ModelField) -> Optional[Tuple[Type[BaseModel], bool]]:
+    """
+    Returns the model type of a field holding a nested model or a list of nested models, and whether it is a list.
+    """
+    if not isinstance(field.type_, type) or not issubclass(field.type_, BaseModel):
+        return None
+    if field.shape == SHAPE_SINGLETON:
+        return field.type_, False
+    if field.shape == SHAPE_LIST:
+        return field.type_, True
+    return None
+
+
+def _build_nested(nested: Tuple[Type[BaseModel], bool], value: Any) -> Any:
+    """
+    Creates the nested models of a field value, models are built lazily to support self-referencing types.
+    """
+    model, many = nested
+    build = model_builder(model)
+    if many:
+        return [build(v) if isinstance(v, dict) else v for v in value]
+    return build(value) if isinstance(value, dict) else value
@@ -0,0 +1,83 @@
+import abc
+import threading
+import uuid
+from typing import Any, List
+
+try:
+    import bson
+except ImportError:  # pragma: no cover
+    bson = None
+
+
+class IdGenerator(abc.ABC):
+    """
+    Interface for generating the ids of new entities on the client side.
+    """
+
+    @abc.abstractmethod
+    def next_id(self) -> Any:
+        raise NotImplementedError()
+
+    def next_ids(self, count: int) -> List[Any]:
+        """
+        Returns the given number of new ids.
+        """
+        return [self.next_id() for _ in range(count)]
+
+    def observe(self, id: Any):
+        """
+        Notifies the generator of an id assigned without it, so that it is not generated later.
+        """
+        pass
+
+
+class SequenceIdGenerator(IdGenerator):
+    """
+    Generates monotonically increasing integer ids, never reusing ids, even deleted ones.
+    """
+
+    def __init__(self, start: int = 1):
+        self._next = start
+        self._lock = threading.Lock()
+
+    def next_id(self) -> int:
+        with self._lock:
+            id = self._next
+            self._next += 1
+            return id
+
+    def next_ids(self, count: int) -> List[int]:
+        """
+        Reserves a block of consecutive ids at once.
+        """
+        with self._lock:
+            start = self._next
+            self._next += count
+        return list(range(start, start + count))
+
+    def observe(self, id: Any):
+        if isinstance(id, int) and id >= self._next:
+            with self._lock:
+                self._next = max(self._next, id + 1)
+
+
+class UUIDGenerator(IdGenerator):
+    """
+    Generates random `uuid.UUID` ids.
+    """
+
+    def next_id(self) -> uuid.UUID:
+        return uuid.uuid4()
+
+
+class ObjectIdGenerator(IdGenerator):
+    """
+    Generates `bson.ObjectId` ids, as generated by mongo drivers.
+    """
+
+    def __init__(self):
+        if bson is None:
+            raise ImportError("ObjectIdGenerator requires `bson`, install easyrepo with the mongo extra")
+
+    def next_id(self) -> Any:
+        return bson.ObjectId()
@@ -1,11 +1,37 @@
+import base64
+import datetime
+import decimal
+import json
 import math
-from typing import Generic, TypeVar, List, Optional
+import uuid
+from enum import Enum
+from typing import Any, Generic, TypeVar, List, Optional
 
 from pydantic import BaseModel, Field
 
+try:
+    import bson
+except ImportError:  # pragma: no cover
+    bson = None
+
 T = TypeVar("T")
 
 
+class TotalCount(Enum):
+    """
+    Enumeration for the ways of counting the total number of elements when retrieving a page. Without exact count, one
+    more element than the page size is fetched to know whether there is a next page.
+
+    EXACT: all matching elements are counted.
+    ESTIMATED: the total is estimated from collection or table statistics when the page is not filtered and the
+    backend supports it, otherwise elements are counted.
+    NONE: elements are not counted.
+    """
+    EXACT = "exact"
+    ESTIMATED = "estimated"
+    NONE = "none"
+
+
 class PageRequest(BaseModel):
     """
     Class for pagination information.
@@ -53,10 +79,15 @@ class Page(Generic[T], BaseModel):
     """
     A page is a sublist of a list of objects. It allows gain information about the position of it in the containing
     entire list.
+
+    Pages retrieved without exact count hold an estimated or missing `total_elements`, and whether more elements follow
+    the page in `has_more`, so that `has_next` remains exact and `total_pages` counts at least the known pages.
     """
     content: List[T]
     page_request: Optional[PageRequest]
     total_elements: Optional[int]
+    total_estimated: bool = False
+    has_more: Optional[bool]
 
     def number(self) -> int:
         """
@@ -78,8 +109,13 @@ class Page(Generic[T], BaseModel):
 
     def total_pages(self) -> int:
         """
-        Returns the number of total pages.
+        Returns the number of total pages, estimated if the total number of elements is not exactly known.
         """
+        if self.has_more is not None and (self.total_elements is None or self.total_estimated):
+            known_pages = self.number() + (2 if self.has_more else 1)
+            if not self.has_more or self.total_elements is None or self.size() == 0:
+                return known_pages
+            return max(known_pages, math.ceil(self.total_elements / self.size()))
         return 1 if self.size() == 0 or self.total_elements is None else math.ceil(self.total_elements / self.size())
 
     def has_content(self) -> bool:
@@ -92,6 +128,8 @@ class Page(Generic[T], BaseModel):
         """
         Returns if there is a next Page.
         """
+        if self.has_more is not None:
+            return self.has_more
         return self.number() + 1 < self.total_pages()
 
     def has_previous(self) -> bool:
@@ -127,3 +165,90 @@ class Page(Generic[T], BaseModel):
         if not self.page_request:
             return None
         return self.page_request.previous() if self.has_previous() else None
+
+
+class Slice(Generic[T], BaseModel):
+    """
+    A slice is a sublist of a list of objects retrieved by keyset pagination. Instead of a page number, the next slice
+    is requested with an opaque cursor holding the sort values of the last object of the slice, so that retrieving a
+    slice costs the same whatever its position in the list.
+    """
+    content: List[T]
+    size: int
+    next_cursor: Optional[str]
+
+    def number_of_elements(self) -> int:
+        """
+        Returns the number of elements currently on this Slice.
+        """
+        return len(self.content)
+
+    def has_content(self) -> bool:
+        """
+        Returns if the Slice has content at all.
+        """
+        return bool(self.content)
+
+    def has_next(self) -> bool:
+        """
+        Returns if there is a next Slice.
+        """
+        return self.next_cursor is not None
+
+
+def encode_cursor(values: List[Any]) -> str:
+    """
+    Encodes sort values into an opaque cursor.
+    """
+    data = json.dumps(values, default=_encode_value, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(data).decode()
+
+
+def decode_cursor(cursor: str) -> List[Any]:
+    """
+    Decodes the sort values of a cursor created by `encode_cursor`.
+    """
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode()), object_hook=_decode_value)
+    except ValueError:
+        values = None
+    if not isinstance(values, list):
+        raise ValueError(f"Invalid cursor {cursor}")
+    return values
+
+
+def _encode_value(value: Any) -> dict:
+    """
+    Encodes a value not supported by JSON.
+    """
+    if isinstance(value, datetime.datetime):
+        return {"$datetime": value.isoformat()}
+    if isinstance(value, datetime.date):
+        return {"$date": value.isoformat()}
+    if isinstance(value, uuid.UUID):
+        return {"$uuid": str(value)}
+    if isinstance(value, decimal.Decimal):
+        return {"$decimal": str(value)}
+    if bson is not None and isinstance(value, bson.ObjectId):
+        return {"$oid": str(value)}
+    raise TypeError(f"Type {type(value)} not handled by cursors")
+
+
+def _decode_value(value: dict) -> Any:
+    """
+    Decodes a value encoded by `_encode_value`.
+    """
+    if len(value) != 1:
+        return value
+    tag, data = next(iter(value.items()))
+    if tag == "$datetime":
+        return datetime.datetime.fromisoformat(data)
+    if tag == "$date":
+        return datetime.date.fromisoformat(data)
+    if tag == "$uuid":
+        return uuid.UUID(data)
+    if tag == "$decimal":
+        return decimal.Decimal(data)
+    if tag == "$oid" and bson is not None:
+        return bson.ObjectId(data)
+    return value
@@ -68,3 +68,13 @@ class Sort(BaseModel):
         for order in self.orders:
             order.direction = Direction.DES
         return self
+
+    def with_tiebreaker(self, key: str) -> "Sort":
+        """
+        Returns a new Sort with the current orders followed by an ascending order on the given unique key, unless
+        already sorted by this key, so that the resulting order is total.
+        """
+        orders = list(self.orders)
+        if all(order.key != key for order in orders):
+            orders.append(Order(key=key, direction=Direction.ASC))
+        return Sort(orders=orders)
@@ -0,0 +1,34 @@
+from typing import Iterator
+
+import pytest
+
+from easyrepo.testing import QueryRecorder
+
+
+def pytest_configure(config):
+    config.addinivalue_line(
+        "markers",
+        "max_queries(count, calls=None): fail the test if its repository calls send more than count round trips to "
+        "the database, or call an operation of a repository more than calls times."
+    )
+
+
+@pytest.fixture
+def query_recorder() -> Iterator[QueryRecorder]:
+    """
+    Records the repository calls of the test.
+    """
+    with QueryRecorder() as recorder:
+        yield recorder
+
+
+@pytest.hookimpl(hookwrapper=True)
+def pytest_runtest_call(item):
+    marker = item.get_closest_marker("max_queries")
+    if marker is None:
+        yield
+        return
+    with QueryRecorder() as recorder:
+        outcome = yield
+    if outcome.excinfo is None:
+        recorder.assert_max_queries(*marker.args, **marker.kwargs)
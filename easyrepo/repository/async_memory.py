@@ -0,0 +1,165 @@
+import types
+from typing import Any, AsyncIterator, Dict, Iterable, List, Optional, TypeVar, Generic, get_args
+
+from easyrepo import AsyncPagingRepository
+from easyrepo.model.criteria import Criteria
+from easyrepo.model.identity import IdGenerator
+from easyrepo.model.paging import PageRequest, Page, Slice, TotalCount
+from easyrepo.model.sorting import Sort
+from easyrepo.repository.index import Index
+from easyrepo.repository.memory import MemoryRepository
+from easyrepo.repository.wal import WriteAheadLog
+
+T = TypeVar("T")
+
+
+class AsyncMemoryRepository(Generic[T], AsyncPagingRepository):
+    """
+    Memory repository for asyncio, with the same options and behavior as `MemoryRepository`.
+
+    T: the type of object handled by the repository, can be a dict or `pydantic.BaseModel`.
+
+    Entities are stored by a `MemoryRepository`, whose operations never wait, except for the write-ahead log if any.
+    """
+
+    def __init__(
+            self,
+            indexes: Iterable[Index] = None,
+            concurrent: bool = False,
+            wal: WriteAheadLog = None,
+            id_generator: IdGenerator = None,
+            stripes: int = 16
+    ):
+        model = self._model = get_args(self.__orig_bases__[0])[0]
+        repository_type = types.new_class(MemoryRepository.__name__, (MemoryRepository[model],))
+        self._repository = repository_type(
+            indexes=indexes, concurrent=concurrent, wal=wal, id_generator=id_generator, stripes=stripes
+        )
+
+    async def __aenter__(self) -> "AsyncMemoryRepository[T]":
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    async def close(self):
+        """
+        Syncs and closes the write-ahead log, if any.
+        """
+        self._repository.close()
+
+    async def count(self, criteria: Criteria = None) -> int:
+        """
+        Returns the number of entities matching the given criteria.
+        """
+        return self._repository.count(criteria)
+
+    async def delete_all(self):
+        """
+        Deletes all entities.
+        """
+        self._repository.delete_all()
+
+    async def delete_all_by_id(self, ids: Iterable[int]):
+        """
+        Deletes all entities with the given IDs.
+        """
+        self._repository.delete_all_by_id(ids)
+
+    async def delete_by_id(self, id: int):
+        """
+        Deletes the entity with the given id.
+        """
+        self._repository.delete_by_id(id)
+
+    async def exists_by_id(self, id: int) -> bool:
+        """
+        Returns whether a document with the given id exists.
+        """
+        return self._repository.exists_by_id(id)
+
+    async def exists_all_by_id(self, ids: Iterable[int]) -> Dict[int, bool]:
+        """
+        Returns whether an entity exists for each of the given ids.
+        """
+        return self._repository.exists_all_by_id(ids)
+
+    async def find_all(self, sort: Sort = None, criteria: Criteria = None, fields: List[str] = None) -> List[T]:
+        """
+        Returns all entities matching the given criteria, sorted by the given options, see `MemoryRepository.find_all`.
+        """
+        return self._repository.find_all(sort, criteria, fields)
+
+    async def find_page(
+            self,
+            page_request: PageRequest,
+            sort: Sort = None,
+            criteria: Criteria = None,
+            fields: List[str] = None,
+            total: TotalCount = TotalCount.EXACT
+    ) -> Page[T]:
+        """
+        Returns a Page of entities matching the given criteria and meeting the paging restriction.
+        """
+        return self._repository.find_page(page_request, sort, criteria, fields, total)
+
+    async def find_slice(self, size: int, sort: Sort = None, after: str = None) -> Slice[T]:
+        """
+        Returns a Slice of entities following the given cursor.
+        """
+        return self._repository.find_slice(size, sort, after)
+
+    async def find_all_by_id(self, ids: Iterable[int], fields: List[str] = None) -> List[Optional[T]]:
+        """
+        Returns the entities with the given IDs, in the same order, with None for missing entities.
+        """
+        return self._repository.find_all_by_id(ids, fields)
+
+    async def find_by_id(self, id: int) -> Optional[T]:
+        """
+        Returns an entity by its id.
+        """
+        return self._repository.find_by_id(id)
+
+    async def find_by(self, **values: Any) -> List[T]:
+        """
+        Returns all entities whose properties equal the given values, see `MemoryRepository.find_by`.
+        """
+        return self._repository.find_by(**values)
+
+    async def find_all_where(
+            self,
+            key: str,
+            gt: Any = None,
+            gte: Any = None,
+            lt: Any = None,
+            lte: Any = None
+    ) -> List[T]:
+        """
+        Returns all entities whose property is within the given bounds, see `MemoryRepository.find_all_where`.
+        """
+        return self._repository.find_all_where(key, gt=gt, gte=gte, lt=lt, lte=lte)
+
+    async def iter_all(
+            self,
+            sort: Sort = None,
+            batch_size: int = 1000,
+            fields: List[str] = None
+    ) -> AsyncIterator[T]:
+        """
+        Returns an asynchronous iterator over all entities sorted by the given options, unaffected by later writes.
+        """
+        for model in self._repository.iter_all(sort, batch_size, fields):
+            yield model
+
+    async def save(self, model: T) -> T:
+        """
+        Saves a given entity.
+        """
+        return self._repository.save(model)
+
+    async def save_all(self, models: Iterable[T]) -> List[T]:
+        """
+        Saves all given entities.
+        """
+        return self._repository.save_all(models)
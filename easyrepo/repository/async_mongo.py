@@ -0,0 +1,267 @@
+from typing import Any, AsyncIterator, Dict, Iterable, List, Optional, TypeVar, Generic, get_args
+
+from bson import ObjectId
+from pymongo import ReplaceOne, ReturnDocument
+
+from easyrepo import AsyncPagingRepository
+from easyrepo.model.criteria import Criteria
+from easyrepo.model.hydration import model_builder
+from easyrepo.model.identity import IdGenerator
+from easyrepo.model.mongo import Document
+from easyrepo.model.paging import Page, PageRequest, Slice, TotalCount, encode_cursor, decode_cursor
+from easyrepo.model.sorting import Sort
+from easyrepo.repository.index import get_value
+from easyrepo.repository.mongo import _MongoQueries
+from easyrepo.utils import chunks
+
+T = TypeVar("T")
+
+
+class AsyncMongoRepository(Generic[T], AsyncPagingRepository, _MongoQueries):
+    """
+    Mongo repository for asyncio, with the same options and behavior as `MongoRepository`.
+
+    T: the type of object handled by the repository, can be a dict or `easyrepo.model.mongo.Document`.
+
+    collection: an asynchronous collection with the API of `motor.motor_asyncio.AsyncIOMotorCollection`.
+    id_generator: generator of the ids of new documents, assigned on the client side instead of by the server.
+    batch_size: the maximum number of documents sent per bulk write by `save_all`.
+    read_back: whether `save` returns the document as stored by the server, otherwise the saved document is returned
+    as is, without an additional round trip.
+    chunk_size: the maximum number of ids sent per query by `find_all_by_id` and `exists_all_by_id`.
+    trusted: whether the documents of the collection are trusted to match the model type, see `MongoRepository`.
+    """
+
+    def __init__(
+            self,
+            collection: Any,
+            id_generator: IdGenerator = None,
+            batch_size: int = 1000,
+            read_back: bool = True,
+            chunk_size: int = 1000,
+            trusted: bool = False
+    ):
+        self._collection = collection
+        self._id_generator = id_generator
+        self._batch_size = batch_size
+        self._read_back = read_back
+        self._chunk_size = chunk_size
+        self._model = get_args(self.__orig_bases__[0])[0]
+        if type(self._model) == TypeVar:
+            raise ValueError("Missing repository type")
+        if not issubclass(self._model, (Document, dict)):
+            raise ValueError(f"Model type {self._model} is not dict or `easyrepo.model.mongo.Document`")
+        self._is_pydantic_model = issubclass(self._model, Document)
+        self._builder = model_builder(self._model) if trusted and self._is_pydantic_model else None
+
+    async def count(self, criteria: Criteria = None) -> int:
+        """
+        Returns the number of documents matching the given criteria, estimated from the collection metadata when all
+        documents are counted.
+        """
+        if criteria is None:
+            return await self._collection.estimated_document_count()
+        return await self._collection.count_documents(self._filter_query(criteria))
+
+    async def delete_all(self):
+        """
+        Deletes all documents.
+        """
+        await self._collection.drop()
+
+    async def delete_all_by_id(self, ids: Iterable[ObjectId]):
+        """
+        Deletes all documents with the given IDs.
+        """
+        await self._collection.delete_many({"_id": {"$in": list(ids)}})
+
+    async def delete_by_id(self, id: ObjectId):
+        """
+        Deletes the document with the given id.
+        """
+        await self._collection.delete_one({"_id": id})
+
+    async def exists_by_id(self, id: ObjectId) -> bool:
+        """
+        Returns whether a document with the given id exists.
+        """
+        return await self._collection.find_one({"_id": id}, projection={"_id": 1}) is not None
+
+    async def exists_all_by_id(self, ids: Iterable[ObjectId]) -> Dict[ObjectId, bool]:
+        """
+        Returns whether a document exists for each of the given ids, with a query per chunk of ids.
+        """
+        ids = list(ids)
+        found = set()
+        for chunk in chunks(list(set(ids)), self._chunk_size):
+            async for result in self._collection.find({"_id": {"$in": chunk}}, projection={"_id": 1}):
+                found.add(result["_id"])
+        return {id: id in found for id in ids}
+
+    async def find_all(self, sort: Sort = None, criteria: Criteria = None, fields: List[str] = None) -> List[T]:
+        """
+        Returns all documents matching the given criteria, sorted by the given options. With `fields`, only the given
+        fields of the documents are fetched, returned as dicts.
+        """
+        cursor = self._collection.find(
+            filter=self._filter_query(criteria),
+            sort=self._sort_query(sort),
+            projection=self._projection(fields)
+        )
+        return [self._map_result(r, fields) for r in await cursor.to_list(length=None)]
+
+    async def find_page(
+            self,
+            page_request: PageRequest,
+            sort: Sort = None,
+            criteria: Criteria = None,
+            fields: List[str] = None,
+            total: TotalCount = TotalCount.EXACT
+    ) -> Page[T]:
+        """
+        Returns a Page of document matching the given criteria and meeting the paging restriction. The page content and
+        the exact number of matching documents are fetched by a single aggregation. Otherwise, the page is fetched with
+        one more document to know whether a next page exists, and the total of unfiltered pages is estimated from the
+        collection metadata if requested. With `fields`, only the given fields of the documents are fetched, returned as
+        dicts.
+        """
+        if total == TotalCount.NONE or (total == TotalCount.ESTIMATED and criteria is None):
+            cursor = self._collection.find(
+                filter=self._filter_query(criteria),
+                sort=self._sort_query(sort),
+                projection=self._projection(fields),
+                skip=page_request.offset(),
+                limit=page_request.size + 1
+            )
+            result = [self._map_result(r, fields) for r in await cursor.to_list(length=None)]
+            estimate = None
+            if total == TotalCount.ESTIMATED:
+                estimate = await self._collection.estimated_document_count()
+            return self._page(
+                result[:page_request.size],
+                page_request,
+                estimate,
+                total_estimated=estimate is not None,
+                has_more=len(result) > page_request.size
+            )
+
+        pipeline = [{"$match": self._filter_query(criteria)}]
+        sort_query = self._sort_query(sort)
+        if sort_query:
+            pipeline.append({"$sort": dict(sort_query)})
+        pipeline.append({"$facet": {
+            "content": self._page_stages(page_request, fields),
+            "total": [{"$count": "count"}]
+        }})
+        result = (await self._collection.aggregate(pipeline).to_list(length=None))[0]
+        return self._page(
+            [self._map_result(r, fields) for r in result["content"]],
+            page_request,
+            result["total"][0]["count"] if result["total"] else 0
+        )
+
+    async def find_slice(self, size: int, sort: Sort = None, after: str = None) -> Slice[T]:
+        """
+        Returns a Slice of documents following the given cursor, sorted documents are seeked from the cursor values
+        instead of being skipped.
+        """
+        sort_query = self._sort_query((sort or Sort()).with_tiebreaker("_id"))
+        filter_query = self._filter_query()
+        if after is not None:
+            filter_query = {"$and": [filter_query, self._keyset_query(sort_query, decode_cursor(after))]}
+        cursor = self._collection.find(filter=filter_query, sort=sort_query, limit=size + 1)
+        result = await cursor.to_list(length=None)
+        next_cursor = None
+        if len(result) > size:
+            next_cursor = encode_cursor([get_value(result[size - 1], k) for k, _ in sort_query])
+        return Slice(content=[self._map_result(r) for r in result[:size]], size=size, next_cursor=next_cursor)
+
+    async def find_all_by_id(self, ids: Iterable[ObjectId], fields: List[str] = None) -> List[Optional[T]]:
+        """
+        Returns the documents with the given IDs, in the same order, with None for missing documents. Documents are
+        fetched with a query per chunk of ids. With `fields`, only the given fields of the documents are fetched,
+        returned as dicts.
+        """
+        ids = list(ids)
+        found = {}
+        for chunk in chunks(list(dict.fromkeys(ids)), self._chunk_size):
+            async for result in self._collection.find({"_id": {"$in": chunk}}, projection=self._projection(fields)):
+                id = result["_id"]
+                found[id] = self._map_result(result, fields)
+        return [found.get(id) for id in ids]
+
+    async def find_by_id(self, id: ObjectId) -> Optional[T]:
+        """
+        Returns a document by its id.
+        """
+        result = await self._collection.find_one({"_id": id})
+        return self._map_result(result)
+
+    async def iter_all(
+            self,
+            sort: Sort = None,
+            batch_size: int = 1000,
+            fields: List[str] = None
+    ) -> AsyncIterator[T]:
+        """
+        Returns an asynchronous iterator over all documents sorted by the given options, fetched from the server by
+        batches. With `fields`, only the given fields of the documents are fetched, returned as dicts.
+        """
+        cursor = self._collection.find(
+            filter=self._filter_query(),
+            sort=self._sort_query(sort),
+            projection=self._projection(fields)
+        ).batch_size(batch_size)
+        async for result in cursor:
+            yield self._map_result(result, fields)
+
+    async def save(self, model: T, read_back: bool = None) -> T:
+        """
+        Saves a given document. `read_back` overrides the repository setting for this call.
+        """
+        read_back = self._read_back if read_back is None else read_back
+        document = self._to_document(model)
+        if document.get("_id") is None and self._id_generator is not None:
+            document["_id"] = self._id_generator.next_id()
+            return await self._save_document(document, read_back, new=True)
+        return await self._save_document(document, read_back)
+
+    async def save_all(self, models: Iterable[T], ordered: bool = True) -> List[T]:
+        """
+        Saves all given documents using bulk writes, see `MongoRepository.save_all`.
+        """
+        documents = [self._to_document(m) for m in models]
+        inserts = [d for d in documents if d.get("_id") is None]
+        replacements = [d for d in documents if d.get("_id") is not None]
+        ids = self._id_generator.next_ids(len(inserts)) if self._id_generator else [ObjectId() for _ in inserts]
+        for document, id in zip(inserts, ids):
+            document["_id"] = id
+        for batch in chunks(inserts, self._batch_size):
+            await self._collection.insert_many(batch, ordered=ordered)
+        for batch in chunks(replacements, self._batch_size):
+            requests = [ReplaceOne({"_id": d["_id"]}, d, upsert=True) for d in batch]
+            await self._collection.bulk_write(requests, ordered=ordered)
+        return [self._map_result(d) for d in documents]
+
+    async def _save_document(self, document: dict, read_back: bool, new: bool = False) -> T:
+        """
+        Inserts a new document, or replaces an existing one, inserted if missing like in `save_all`, and returns the
+        saved document. When read back, a replaced document is returned by the server in the same round trip.
+        """
+        model_id = document.get("_id")
+        if new or model_id is None:
+            if model_id is None:
+                # ensure there is no `_id` field in the document to not create it with None value
+                document.pop("_id", None)
+            model_id = document["_id"] = (await self._collection.insert_one(document)).inserted_id
+            return await self.find_by_id(model_id) if read_back else self._map_result(document)
+        if read_back:
+            result = await self._collection.find_one_and_replace(
+                {"_id": model_id},
+                document,
+                upsert=True,
+                return_document=ReturnDocument.AFTER
+            )
+            return self._map_result(result)
+        await self._collection.replace_one({"_id": model_id}, document, upsert=True)
+        return self._map_result(document)
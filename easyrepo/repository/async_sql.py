@@ -0,0 +1,293 @@
+from contextlib import asynccontextmanager
+from typing import Any, AsyncContextManager, AsyncIterator, Dict, Iterable, List, Optional, TypeVar, Generic, get_args
+
+from sqlalchemy import delete, func, insert, inspect, select
+from sqlalchemy.sql import Select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import make_transient_to_detached
+
+from easyrepo import AsyncPagingRepository
+from easyrepo.model.criteria import Criteria
+from easyrepo.model.identity import IdGenerator
+from easyrepo.model.paging import PageRequest, Page, Slice, TotalCount, encode_cursor, decode_cursor
+from easyrepo.model.sorting import Sort
+from easyrepo.model.sql import Entity
+from easyrepo.repository.index import get_value
+from easyrepo.repository.sql import (
+    CountEstimator, _SqlQueries, _TRANSACTION_DEPTH, _record_statements, _supports_returning
+)
+from easyrepo.utils import chunks
+
+T = TypeVar("T", bound=Entity)
+
+
+@asynccontextmanager
+async def async_transaction(session: AsyncSession) -> AsyncIterator[AsyncSession]:
+    """
+    Groups the writes of the repositories using the given session in a single commit, see `transaction`.
+    """
+    depth = session.info.get(_TRANSACTION_DEPTH, 0)
+    session.info[_TRANSACTION_DEPTH] = depth + 1
+    try:
+        if depth:
+            async with session.begin_nested():
+                yield session
+            return
+        try:
+            yield session
+            await session.commit()
+        except BaseException:
+            await session.rollback()
+            raise
+    finally:
+        session.info[_TRANSACTION_DEPTH] = depth
+
+
+class AsyncSqlRepository(Generic[T], AsyncPagingRepository, _SqlQueries):
+    """
+    SQL repository for asyncio, with the same options and behavior as `SqlRepository`.
+
+    T: the type of object handled by the repository, must be `easyrepo.model.sql.Entity`.
+
+    session: the session of the repository, created with `expire_on_commit=False` so that saved entities can be read
+    without loading their expired attributes.
+    id_generator: generator of the ids of new entities, assigned on the client side instead of by the database.
+    batch_size: the maximum number of rows inserted per statement by `save_all`.
+    chunk_size: the maximum number of ids sent per query by `find_all_by_id` and `exists_all_by_id`.
+    count_estimator: estimator of the number of rows of the table, run on the synchronous session of the repository,
+    see `SqlRepository`.
+    """
+
+    def __init__(
+            self,
+            session: AsyncSession,
+            id_generator: IdGenerator = None,
+            batch_size: int = 500,
+            chunk_size: int = 500,
+            count_estimator: CountEstimator = None,
+            estimate_threshold: int = 100000
+    ):
+        self._session = session
+        self._id_generator = id_generator
+        self._batch_size = batch_size
+        self._chunk_size = chunk_size
+        self._count_estimator = count_estimator
+        self._estimate_threshold = estimate_threshold
+        self._model = get_args(self.__orig_bases__[0])[0]
+        if type(self._model) == TypeVar:
+            raise ValueError("Missing repository type")
+        if not issubclass(self._model, Entity):
+            raise ValueError(f"Model type {self._model} is not `easyrepo.model.sql.Entity`")
+        _record_statements(session.sync_session, self._model)
+
+    async def count(self, criteria: Criteria = None) -> int:
+        """
+        Returns the number of entities matching the given criteria.
+        """
+        query = select(func.count()).select_from(self._model)
+        if criteria is not None:
+            query = query.where(self._filter_query(criteria))
+        return await self._session.scalar(query)
+
+    async def delete_all(self):
+        """
+        Deletes all entities.
+        """
+        await self._session.execute(delete(self._model))
+
+    async def delete_all_by_id(self, ids: Iterable[Any]):
+        """
+        Deletes all entities with the given IDs.
+        """
+        await self._session.execute(delete(self._model).where(self._model.id.in_(list(ids))))
+
+    async def delete_by_id(self, id: Any):
+        """
+        Deletes the entity with the given id.
+        """
+        await self._session.execute(delete(self._model).where(self._model.id == id))
+
+    async def exists_by_id(self, id: Any) -> bool:
+        """
+        Returns whether an entity with the given id exists.
+        """
+        return await self._session.scalar(select(self._model.id).where(self._model.id == id).limit(1)) is not None
+
+    async def exists_all_by_id(self, ids: Iterable[Any]) -> Dict[Any, bool]:
+        """
+        Returns whether an entity exists for each of the given ids, with a query per chunk of ids.
+        """
+        ids = list(ids)
+        found = set()
+        for chunk in chunks(list(set(ids)), self._chunk_size):
+            found.update(await self._session.scalars(select(self._model.id).where(self._model.id.in_(chunk))))
+        return {id: id in found for id in ids}
+
+    async def find_all(self, sort: Sort = None, criteria: Criteria = None, fields: List[str] = None) -> List[T]:
+        """
+        Returns all entities matching the given criteria, sorted by the given options. With `fields`, only the given
+        columns are selected, returned as dicts.
+        """
+        query = self._select(criteria, fields).order_by(*self._sort_query(sort))
+        return await self._all(query, fields)
+
+    async def find_page(
+            self,
+            page_request: PageRequest,
+            sort: Sort = None,
+            criteria: Criteria = None,
+            fields: List[str] = None,
+            total: TotalCount = TotalCount.EXACT
+    ) -> Page[T]:
+        """
+        Returns a Page of entities matching the given criteria and meeting the paging restriction. With `fields`, only
+        the given columns are selected, returned as dicts. The page and the number of matching entities are fetched by
+        a single statement, see `SqlRepository.find_page`.
+        """
+        query = self._select(criteria, fields).order_by(*self._sort_query(sort)).offset(page_request.offset())
+        estimate = None
+        if criteria is None and total != TotalCount.NONE and self._count_estimator is not None:
+            estimate = self._usable_estimate(await self._session.run_sync(self._count_estimator, self._model), total)
+        if total == TotalCount.NONE or estimate is not None:
+            rows = (await self._session.execute(query.limit(page_request.size + 1))).all()
+            if fields is None:
+                rows = [row[0] for row in rows]
+            return self._uncounted_page(rows, page_request, fields, estimate)
+        query = query.add_columns(func.count().over()).limit(page_request.size)
+        content, total_elements = self._split_total((await self._session.execute(query)).all(), fields)
+        if total_elements is None:
+            total_elements = await self.count(criteria) if page_request.offset() else 0
+        return Page(content=content, page_request=page_request, total_elements=total_elements)
+
+    async def find_slice(self, size: int, sort: Sort = None, after: str = None) -> Slice[T]:
+        """
+        Returns a Slice of entities following the given cursor, sorted entities are seeked from the cursor values
+        instead of being skipped.
+        """
+        sort = (sort or Sort()).with_tiebreaker("id")
+        query = select(self._model)
+        if after is not None:
+            dialect = self._session.sync_session.get_bind(self._model).dialect.name
+            query = query.where(self._keyset_query(sort, decode_cursor(after), dialect))
+        result = (await self._session.scalars(query.order_by(*self._sort_query(sort)).limit(size + 1))).all()
+        next_cursor = None
+        if len(result) > size:
+            next_cursor = encode_cursor([get_value(result[size - 1], o.key) for o in sort.orders])
+        return Slice(content=result[:size], size=size, next_cursor=next_cursor)
+
+    async def find_all_by_id(self, ids: Iterable[Any], fields: List[str] = None) -> List[Optional[T]]:
+        """
+        Returns the entities with the given IDs, in the same order, with None for missing entities. Entities are fetched
+        with a query per chunk of ids. With `fields`, only the given columns are selected, returned as dicts.
+        """
+        ids = list(ids)
+        found = {}
+        for chunk in chunks(list(dict.fromkeys(ids)), self._chunk_size):
+            for entity in await self._all(self._select(fields=fields).where(self._model.id.in_(chunk)), fields):
+                found[get_value(entity, "id")] = entity
+        return [found.get(id) for id in ids]
+
+    async def find_by_id(self, id: Any) -> Optional[T]:
+        """
+        Returns an entity by its id.
+        """
+        return await self._session.get(self._model, id)
+
+    async def iter_all(
+            self,
+            sort: Sort = None,
+            batch_size: int = 1000,
+            fields: List[str] = None
+    ) -> AsyncIterator[T]:
+        """
+        Returns an asynchronous iterator over all entities sorted by the given options, streamed from the database by
+        batches using a server side cursor. With `fields`, only the given columns are selected, returned as dicts.
+        """
+        query = self._select(fields=fields).order_by(*self._sort_query(sort)).execution_options(yield_per=batch_size)
+        if fields is None:
+            async for entity in await self._session.stream_scalars(query):
+                yield entity
+            return
+        keys = self._projected_keys(fields)
+        async for row in await self._session.stream(query):
+            yield dict(zip(keys, row))
+
+    async def save(self, model: T) -> T:
+        """
+        Saves a given entity.
+        """
+        if not isinstance(model, Entity):
+            raise ValueError(f"type {type(model)} not handled by repository.")
+        if model.id is None and self._id_generator is not None:
+            model.id = self._id_generator.next_id()
+        self._session.add(model)
+        await self._commit()
+        return model
+
+    async def save_all(self, models: Iterable[T]) -> List[T]:
+        """
+        Saves all given entities. New entities are inserted in bulk, see `SqlRepository.save_all`.
+        """
+        models = list(models)
+        if any(not isinstance(m, Entity) for m in models):
+            raise ValueError(f"one of type in the list of model is not handled by repository.")
+        new_models = [m for m in models if inspect(m).transient]
+        if self._id_generator is not None:
+            missing_ids = [m for m in new_models if m.id is None]
+            for model, new_id in zip(missing_ids, self._id_generator.next_ids(len(missing_ids))):
+                model.id = new_id
+        if new_models and not inspect(self._model).relationships:
+            await self._bulk_insert(new_models)
+        self._session.add_all(models)
+        await self._session.flush()
+        inserted = self._inserted_values(new_models)
+        await self._commit()
+        self._keep_loaded(inserted)
+        return models
+
+    def transaction(self) -> AsyncContextManager[AsyncSession]:
+        """
+        Returns a context manager grouping the writes of the block in a single commit, see `async_transaction`.
+        """
+        return async_transaction(self._session)
+
+    def _select(self, criteria: Criteria = None, fields: List[str] = None) -> Select:
+        """
+        Build the query of the entities matching the given criteria, or of their projected columns.
+        """
+        query = select(self._model) if fields is None else select(*self._columns(fields))
+        if criteria is not None:
+            query = query.where(self._filter_query(criteria))
+        return query
+
+    async def _all(self, query: Select, fields: Optional[List[str]]) -> List[Any]:
+        """
+        Returns all the results of a query, as entities or as dicts of the projected fields.
+        """
+        if fields is None:
+            return (await self._session.scalars(query)).all()
+        return list(self._map_rows(await self._session.execute(query), fields))
+
+    async def _commit(self):
+        """
+        Commits the pending writes, or only flushes them within a transaction block.
+        """
+        if self._session.info.get(_TRANSACTION_DEPTH):
+            await self._session.flush()
+        else:
+            await self._session.commit()
+
+    async def _bulk_insert(self, models: List[T]):
+        """
+        Inserts new entities with multi-rows statements, see `SqlRepository._bulk_insert`.
+        """
+        dialect = self._session.sync_session.get_bind().dialect
+        table = self._model.__table__
+        for missing_id, chunk in self._insert_batches(models, _supports_returning(dialect)):
+            if missing_id:
+                self._set_returned_ids(chunk, await self._session.execute(self._returning_insert(chunk, dialect)))
+            else:
+                await self._session.execute(insert(table), [row for _, row in chunk])
+            for model, _ in chunk:
+                make_transient_to_detached(model)
+                self._session.add(model)
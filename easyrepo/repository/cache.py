@@ -0,0 +1,257 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Iterable, Iterator, List, Optional
+
+from easyrepo.interface.cache import Cache
+from easyrepo.interface.paging import PagingRepository
+from easyrepo.model.cache import CacheStats
+from easyrepo.model.criteria import Criteria
+from easyrepo.model.paging import PageRequest, Page, Slice, TotalCount
+from easyrepo.model.sorting import Sort
+from easyrepo.repository.index import get_value
+
+_MISSING = object()
+# cached for ids only known to exist, a plain value so that caches can serialize it
+_EXISTS = ("easyrepo.cache", "exists")
+
+
+class LRUCache(Cache):
+    """
+    Thread-safe in-process cache evicting the least recently used entries beyond `max_size` entries.
+
+    ttl: the number of seconds after which entries expire, entries never expire if missing.
+    """
+
+    def __init__(self, max_size: int = 1024, ttl: float = None):
+        if max_size <= 0:
+            raise ValueError("Cache max size must be positive")
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return default
+            value, expires_at = entry
+            if expires_at is not None and expires_at <= time.monotonic():
+                del self._entries[key]
+                return default
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: Hashable, value: Any):
+        expires_at = time.monotonic() + self.ttl if self.ttl is not None else None
+        with self._lock:
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def delete(self, key: Hashable):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class CachingRepository(PagingRepository):
+    """
+    Repository caching the entities of another repository by id. Entries are keyed by `(namespace, id)` so that
+    repositories can share a cache. `delete_all` moves the namespace to a new generation stored in the cache, keying
+    the following entries by `((namespace, generation), id)`, so that previous entries are no longer read and are left
+    to the eviction of the cache without clearing the entries of other namespaces.
+
+    `find_by_id`, `find_all_by_id` and `exists_by_id` are answered from the cache when possible, missing entities are
+    cached as well. Saved entities are written to the cache, or evicted if `write_through` is disabled, and deleted
+    entities are evicted. Other methods are delegated to the wrapped repository. Cached entities are shared between
+    callers and must not be modified in place without being saved.
+
+    repository: the wrapped repository.
+    cache: the cache storing entities, defaults to a `LRUCache`.
+    write_through: whether saved entities are cached instead of being evicted.
+    namespace: the first part of the cache keys, defaults to the name of the model, or of the repository class for
+        repositories of dicts.
+    """
+
+    def __init__(
+            self,
+            repository: PagingRepository,
+            cache: Cache = None,
+            write_through: bool = True,
+            namespace: str = None
+    ):
+        self._repository = repository
+        self._model = getattr(repository, "_model", None)
+        if namespace is None:
+            named = self._model if isinstance(self._model, type) and self._model is not dict else type(repository)
+            namespace = named.__name__
+        self._namespace = namespace
+        self._cache = cache if cache is not None else LRUCache()
+        self._write_through = write_through
+        self._stats = CacheStats()
+        self._stats_lock = threading.Lock()
+
+    def __getattr__(self, name: str) -> Any:
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return getattr(self._repository, name)
+
+    @property
+    def stats(self) -> CacheStats:
+        """
+        Returns a copy of the hit and miss counts of the cache.
+        """
+        with self._stats_lock:
+            return self._stats.copy()
+
+    def count(self, criteria: Criteria = None) -> int:
+        return self._repository.count(criteria)
+
+    def delete_all(self):
+        self._repository.delete_all()
+        generation = self._cache.get((self._namespace,), 0)
+        self._cache.set((self._namespace,), generation + 1)
+
+    def delete_all_by_id(self, ids: Iterable[Any]):
+        ids = list(ids)
+        self._repository.delete_all_by_id(ids)
+        namespace = self._current_namespace()
+        for id in ids:
+            self._cache.delete((namespace, id))
+
+    def delete_by_id(self, id: Any):
+        self._repository.delete_by_id(id)
+        self._cache.delete((self._current_namespace(), id))
+
+    def exists_by_id(self, id: Any) -> bool:
+        """
+        Returns whether an entity with the given id exists, from the cache when the id is cached.
+        """
+        namespace = self._current_namespace()
+        value = self._lookup(namespace, id)
+        if value is not _MISSING:
+            return value is not None
+        exists = self._repository.exists_by_id(id)
+        self._cache.set((namespace, id), _EXISTS if exists else None)
+        return exists
+
+    def exists_all_by_id(self, ids: Iterable[Any]) -> Dict[Any, bool]:
+        return self._repository.exists_all_by_id(ids)
+
+    def find_all(self, sort: Sort = None, criteria: Criteria = None, fields: List[str] = None) -> List[Any]:
+        return self._repository.find_all(sort, criteria, fields)
+
+    def find_all_by_id(self, ids: Iterable[Any], fields: List[str] = None) -> List[Optional[Any]]:
+        """
+        Returns the entities with the given IDs, in the same order, with None for missing entities. Only the entities
+        missing from the cache are fetched, with a single call to the wrapped repository. Projections are not cached
+        and always fetched from the wrapped repository.
+        """
+        if fields is not None:
+            return self._repository.find_all_by_id(ids, fields)
+        ids = list(ids)
+        namespace = self._current_namespace()
+        found = {}
+        for id in dict.fromkeys(ids):
+            value = self._lookup(namespace, id, loaded=True)
+            if value is not _MISSING:
+                found[id] = value
+        missing = [id for id in dict.fromkeys(ids) if id not in found]
+        if missing:
+            for id, model in zip(missing, self._repository.find_all_by_id(missing)):
+                self._cache.set((namespace, id), model)
+                found[id] = model
+        return [found[id] for id in ids]
+
+    def find_by_id(self, id: Any) -> Optional[Any]:
+        """
+        Returns an entity by its id, from the cache when the entity is cached.
+        """
+        namespace = self._current_namespace()
+        value = self._lookup(namespace, id, loaded=True)
+        if value is not _MISSING:
+            return value
+        model = self._repository.find_by_id(id)
+        self._cache.set((namespace, id), model)
+        return model
+
+    def find_page(
+            self,
+            page_request: PageRequest,
+            sort: Sort = None,
+            criteria: Criteria = None,
+            fields: List[str] = None,
+            total: TotalCount = TotalCount.EXACT,
+            **options: Any
+    ) -> Page[Any]:
+        return self._repository.find_page(page_request, sort, criteria, fields, total, **options)
+
+    def find_slice(self, size: int, sort: Sort = None, after: str = None) -> Slice[Any]:
+        return self._repository.find_slice(size, sort, after)
+
+    def iter_all(self, sort: Sort = None, batch_size: int = 1000, fields: List[str] = None) -> Iterator[Any]:
+        return self._repository.iter_all(sort, batch_size, fields)
+
+    def save(self, model: Any, **options: Any) -> Any:
+        result = self._repository.save(model, **options)
+        self._store(self._current_namespace(), result)
+        return result
+
+    def save_all(self, models: Iterable[Any], **options: Any) -> List[Any]:
+        result = self._repository.save_all(models, **options)
+        namespace = self._current_namespace()
+        for model in result:
+            self._store(namespace, model)
+        return result
+
+    def _current_namespace(self) -> Hashable:
+        """
+        Returns the first part of the cache keys of the current generation of the namespace.
+        """
+        generation = self._cache.get((self._namespace,), 0)
+        return (self._namespace, generation) if generation else self._namespace
+
+    def _lookup(self, namespace: Hashable, id: Any, loaded: bool = False) -> Any:
+        """
+        Returns the cached entity of the given id, None if it is known to be missing, or `_MISSING` if it is not cached.
+        Ids only known to exist are not cached entities when `loaded` is set.
+        """
+        value = self._cache.get((namespace, id), _MISSING)
+        hit = value is not _MISSING and not (loaded and isinstance(value, tuple) and value == _EXISTS)
+        with self._stats_lock:
+            if hit:
+                self._stats.hits += 1
+            else:
+                self._stats.misses += 1
+        return value if hit else _MISSING
+
+    def _store(self, namespace: Hashable, model: Any):
+        """
+        Caches a saved entity, or evicts its previous version.
+        """
+        id = _id_of(model)
+        if id is None:
+            return
+        if self._write_through:
+            self._cache.set((namespace, id), model)
+        else:
+            self._cache.delete((namespace, id))
+
+
+def _id_of(model: Any) -> Any:
+    """
+    Returns the id of an entity, mongo documents mapped as dict are identified by `_id`.
+    """
+    id = get_value(model, "id")
+    if id is None and isinstance(model, dict):
+        id = model.get("_id")
+    return id
@@ -0,0 +1,353 @@
+import abc
+import bisect
+import copy
+from typing import Any, Dict, Hashable, Iterable, List, Set, Tuple
+
+from easyrepo.repository.persistent import PersistentMap, PersistentSortedList
+
+_MISSING = object()
+
+
+def get_value(model: Any, key: str) -> Any:
+    """
+    Returns the value of a model property, dotted keys are resolved as nested properties. Missing properties resolve to
+    None.
+    """
+    value = model
+    for part in key.split("."):
+        if value is None:
+            return None
+        if isinstance(value, dict):
+            value = value.get(part)
+        else:
+            value = getattr(value, part, None)
+    return value
+
+
+class Index(abc.ABC):
+    """
+    Secondary index on a model property, mapping property values to entity ids.
+    """
+
+    def __init__(self, key: str):
+        self.key = key
+        self._values: Dict[Hashable, Any] = {}
+
+    def add(self, id: Hashable, model: Any):
+        """
+        Indexes the given entity, replacing any previous entry for the same id.
+        """
+        self.discard(id)
+        value = get_value(model, self.key)
+        self._values[id] = value
+        self._insert(id, value)
+
+    def discard(self, id: Hashable):
+        """
+        Removes the entry of the given id from the index, if any.
+        """
+        if id not in self._values:
+            return
+        self._remove(id, self._values.pop(id))
+
+    def clear(self):
+        """
+        Removes all entries from the index.
+        """
+        self._values.clear()
+        self._clear()
+
+    def load(self, models: Iterable[Tuple[Hashable, Any]]):
+        """
+        Replaces the entries of the index by the given entities, as pairs of id and entity.
+        """
+        self.clear()
+        for id, model in models:
+            self.add(id, model)
+
+    def copy(self) -> "Index":
+        """
+        Returns an independent copy of the index.
+        """
+        index = copy.copy(self)
+        index._values = dict(self._values)
+        return index
+
+    def persistent(self) -> "Index":
+        """
+        Returns an empty index of the same property, copied in constant time by sharing its entries with its copies, for
+        the concurrent repositories updating copies of their indexes. Defaults to an empty copy of the index.
+        """
+        index = self.copy()
+        index.clear()
+        return index
+
+    def value_of(self, id: Hashable) -> Any:
+        """
+        Returns the indexed value of the entity with the given id.
+        """
+        return self._values[id]
+
+    def get(self, value: Any) -> Set[Hashable]:
+        """
+        Returns the ids of the entities whose property equals the given value.
+        """
+        return set(self._lookup(value))
+
+    @abc.abstractmethod
+    def _insert(self, id: Hashable, value: Any):
+        raise NotImplementedError()
+
+    @abc.abstractmethod
+    def _remove(self, id: Hashable, value: Any):
+        raise NotImplementedError()
+
+    @abc.abstractmethod
+    def _clear(self):
+        raise NotImplementedError()
+
+    @abc.abstractmethod
+    def _lookup(self, value: Any) -> Iterable[Hashable]:
+        raise NotImplementedError()
+
+
+class HashIndex(Index):
+    """
+    Index answering equality lookups in constant time. Indexed values must be hashable.
+    """
+
+    def __init__(self, key: str):
+        super().__init__(key)
+        self._entries: Dict[Hashable, Set[Hashable]] = {}
+
+    def copy(self) -> "HashIndex":
+        index = super().copy()
+        index._entries = {k: set(v) for k, v in self._entries.items()}
+        return index
+
+    def persistent(self) -> "HashIndex":
+        return _PersistentHashIndex(self.key)
+
+    def _insert(self, id: Hashable, value: Any):
+        self._entries.setdefault(value, set()).add(id)
+
+    def _remove(self, id: Hashable, value: Any):
+        ids = self._entries[value]
+        ids.discard(id)
+        if not ids:
+            del self._entries[value]
+
+    def _clear(self):
+        self._entries.clear()
+
+    def _lookup(self, value: Any) -> Iterable[Hashable]:
+        return self._entries.get(value, ())
+
+
+class SortedIndex(Index):
+    """
+    Index keeping property values ordered, answering equality and range lookups in logarithmic time. Indexed values
+    must be hashable and comparable with each other. None values are kept apart, found by equality lookups but never
+    within ranges.
+    """
+
+    def __init__(self, key: str):
+        super().__init__(key)
+        self._keys: List[Any] = []
+        self._entries: Dict[Any, Set[Hashable]] = {}
+        self._nones: Set[Hashable] = set()
+
+    def copy(self) -> "SortedIndex":
+        index = super().copy()
+        index._keys = list(self._keys)
+        index._entries = {k: set(v) for k, v in self._entries.items()}
+        index._nones = set(self._nones)
+        return index
+
+    def persistent(self) -> "SortedIndex":
+        return _PersistentSortedIndex(self.key)
+
+    def range(
+            self,
+            gt: Any = None,
+            gte: Any = None,
+            lt: Any = None,
+            lte: Any = None,
+            reverse: bool = False
+    ) -> List[Hashable]:
+        """
+        Returns the ids of the entities whose property is within the given bounds, ordered by property value.
+        """
+        start, end = 0, len(self._keys)
+        if gte is not None:
+            start = bisect.bisect_left(self._keys, gte)
+        if gt is not None:
+            start = max(start, bisect.bisect_right(self._keys, gt))
+        if lte is not None:
+            end = bisect.bisect_right(self._keys, lte)
+        if lt is not None:
+            end = min(end, bisect.bisect_left(self._keys, lt))
+        keys = self._keys[start:end]
+        if reverse:
+            keys.reverse()
+        return [id for k in keys for id in self._entries[k]]
+
+    def _insert(self, id: Hashable, value: Any):
+        if value is None:
+            self._nones.add(id)
+            return
+        ids = self._entries.get(value)
+        if ids is None:
+            ids = self._entries[value] = set()
+            bisect.insort(self._keys, value)
+        ids.add(id)
+
+    def _remove(self, id: Hashable, value: Any):
+        if value is None:
+            self._nones.discard(id)
+            return
+        ids = self._entries[value]
+        ids.discard(id)
+        if not ids:
+            del self._entries[value]
+            del self._keys[bisect.bisect_left(self._keys, value)]
+
+    def _clear(self):
+        self._keys.clear()
+        self._entries.clear()
+        self._nones.clear()
+
+    def _lookup(self, value: Any) -> Iterable[Hashable]:
+        if value is None:
+            return self._nones
+        return self._entries.get(value, ())
+
+
+class _PersistentIndex(Index):
+    """
+    Base of the indexes storing their entries in persistent structures, updated by replacing them so that copies share
+    their entries.
+    """
+
+    def add(self, id: Hashable, model: Any):
+        self.discard(id)
+        value = get_value(model, self.key)
+        self._values = self._values.set(id, value)
+        self._insert(id, value)
+
+    def discard(self, id: Hashable):
+        value = self._values.get(id, _MISSING)
+        if value is _MISSING:
+            return
+        self._values = self._values.delete(id)
+        self._remove(id, value)
+
+    def clear(self):
+        self._values = PersistentMap()
+        self._clear()
+
+    def load(self, models: Iterable[Tuple[Hashable, Any]]):
+        """
+        Replaces the entries of the index by the given entities in linear time, building the persistent structures at
+        once.
+        """
+        values = {id: get_value(model, self.key) for id, model in models}
+        self._values = PersistentMap(values)
+        self._load(values)
+
+    def copy(self) -> "Index":
+        return copy.copy(self)
+
+    def persistent(self) -> "Index":
+        return type(self)(self.key)
+
+
+class _PersistentHashIndex(_PersistentIndex, HashIndex):
+    """
+    Hash index stored in persistent maps.
+    """
+
+    def __init__(self, key: str):
+        super().__init__(key)
+        self._values = PersistentMap()
+        self._entries = PersistentMap()
+
+    def _insert(self, id: Hashable, value: Any):
+        self._entries = self._entries.set(value, self._entries.get(value, PersistentMap()).set(id, True))
+
+    def _remove(self, id: Hashable, value: Any):
+        ids = self._entries[value].delete(id)
+        self._entries = self._entries.set(value, ids) if ids else self._entries.delete(value)
+
+    def _clear(self):
+        self._entries = PersistentMap()
+
+    def _load(self, values: Dict[Hashable, Any]):
+        entries: Dict[Any, Dict[Hashable, bool]] = {}
+        for id, value in values.items():
+            entries.setdefault(value, {})[id] = True
+        self._entries = PersistentMap({v: PersistentMap(ids) for v, ids in entries.items()})
+
+
+class _PersistentSortedIndex(_PersistentIndex, SortedIndex):
+    """
+    Sorted index stored in persistent maps and a persistent sorted list.
+    """
+
+    def __init__(self, key: str):
+        super().__init__(key)
+        self._values = PersistentMap()
+        self._keys = PersistentSortedList()
+        self._entries = PersistentMap()
+        self._nones = PersistentMap()
+
+    def range(
+            self,
+            gt: Any = None,
+            gte: Any = None,
+            lt: Any = None,
+            lte: Any = None,
+            reverse: bool = False
+    ) -> List[Hashable]:
+        keys = self._keys.range(gt=gt, gte=gte, lt=lt, lte=lte)
+        if reverse:
+            keys.reverse()
+        return [id for k in keys for id in self._entries[k]]
+
+    def _insert(self, id: Hashable, value: Any):
+        if value is None:
+            self._nones = self._nones.set(id, True)
+            return
+        ids = self._entries.get(value)
+        if ids is None:
+            ids = PersistentMap()
+            self._keys = self._keys.add(value)
+        self._entries = self._entries.set(value, ids.set(id, True))
+
+    def _remove(self, id: Hashable, value: Any):
+        if value is None:
+            self._nones = self._nones.delete(id)
+            return
+        ids = self._entries[value].delete(id)
+        if ids:
+            self._entries = self._entries.set(value, ids)
+        else:
+            self._entries = self._entries.delete(value)
+            self._keys = self._keys.remove(value)
+
+    def _clear(self):
+        self._keys = PersistentSortedList()
+        self._entries = PersistentMap()
+        self._nones = PersistentMap()
+
+    def _load(self, values: Dict[Hashable, Any]):
+        entries: Dict[Any, Dict[Hashable, bool]] = {}
+        nones = {}
+        for id, value in values.items():
+            if value is None:
+                nones[id] = True
+            else:
+                entries.setdefault(value, {})[id] = True
+        self._keys = PersistentSortedList(list(entries))
+        self._entries = PersistentMap({v: PersistentMap(ids) for v, ids in entries.items()})
+        self._nones = PersistentMap(nones)
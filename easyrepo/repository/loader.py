@@ -0,0 +1,206 @@
+import asyncio
+import inspect
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Dict, Hashable, Iterable, List, Optional, Set, Tuple
+
+from easyrepo.interface.crud import CRUDRepository
+
+
+class _Loader:
+    """
+    Base of the loaders, memoizing the futures of the entities requested by id.
+    """
+
+    def __init__(self, repository: CRUDRepository, window: float):
+        self._repository = repository
+        self._window = window
+        self._futures: Dict[Hashable, Any] = {}
+        self._pending: List[Tuple[Hashable, Any]] = []
+
+    def clear(self, id: Hashable):
+        """
+        Forgets the entity of the given id, so that it is fetched again on the next load.
+        """
+        self._futures.pop(id, None)
+
+    def clear_all(self):
+        """
+        Forgets all the loaded entities.
+        """
+        self._futures.clear()
+
+    def _take_pending(self) -> Tuple[List[Hashable], List[Any]]:
+        """
+        Returns the pending ids with their futures, and starts a new batch.
+        """
+        pending, self._pending = self._pending, []
+        return [id for id, _ in pending], [f for _, f in pending]
+
+    def _fail(self, ids: List[Hashable], futures: List[Any], error: BaseException):
+        """
+        Propagates a failed batch to its futures, which are forgotten so that their ids can be loaded again. Futures of
+        cancelled batches are cancelled.
+        """
+        for id, future in zip(ids, futures):
+            if self._futures.get(id) is future:
+                del self._futures[id]
+            if future.done():
+                continue
+            if isinstance(error, asyncio.CancelledError):
+                future.cancel()
+            else:
+                future.set_exception(error)
+
+
+class BatchLoader(_Loader):
+    """
+    Loader coalescing the `find_by_id` calls of concurrent threads into `find_all_by_id` calls.
+
+    The first thread loading an id waits for `window` seconds, then fetches all the ids requested meanwhile with a
+    single `find_all_by_id` call. Loaded entities are memoized, a loader is meant to live as long as a request.
+
+    repository: the repository to load entities from.
+    window: the number of seconds ids are collected before being fetched.
+    """
+
+    def __init__(self, repository: CRUDRepository, window: float = 0.001):
+        super().__init__(repository, window)
+        self._lock = threading.Lock()
+
+    def load(self, id: Hashable) -> Optional[Any]:
+        """
+        Returns the entity with the given id, or None if missing.
+        """
+        return self.load_many([id])[0]
+
+    def load_many(self, ids: Iterable[Hashable]) -> List[Optional[Any]]:
+        """
+        Returns the entities with the given ids, in the same order, with None for missing entities.
+        """
+        with self._lock:
+            leader = not self._pending
+            futures = [self._future(id) for id in ids]
+            leader = leader and bool(self._pending)
+        if leader:
+            try:
+                time.sleep(self._window)
+            except BaseException as e:
+                with self._lock:
+                    self._fail(*self._take_pending(), e)
+                raise
+            self._dispatch()
+        return [f.result() for f in futures]
+
+    def clear(self, id: Hashable):
+        with self._lock:
+            super().clear(id)
+
+    def clear_all(self):
+        with self._lock:
+            super().clear_all()
+
+    def _future(self, id: Hashable) -> Future:
+        """
+        Returns the future of the entity with the given id, queuing the id if not loaded yet.
+        """
+        future = self._futures.get(id)
+        if future is None:
+            future = self._futures[id] = Future()
+            self._pending.append((id, future))
+        return future
+
+    def _dispatch(self):
+        """
+        Fetches the pending ids. Errors are set on the futures of the batch, interruptions such as `KeyboardInterrupt`
+        are raised as well so that the waiting threads never hang.
+        """
+        with self._lock:
+            ids, futures = self._take_pending()
+        try:
+            models = self._repository.find_all_by_id(ids)
+        except BaseException as e:
+            with self._lock:
+                self._fail(ids, futures, e)
+            if not isinstance(e, Exception):
+                raise
+            return
+        for future, model in zip(futures, models):
+            if not future.done():
+                future.set_result(model)
+
+
+class AsyncBatchLoader(_Loader):
+    """
+    Loader coalescing the `find_by_id` calls of asyncio tasks into `find_all_by_id` calls.
+
+    Ids requested during the same event loop iteration, or within `window` seconds if set, are fetched with a single
+    `find_all_by_id` call. Blocking repositories are called in the default executor of the loop. Loaded entities are
+    memoized, a loader is meant to live as long as a request. Cancelling a task loading an entity does not cancel its
+    load for the other tasks waiting for it.
+
+    repository: the repository to load entities from, blocking or asynchronous.
+    window: the number of seconds ids are collected before being fetched, defaults to the current loop iteration.
+    """
+
+    def __init__(self, repository: Any, window: float = 0):
+        super().__init__(repository, window)
+        self._tasks: Set[asyncio.Task] = set()
+
+    async def load(self, id: Hashable) -> Optional[Any]:
+        """
+        Returns the entity with the given id, or None if missing.
+        """
+        return await asyncio.shield(self._future(id))
+
+    async def load_many(self, ids: Iterable[Hashable]) -> List[Optional[Any]]:
+        """
+        Returns the entities with the given ids, in the same order, with None for missing entities.
+        """
+        return list(await asyncio.gather(*[asyncio.shield(self._future(id)) for id in ids]))
+
+    def _future(self, id: Hashable) -> asyncio.Future:
+        """
+        Returns the future of the entity with the given id, queuing the id if not loaded yet.
+        """
+        future = self._futures.get(id)
+        if future is None or future.cancelled():
+            loop = asyncio.get_running_loop()
+            future = self._futures[id] = loop.create_future()
+            self._pending.append((id, future))
+            if len(self._pending) == 1:
+                if self._window:
+                    loop.call_later(self._window, self._schedule)
+                else:
+                    loop.call_soon(self._schedule)
+        return future
+
+    def _schedule(self):
+        """
+        Starts fetching the pending ids, keeping a reference to the task until it is done.
+        """
+        ids, futures = self._take_pending()
+        task = asyncio.ensure_future(self._dispatch(ids, futures))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _dispatch(self, ids: List[Hashable], futures: List[asyncio.Future]):
+        """
+        Fetches the given ids. Errors are set on the futures of the batch, cancellations and interruptions are raised
+        as well so that the waiting tasks never hang.
+        """
+        find_all_by_id = self._repository.find_all_by_id
+        try:
+            if inspect.iscoroutinefunction(find_all_by_id):
+                models = await find_all_by_id(ids)
+            else:
+                models = await asyncio.get_running_loop().run_in_executor(None, find_all_by_id, ids)
+        except BaseException as e:
+            self._fail(ids, futures, e)
+            if not isinstance(e, Exception):
+                raise
+            return
+        for future, model in zip(futures, models):
+            if not future.done():
+                future.set_result(model)
@@ -1,121 +1,750 @@
-from typing import Iterable, Optional, TypeVar, Generic, get_args, List
+import functools
+import heapq
+import itertools
+import threading
+from collections.abc import Mapping, ValuesView
+from contextlib import contextmanager
+from typing import (
+    Any, Callable, Collection, Dict, Iterable, Iterator, Optional, Set, Tuple, TypeVar, Generic, get_args, List
+)
 
 from pydantic import BaseModel
 
 from easyrepo import PagingRepository
-from easyrepo.model.paging import PageRequest, Page
+from easyrepo.model.criteria import Criteria, Eq, In, Range, Exists, And, Or, Not
+from easyrepo.model.identity import IdGenerator, SequenceIdGenerator
+from easyrepo.model.paging import PageRequest, Page, Slice, TotalCount, encode_cursor, decode_cursor
 from easyrepo.model.sorting import Sort
+from easyrepo.repository.index import Index, SortedIndex, get_value
+from easyrepo.repository.persistent import PersistentMap
+from easyrepo.repository.wal import WriteAheadLog, SAVE, DELETE, CLEAR
 
 T = TypeVar("T")
 
+_MISSING = object()
+
+# persistent stripes are rebuilt by writes of at least 1/_REBUILD_RATIO of their entities
+_REBUILD_RATIO = 8
+
 
 class MemoryRepository(Generic[T], PagingRepository):
     """
     Memory repository.
 
     T: the type of object handled by the repository, can be a dict or `pydantic.BaseModel`.
+
+    indexes: secondary indexes maintained on entity properties.
+    concurrent: whether the repository is shared between threads. Entities and their indexes are then split by id into
+    `stripes`, each locked by the writes updating it. Stripes are stored in persistent structures, so that writes apply
+    on copies of the stripes they touch, made in constant time and updated in logarithmic time, published together once
+    complete. Reads never lock and always see a consistent snapshot. Unsorted entities are not returned in insertion
+    order.
+    wal: write-ahead log persisting the entities, which are reloaded from it on creation. The repository must then be
+    closed, or used as a context manager, to sync and close the log.
+    id_generator: generator of the ids of new entities, defaults to a sequence of integers.
+    stripes: the number of stripes in concurrent mode, the writes of different stripes run in parallel.
     """
 
-    def __init__(self):
-        self._data = {}
-        model = get_args(self.__orig_bases__[0])[0]
+    def __init__(
+            self,
+            indexes: Iterable[Index] = None,
+            concurrent: bool = False,
+            wal: WriteAheadLog = None,
+            id_generator: IdGenerator = None,
+            stripes: int = 16
+    ):
+        model = self._model = get_args(self.__orig_bases__[0])[0]
         if type(model) == TypeVar:
             raise ValueError("Missing repository type")
         if not issubclass(model, (BaseModel, dict)):
             raise ValueError(f"Model type {model} is not dict or `pydantic.BaseModel`")
+        self._data = wal.load() if wal is not None else {}
+        self._id_generator = id_generator or SequenceIdGenerator()
+        for id in self._data:
+            self._id_generator.observe(id)
+        self._indexes: Dict[str, Index] = {i.key: i for i in indexes or []}
+        for id, entity in self._data.items():
+            for index in self._indexes.values():
+                index.add(id, entity)
+        self._locks = None
+        self._publish_lock = threading.Lock()
+        self._stripes = None
+        if concurrent:
+            self._locks = [threading.Lock() for _ in range(stripes)]
+            self._stripes = _split(self._data, self._indexes, stripes)
+            self._data = None
+        self._wal = wal
+
+    def __enter__(self) -> "MemoryRepository[T]":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        """
+        Syncs and closes the write-ahead log, if any.
+        """
+        if self._wal is not None:
+            self._wal.close()
 
-    def count(self) -> int:
+    def count(self, criteria: Criteria = None) -> int:
         """
-        Returns the number of entities available.
+        Returns the number of entities matching the given criteria.
         """
-        return len(self._data)
+        if criteria is None:
+            return len(self._read()[0])
+        return len(self._select(criteria))
 
     def delete_all(self):
         """
         Deletes all entities.
         """
-        self._data.clear()
+        with self._write() as writes:
+            for stripe in writes.stripes():
+                stripe.clear()
+            writes.log(CLEAR)
 
     def delete_all_by_id(self, ids: Iterable[int]):
         """
         Deletes all entities with the given IDs.
         """
-        for id in ids:
-            self._data.pop(id)
+        ids = list(ids)
+        with self._write(ids) as writes:
+            for stripe, stripe_ids in writes.group(ids).items():
+                stripe.delete_many(stripe_ids)
+            writes.log(DELETE, ids)
 
     def delete_by_id(self, id: int):
         """
         Deletes the entity with the given id.
         """
-        self._data.pop(id)
+        with self._write([id]) as writes:
+            writes.stripe(id).delete(id)
+            writes.log(DELETE, [id])
 
     def exists_by_id(self, id: int) -> bool:
         """
         Returns whether a document with the given id exists.
         """
-        return self._data.get(id, None) is not None
+        return self._read()[0].get(id, None) is not None
 
-    def find_all(self, sort: Sort = None) -> List[T]:
+    def exists_all_by_id(self, ids: Iterable[int]) -> Dict[int, bool]:
         """
-        Returns all entities sorted by the given options.
+        Returns whether an entity exists for each of the given ids.
         """
-        return list(self._data.values())
+        data = self._read()[0]
+        return {id: id in data for id in ids}
 
-    def find_page(self, page_request: PageRequest, sort: Sort = None) -> Page[T]:
+    def find_all(self, sort: Sort = None, criteria: Criteria = None, fields: List[str] = None) -> List[T]:
         """
-        Returns a Page of entities meeting the paging restriction.
+        Returns all entities matching the given criteria, sorted by the given options. With `fields`, entities are
+        returned as dicts of their id and the given properties.
         """
-        result = self.find_all(sort)[page_request.offset():page_request.offset() + page_request.size]
-        return Page(content=result, page_request=page_request, total_elements=self.count())
+        result = list(self._select(criteria))
+        if sort is not None:
+            for order in reversed(sort.orders):
+                result.sort(key=_order_key(order.key), reverse=order.direction.is_descending())
+        return _project_all(result, fields)
 
-    def find_all_by_id(self, ids: Iterable[int]) -> List[T]:
+    def find_page(
+            self,
+            page_request: PageRequest,
+            sort: Sort = None,
+            criteria: Criteria = None,
+            fields: List[str] = None,
+            total: TotalCount = TotalCount.EXACT
+    ) -> Page[T]:
         """
-        Returns all entities with the given IDs.
+        Returns a Page of entities matching the given criteria and meeting the paging restriction. Only the entities up
+        to the end of the page are selected, without sorting the whole repository. With `fields`, entities are returned
+        as dicts of their id and the given properties. Entities are always counted exactly, unless the total is not
+        requested.
         """
-        return list({k: self._data[k] for k in ids}.values())
+        entities = self._select(criteria)
+        start, end = page_request.offset(), page_request.offset() + page_request.size
+        if sort is None or not sort.orders:
+            result = list(itertools.islice(entities, start, end))
+        else:
+            result = heapq.nsmallest(end, entities, key=_sort_key(sort))[start:]
+        if total == TotalCount.NONE:
+            return Page(content=_project_all(result, fields), page_request=page_request, has_more=len(entities) > end)
+        return Page(content=_project_all(result, fields), page_request=page_request, total_elements=len(entities))
+
+    def find_slice(self, size: int, sort: Sort = None, after: str = None) -> Slice[T]:
+        """
+        Returns a Slice of entities following the given cursor, only the entities up to the end of the slice are
+        selected.
+        """
+        sort = (sort or Sort()).with_tiebreaker("id")
+        keys = [o.key for o in sort.orders]
+        values_key = _values_key(sort)
+        key = _sort_key(sort)
+        candidates = self._read()[0].values()
+        if after is not None:
+            boundary = values_key(decode_cursor(after))
+            candidates = (m for m in candidates if key(m) > boundary)
+        result = heapq.nsmallest(size + 1, candidates, key=key)
+        next_cursor = encode_cursor([get_value(result[size - 1], k) for k in keys]) if len(result) > size else None
+        return Slice(content=result[:size], size=size, next_cursor=next_cursor)
+
+    def find_all_by_id(self, ids: Iterable[int], fields: List[str] = None) -> List[Optional[T]]:
+        """
+        Returns the entities with the given IDs, in the same order, with None for missing entities. With `fields`,
+        entities are returned as dicts of their id and the given properties.
+        """
+        data = self._read()[0]
+        return _project_all([data.get(id) for id in ids], fields)
 
     def find_by_id(self, id: int) -> Optional[T]:
         """
         Returns an entity by its id.
         """
-        return self._data.get(id)
+        return self._read()[0].get(id)
+
+    def find_by(self, **values: Any) -> List[T]:
+        """
+        Returns all entities whose properties equal the given values, using the declared indexes when available.
+        """
+        data, indexes = self._read()
+        id_sets = [indexes[k].get(v) for k, v in values.items() if k in indexes]
+        if id_sets:
+            ids = set.intersection(*sorted(id_sets, key=len))
+            candidates = [data[id] for id in ids]
+        else:
+            candidates = data.values()
+        others = [(k, v) for k, v in values.items() if k not in indexes]
+        return [m for m in candidates if all(get_value(m, k) == v for k, v in others)]
+
+    def find_all_where(self, key: str, gt: Any = None, gte: Any = None, lt: Any = None, lte: Any = None) -> List[T]:
+        """
+        Returns all entities whose property is within the given bounds, ordered by this property. Uses the declared
+        sorted index of the property when available.
+        """
+        data, indexes = self._read()
+        index = indexes.get(key)
+        if isinstance(index, _SORTED_INDEXES):
+            return [data[id] for id in index.range(gt=gt, gte=gte, lt=lt, lte=lte)]
+        result = [m for m in data.values() if _in_range(get_value(m, key), gt, gte, lt, lte)]
+        return sorted(result, key=lambda m: get_value(m, key))
+
+    def iter_all(self, sort: Sort = None, batch_size: int = 1000, fields: List[str] = None) -> Iterator[T]:
+        """
+        Returns an iterator over all entities sorted by the given options, unaffected by later writes. In concurrent
+        mode, unsorted entities are iterated from the current snapshot without being copied. With `fields`, entities
+        are returned as dicts of their id and the given properties.
+        """
+        if sort is not None:
+            result = iter(self.find_all(sort))
+        elif self._locks is not None:
+            result = iter(self._read()[0].values())
+        else:
+            result = iter(list(self._data.values()))
+        return result if fields is None else (_project(m, fields) for m in result)
 
     def save(self, model: T) -> T:
         """
         Saves a given entity.
         """
-        next_id = len(self._data) + 1
+        id = self._assign_id(model, self._read()[0])
+        with self._write([id]) as writes:
+            writes.stripe(id).save(id, model)
+            writes.log(SAVE, {id: model})
+            return model
+
+    def save_all(self, models: Iterable[T]) -> List[T]:
+        """
+        Saves all given entities.
+        """
+        models = list(models)
+        batch_ids = {get_value(m, "id") for m in models} - {None}
+        reserved_ids = iter(self._id_generator.next_ids(sum(1 for m in models if get_value(m, "id") is None)))
+        data = self._read()[0]
+        ids = [self._assign_id(m, data, reserved_ids, batch_ids) for m in models]
+        with self._write(ids) as writes:
+            saved = dict(zip(ids, models))
+            for stripe, stripe_ids in writes.group(saved).items():
+                stripe.save_many({id: saved[id] for id in stripe_ids})
+            writes.log(SAVE, dict(zip(ids, models)))
+            return models
+
+    def _select(self, criteria: Optional[Criteria]) -> Collection[T]:
+        """
+        Returns the entities matching the given criteria, only checking the entities selected by the declared indexes
+        when the criteria allow it.
+        """
+        data, indexes = self._read()
+        if criteria is None:
+            return data.values()
+        ids = _candidates(criteria, indexes)
+        candidates = data.values() if ids is None else (data[id] for id in ids)
+        matches = _matches(criteria)
+        return [m for m in candidates if matches(m)]
+
+    def _read(self) -> Tuple[Dict[Any, T], Dict[str, Index]]:
+        """
+        Returns the entities and their indexes, as a consistent snapshot of all stripes in concurrent mode.
+        """
+        if self._locks is None:
+            return self._data, self._indexes
+        stripes = self._stripes
+        return _StripedData(stripes), {k: _striped_index([s.indexes[k] for s in stripes]) for k in self._indexes}
+
+    @contextmanager
+    def _write(self, ids: Iterable[Any] = None) -> Iterator["_Writes"]:
+        """
+        Provides the stripes holding the given ids to update, or all stripes without ids. Updates are discarded if the
+        block fails or if its log record cannot be appended. Without concurrency, the entities are updated in place and
+        the previous entities of the given ids, or all entities, are restored on failure. In concurrent mode, the
+        stripes are locked, in order so that writes never deadlock, and updated on copies published at the end of the
+        block once its record is appended.
+        """
+        if self._locks is None:
+            stripe = _Stripe(self._data, self._indexes)
+            previous = dict(self._data) if ids is None else {id: self._data.get(id, _MISSING) for id in ids}
+            writes = _Writes({0: stripe}, 1)
+            try:
+                yield writes
+                self._append(writes.record)
+            except BaseException:
+                stripe.restore(previous, ids is None)
+                raise
+            self._compact(lambda: self._data)
+            return
+        count = len(self._locks)
+        positions = range(count) if ids is None else sorted({hash(id) % count for id in ids})
+        locked = []
+        try:
+            for position in positions:
+                self._locks[position].acquire()
+                locked.append(position)
+            writes = _Writes({p: self._stripes[p].copy() for p in positions}, count)
+            yield writes
+            with self._publish_lock:
+                self._append(writes.record)
+                stripes = list(self._stripes)
+                for position, stripe in writes.copies.items():
+                    stripes[position] = stripe
+                self._stripes = tuple(stripes)
+                self._compact(lambda: {k: v for s in self._stripes for k, v in s.data.items()})
+        finally:
+            for position in locked:
+                self._locks[position].release()
+
+    def _append(self, record: Optional[Tuple[str, Any]]):
+        """
+        Appends a write to the write-ahead log, if any.
+        """
+        if self._wal is not None and record is not None:
+            self._wal.append(*record)
+
+    def _compact(self, data: Callable[[], Dict[Any, T]]):
+        """
+        Compacts the write-ahead log into a snapshot of all entities when it grew enough.
+        """
+        if self._wal is not None and self._wal.needs_snapshot():
+            self._wal.snapshot(data())
+
+    def _assign_id(
+            self,
+            model: T,
+            data: Dict[Any, T],
+            reserved_ids: Iterator[Any] = None,
+            batch_ids: Set[Any] = None
+    ) -> Any:
+        """
+        Returns the id of a given entity. New entities get the first id free in the given entities among the reserved
+        ones, or a generated one. Ids in `batch_ids`, the ids of the entities saved along with the given one, are not
+        free either, and the assigned id is added to them.
+        """
         if isinstance(model, dict):
-            return self._save_dict_model(model, next_id)
+            id = model.get("id")
         elif isinstance(model, BaseModel):
-            return self._save_pydantic_model(model, next_id)
+            id = getattr(model, "id", None)
         else:
             raise ValueError(f"type {type(model)} not handled by repository.")
+        if id is not None:
+            self._id_generator.observe(id)
+            return id
+        id = next(reserved_ids, None) if reserved_ids is not None else None
+        batch_ids = batch_ids if batch_ids is not None else set()
+        while id is None or id in data or id in batch_ids:
+            id = self._id_generator.next_id()
+        batch_ids.add(id)
+        if isinstance(model, dict):
+            model["id"] = id
+        else:
+            model.id = id
+        return id
 
-    def save_all(self, models: Iterable[T]) -> List[T]:
+
+class _Stripe:
+    """
+    Entities of a repository, or part of them in concurrent mode, with their indexes, updated in place.
+    """
+    __slots__ = ("data", "indexes")
+
+    def __init__(self, data: Dict[Any, Any], indexes: Dict[str, Index]):
+        self.data = data
+        self.indexes = indexes
+
+    def save(self, id: Any, model: Any):
         """
-        Saves all given entities.
+        Saves a given entity with the given id.
         """
-        return [self.save(entity) for entity in models]
+        self.data[id] = model
+        for index in self.indexes.values():
+            index.add(id, model)
 
-    def _save_dict_model(self, model: dict, next_id: int):
+    def delete(self, id: Any):
         """
-        Save a dict type model.
+        Deletes the entity with the given id, raises a KeyError if missing.
         """
-        if "id" in model:
-            self._data[model["id"]] = model
-            return model
-        model["id"] = next_id
-        self._data[next_id] = model
-        return model
+        self.data.pop(id)
+        for index in self.indexes.values():
+            index.discard(id)
 
-    def _save_pydantic_model(self, model: BaseModel, next_id: int):
+    def save_many(self, models: Dict[Any, Any]):
         """
-        Save a pydantic.BaseModel subclass type model.
+        Saves the given entities by id.
         """
-        if hasattr(model, "id") and model.id is not None:
-            self._data[model.id] = model
-            return model
-        model.id = next_id
-        self._data[next_id] = model
-        return model
+        for id, model in models.items():
+            self.save(id, model)
+
+    def delete_many(self, ids: List[Any]):
+        """
+        Deletes the entities with the given ids, raises a KeyError if one is missing.
+        """
+        for id in ids:
+            self.delete(id)
+
+    def clear(self):
+        """
+        Deletes all entities.
+        """
+        self.data.clear()
+        for index in self.indexes.values():
+            index.clear()
+
+    def restore(self, previous: Dict[Any, Any], all_ids: bool):
+        """
+        Restores the given previous entities by id, missing ones being `_MISSING`. Other entities are deleted if the
+        previous entities are all the entities.
+        """
+        if all_ids:
+            self.clear()
+        for id, model in previous.items():
+            if model is not _MISSING:
+                self.save(id, model)
+            elif id in self.data:
+                self.delete(id)
+
+
+class _PersistentStripe(_Stripe):
+    """
+    Part of the entities of a concurrent repository, with their indexes, stored in persistent structures. Updates
+    replace the structures of the stripe, leaving its copies unchanged.
+    """
+    __slots__ = ()
+
+    def copy(self) -> "_PersistentStripe":
+        return _PersistentStripe(self.data, {k: i.copy() for k, i in self.indexes.items()})
+
+    def save(self, id: Any, model: Any):
+        self.data = self.data.set(id, model)
+        for index in self.indexes.values():
+            index.add(id, model)
+
+    def delete(self, id: Any):
+        self.data = self.data.delete(id)
+        for index in self.indexes.values():
+            index.discard(id)
+
+    def save_many(self, models: Dict[Any, Any]):
+        """
+        Saves the given entities by id, rebuilding the stripe in linear time when they are many compared to its size.
+        """
+        if len(models) * _REBUILD_RATIO < len(self.data):
+            super().save_many(models)
+            return
+        data = dict(self.data.items())
+        data.update(models)
+        self.load(data)
+
+    def delete_many(self, ids: List[Any]):
+        """
+        Deletes the entities with the given ids, rebuilding the stripe in linear time when they are many compared to
+        its size.
+        """
+        if len(ids) * _REBUILD_RATIO < len(self.data):
+            super().delete_many(ids)
+            return
+        data = dict(self.data.items())
+        for id in ids:
+            del data[id]
+        self.load(data)
+
+    def clear(self):
+        self.data = PersistentMap()
+        for index in self.indexes.values():
+            index.clear()
+
+    def load(self, data: Dict[Any, Any]):
+        """
+        Replaces the entities of the stripe by the given ones.
+        """
+        self.data = PersistentMap(data)
+        for index in self.indexes.values():
+            index.load(data.items())
+
+
+class _Writes:
+    """
+    Stripes updated by a write, and its log record.
+    """
+
+    def __init__(self, copies: Dict[int, _Stripe], count: int):
+        self.copies = copies
+        self.record: Optional[Tuple[str, Any]] = None
+        self._count = count
+
+    def stripe(self, id: Any) -> _Stripe:
+        """
+        Returns the stripe to update for the given id.
+        """
+        return self.copies[hash(id) % self._count]
+
+    def group(self, ids: Iterable[Any]) -> Dict[_Stripe, List[Any]]:
+        """
+        Returns the given ids by stripe to update.
+        """
+        groups: Dict[_Stripe, List[Any]] = {}
+        for id in ids:
+            groups.setdefault(self.stripe(id), []).append(id)
+        return groups
+
+    def stripes(self) -> Iterable[_Stripe]:
+        """
+        Returns all stripes to update.
+        """
+        return self.copies.values()
+
+    def log(self, operation: str, payload: Any = None):
+        """
+        Sets the record appended to the write-ahead log once the write is applied.
+        """
+        self.record = (operation, payload)
+
+
+class _StripedData(Mapping):
+    """
+    Read-only view of the entities of all stripes.
+    """
+
+    def __init__(self, stripes: Tuple[_Stripe, ...]):
+        self._data = [s.data for s in stripes]
+
+    def __getitem__(self, id: Any) -> Any:
+        return self._data[hash(id) % len(self._data)][id]
+
+    def get(self, id: Any, default: Any = None) -> Any:
+        return self._data[hash(id) % len(self._data)].get(id, default)
+
+    def __contains__(self, id: Any) -> bool:
+        return id in self._data[hash(id) % len(self._data)]
+
+    def __iter__(self) -> Iterator[Any]:
+        return itertools.chain.from_iterable(self._data)
+
+    def __len__(self) -> int:
+        return sum(len(d) for d in self._data)
+
+    def values(self) -> ValuesView:
+        return _StripedValues(self)
+
+
+class _StripedValues(ValuesView):
+
+    def __iter__(self) -> Iterator[Any]:
+        return itertools.chain.from_iterable(d.values() for d in self._mapping._data)
+
+
+class _StripedIndex:
+    """
+    Read-only view of the indexes of a property in all stripes.
+    """
+
+    def __init__(self, indexes: List[Index]):
+        self._indexes = indexes
+
+    def get(self, value: Any) -> Set[Any]:
+        return set().union(*[i.get(value) for i in self._indexes])
+
+
+class _StripedSortedIndex(_StripedIndex):
+    """
+    Read-only view of the sorted indexes of a property in all stripes.
+    """
+
+    def range(
+            self,
+            gt: Any = None,
+            gte: Any = None,
+            lt: Any = None,
+            lte: Any = None,
+            reverse: bool = False
+    ) -> List[Any]:
+        count = len(self._indexes)
+        ranges = [i.range(gt=gt, gte=gte, lt=lt, lte=lte, reverse=reverse) for i in self._indexes]
+        key = lambda id: self._indexes[hash(id) % count].value_of(id)  # noqa: E731
+        return list(heapq.merge(*ranges, key=key, reverse=reverse))
+
+
+_SORTED_INDEXES = (SortedIndex, _StripedSortedIndex)
+
+
+def _striped_index(indexes: List[Index]) -> _StripedIndex:
+    """
+    Returns a view of the given indexes of the stripes.
+    """
+    return _StripedSortedIndex(indexes) if isinstance(indexes[0], SortedIndex) else _StripedIndex(indexes)
+
+
+def _split(data: Dict[Any, Any], indexes: Dict[str, Index], count: int) -> Tuple[_PersistentStripe, ...]:
+    """
+    Splits the given entities and their indexes into persistent stripes by id, the given indexes are emptied.
+    """
+    for index in indexes.values():
+        index.clear()
+    parts: List[Dict[Any, Any]] = [{} for _ in range(count)]
+    for id, model in data.items():
+        parts[hash(id) % count][id] = model
+    stripes = []
+    for part in parts:
+        stripe = _PersistentStripe(PersistentMap(), {k: i.persistent() for k, i in indexes.items()})
+        stripe.load(part)
+        stripes.append(stripe)
+    return tuple(stripes)
+
+
+def _project(model: Any, fields: List[str]) -> Optional[dict]:
+    """
+    Returns a dict of the id and the given properties of an entity, dotted keys are set as nested dicts.
+    """
+    if model is None:
+        return None
+    result = {"id": get_value(model, "id")}
+    for field in fields:
+        target = result
+        *parents, key = field.split(".")
+        for parent in parents:
+            target = target.setdefault(parent, {})
+        target[key] = get_value(model, field)
+    return result
+
+
+def _project_all(models: List[Any], fields: Optional[List[str]]) -> List[Any]:
+    """
+    Returns the given entities, projected on the given properties if any.
+    """
+    if fields is None:
+        return models
+    return [_project(m, fields) for m in models]
+
+
+def _in_range(value: Any, gt: Any = None, gte: Any = None, lt: Any = None, lte: Any = None) -> bool:
+    """
+    Returns whether a property value is within the given bounds, None values never are.
+    """
+    if value is None:
+        return False
+    if (gt is not None and value <= gt) or (gte is not None and value < gte):
+        return False
+    if (lt is not None and value >= lt) or (lte is not None and value > lte):
+        return False
+    return True
+
+
+def _matches(criteria: Criteria) -> Callable[[Any], bool]:
+    """
+    Build the predicate of the entities matching the given criteria.
+    """
+    if isinstance(criteria, Eq):
+        return lambda model: get_value(model, criteria.key) == criteria.value
+    if isinstance(criteria, In):
+        return lambda model: get_value(model, criteria.key) in criteria.values
+    if isinstance(criteria, Range):
+        bounds = criteria.gt, criteria.gte, criteria.lt, criteria.lte
+        return lambda model: _in_range(get_value(model, criteria.key), *bounds)
+    if isinstance(criteria, Exists):
+        return lambda model: get_value(model, criteria.key) is not None
+    if isinstance(criteria, (And, Or)):
+        predicates = [_matches(c) for c in criteria.criteria]
+        combine = all if isinstance(criteria, And) else any
+        return lambda model: combine(p(model) for p in predicates)
+    if isinstance(criteria, Not):
+        predicate = _matches(criteria.criteria)
+        return lambda model: not predicate(model)
+    raise ValueError(f"criteria {type(criteria)} not handled by repository.")
+
+
+def _candidates(criteria: Criteria, indexes: Dict[str, Index]) -> Optional[Set[Any]]:
+    """
+    Returns the ids of the entities possibly matching the given criteria according to the declared indexes, or None if
+    the indexes cannot narrow the entities.
+    """
+    if isinstance(criteria, (Eq, In, Range)):
+        index = indexes.get(criteria.key)
+        if isinstance(criteria, Range):
+            if not isinstance(index, _SORTED_INDEXES):
+                return None
+            return set(index.range(gt=criteria.gt, gte=criteria.gte, lt=criteria.lt, lte=criteria.lte))
+        values = [criteria.value] if isinstance(criteria, Eq) else criteria.values
+        if index is None:
+            return None
+        return set().union(*[index.get(v) for v in values])
+    if isinstance(criteria, And):
+        id_sets = [ids for ids in (_candidates(c, indexes) for c in criteria.criteria) if ids is not None]
+        return set.intersection(*sorted(id_sets, key=len)) if id_sets else None
+    if isinstance(criteria, Or):
+        id_sets = [_candidates(c, indexes) for c in criteria.criteria]
+        return None if any(ids is None for ids in id_sets) else set().union(*id_sets)
+    return None
+
+
+def _order_key(key: str) -> Callable[[Any], Any]:
+    """
+    Build the sort key of a single property, None values come first in ascending order.
+    """
+    def order_key(model):
+        value = get_value(model, key)
+        return value is not None, value
+    return order_key
+
+
+def _sort_key(sort: Sort) -> Callable[[Any], Any]:
+    """
+    Build the sort key of the given sort options, ordering entities the same way as successive `_order_key` sorts.
+    """
+    keys = [o.key for o in sort.orders]
+    values_key = _values_key(sort)
+    return lambda model: values_key([get_value(model, k) for k in keys])
+
+
+def _values_key(sort: Sort) -> Callable[[List[Any]], Any]:
+    """
+    Build the sort key of the lists of property values of the given sort options.
+    """
+    signs = [-1 if o.direction.is_descending() else 1 for o in sort.orders]
+
+    def compare(xs, ys):
+        for x, y, sign in zip(xs, ys, signs):
+            if x == y:
+                continue
+            if x is None:
+                return -sign
+            if y is None:
+                return sign
+            return sign if x > y else -sign
+        return 0
+    return functools.cmp_to_key(compare)
@@ -0,0 +1,105 @@
+import logging
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+from easyrepo.interface.hook import RepositoryHook
+from easyrepo.model.hook import Histogram, OperationEvent
+
+try:
+    from opentelemetry.trace import SpanKind, Status, StatusCode
+except ImportError:  # pragma: no cover
+    SpanKind = Status = StatusCode = None
+
+DEFAULT_BOUNDS = [0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0]
+
+
+class LatencyHistograms(RepositoryHook):
+    """
+    Hook aggregating the latencies of operations in process, in a histogram per operation and model type.
+
+    bounds: the upper bounds in seconds of the buckets of the histograms.
+    """
+
+    def __init__(self, bounds: List[float] = None):
+        self._bounds = bounds if bounds is not None else DEFAULT_BOUNDS
+        self._histograms: Dict[Tuple[str, Optional[type]], Histogram] = {}
+        self._lock = threading.Lock()
+
+    def on_operation(self, event: OperationEvent):
+        key = (event.operation, event.model)
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram.of_bounds(self._bounds)
+            histogram.record(event)
+
+    def snapshot(self) -> Dict[Tuple[str, Optional[type]], Histogram]:
+        """
+        Returns a copy of the histograms, by operation and model type.
+        """
+        with self._lock:
+            return {key: histogram.copy(deep=True) for key, histogram in self._histograms.items()}
+
+    def reset(self):
+        """
+        Clears all the histograms.
+        """
+        with self._lock:
+            self._histograms.clear()
+
+
+class SlowOperationLog(RepositoryHook):
+    """
+    Hook logging a warning for each operation lasting at least the given threshold in seconds.
+
+    logger: the logger of the warnings, by default the `easyrepo.slow` logger.
+    """
+
+    def __init__(self, threshold: float, logger: logging.Logger = None):
+        self.threshold = threshold
+        self._logger = logger if logger is not None else logging.getLogger("easyrepo.slow")
+
+    def on_operation(self, event: OperationEvent):
+        if event.latency < self.threshold:
+            return
+        self._logger.warning(
+            "%s.%s took %.3fs (%s rows, %d round trips)",
+            event.repository.__name__,
+            event.operation,
+            event.latency,
+            "-" if event.rows is None else event.rows,
+            event.round_trips,
+            extra={"easyrepo_event": event}
+        )
+
+
+class OpenTelemetrySpans(RepositoryHook):
+    """
+    Hook recording a span for each operation with an OpenTelemetry tracer, such as
+    `opentelemetry.trace.get_tracer("easyrepo")`. Spans are recorded once operations are done, with their actual start
+    and end times, in the current trace context.
+    """
+
+    def __init__(self, tracer: Any):
+        self._tracer = tracer
+
+    def on_operation(self, event: OperationEvent):
+        start_time = int(event.started_at * 1e9)
+        attributes = {
+            "db.operation": event.operation,
+            "easyrepo.repository": event.repository.__name__,
+            "easyrepo.round_trips": event.round_trips
+        }
+        if event.model is not None:
+            attributes["easyrepo.model"] = event.model.__name__
+        if event.rows is not None:
+            attributes["easyrepo.rows"] = event.rows
+        options = {"start_time": start_time, "attributes": attributes}
+        if SpanKind is not None:
+            options["kind"] = SpanKind.CLIENT
+        span = self._tracer.start_span(f"{event.repository.__name__}.{event.operation}", **options)
+        if event.error is not None:
+            span.record_exception(event.error)
+            if Status is not None:
+                span.set_status(Status(StatusCode.ERROR, str(event.error)))
+        span.end(end_time=start_time + int(event.latency * 1e9))
@@ -1,37 +1,227 @@
-from typing import Optional, Iterable, List, Tuple, TypeVar, Generic, get_args
+import threading
+from concurrent.futures import Executor
+from typing import Any, Dict, Optional, Iterable, Iterator, List, Tuple, TypeVar, Generic, get_args
 
 import pymongo
 from bson import ObjectId
+from pymongo import ReplaceOne, ReturnDocument, monitoring
 
+from easyrepo.interface.hook import record_round_trip
 from easyrepo.interface.paging import PagingRepository
+from easyrepo.model.criteria import Criteria, Eq, In, Range, Exists, And, Or, Not
+from easyrepo.model.hydration import model_builder
+from easyrepo.model.identity import IdGenerator
 from easyrepo.model.mongo import Document
-from easyrepo.model.paging import Page, PageRequest
+from easyrepo.model.paging import Page, PageRequest, Slice, TotalCount, encode_cursor, decode_cursor
 from easyrepo.model.sorting import Sort
+from easyrepo.repository.index import get_value
+from easyrepo.utils import map_chunks
 
 T = TypeVar("T")
 
+# last command event counted by the listeners in each thread
+_last_event = threading.local()
 
-class MongoRepository(Generic[T], PagingRepository):
+
+class RoundTripListener(monitoring.CommandListener):
+    """
+    Command listener recording each command sent by pymongo, such as the `getMore` commands fetching the next batches
+    of a cursor, as a round trip of the current repository operations. A listener is registered for all the clients
+    created once this module is imported, clients created before must be given one in their `event_listeners`. Events
+    received by several listeners are only counted once.
+    """
+
+    def started(self, event: monitoring.CommandStartedEvent):
+        if getattr(_last_event, "event", None) is not event:
+            _last_event.event = event
+            record_round_trip()
+
+    def succeeded(self, event: monitoring.CommandSucceededEvent):
+        pass
+
+    def failed(self, event: monitoring.CommandFailedEvent):
+        pass
+
+
+monitoring.register(RoundTripListener())
+
+
+class _MongoQueries:
+    """
+    Query building and document mapping shared by the blocking and asynchronous mongo repositories, for the document
+    type `_model`.
+    """
+
+    @staticmethod
+    def _to_document(model: T) -> dict:
+        """
+        Map a model into a mongo document.
+        """
+        if isinstance(model, Document):
+            document = model.dict()
+            document["_id"] = document.pop("id", None)
+            return document
+        if not isinstance(model, dict):
+            raise ValueError(f"type {type(model)} not handled by repository.")
+        return model
+
+    def _filter_query(self, criteria: Criteria = None) -> dict:
+        """
+        Build mongo filter query.
+        """
+        if criteria is None:
+            return {}
+        if isinstance(criteria, (Eq, In, Range, Exists)):
+            key = "_id" if criteria.key == "id" and self._is_pydantic_model else criteria.key
+            if isinstance(criteria, Eq):
+                return {key: criteria.value}
+            if isinstance(criteria, In):
+                return {key: {"$in": criteria.values}}
+            if isinstance(criteria, Exists):
+                return {key: {"$ne": None}}
+            bounds = {"$gt": criteria.gt, "$gte": criteria.gte, "$lt": criteria.lt, "$lte": criteria.lte}
+            return {key: {k: v for k, v in bounds.items() if v is not None}}
+        if isinstance(criteria, And):
+            return {"$and": [self._filter_query(c) for c in criteria.criteria]} if criteria.criteria else {}
+        if isinstance(criteria, Or):
+            return {"$or": [self._filter_query(c) for c in criteria.criteria]}
+        if isinstance(criteria, Not):
+            return {"$nor": [self._filter_query(criteria.criteria)]}
+        raise ValueError(f"criteria {type(criteria)} not handled by repository.")
+
+    def _sort_query(self, sort: Sort) -> List[Tuple[str, int]]:
+        """
+        Build mongo sort query, the `id` of pydantic documents being sorted on their `_id` field. Keys already sorted
+        are skipped.
+        """
+        if sort is None:
+            return []
+        query = {}
+        for order in sort.orders:
+            key = "_id" if order.key == "id" and self._is_pydantic_model else order.key
+            query.setdefault(key, pymongo.ASCENDING if order.direction.is_ascending() else pymongo.DESCENDING)
+        return list(query.items())
+
+    @staticmethod
+    def _keyset_query(sort_query: List[Tuple[str, int]], values: List[Any]) -> dict:
+        """
+        Build mongo filter query matching the documents sorted after the given sort values. Null and missing values
+        sort before all others, as in mongo.
+        """
+        clauses = []
+        for i, (key, direction) in enumerate(sort_query):
+            value = values[i]
+            clause = {k: v for (k, _), v in zip(sort_query[:i], values[:i])}
+            if direction == pymongo.ASCENDING:
+                clause[key] = {"$ne": None} if value is None else {"$gt": value}
+            elif value is None:
+                # nothing sorts after null values in descending order
+                continue
+            else:
+                clause["$or"] = [{key: {"$lt": value}}, {key: None}]
+            clauses.append(clause)
+        return {"$or": clauses}
+
+    def _projection(self, fields: Optional[List[str]]) -> Optional[dict]:
+        """
+        Build mongo projection query, including the `_id` field.
+        """
+        if fields is None:
+            return None
+        return {"_id" if f == "id" and self._is_pydantic_model else f: 1 for f in fields}
+
+    def _page_stages(self, page_request: PageRequest, fields: Optional[List[str]]) -> List[dict]:
+        """
+        Build the aggregation stages selecting the documents of a page.
+        """
+        stages = [{"$skip": page_request.offset()}, {"$limit": page_request.size}]
+        projection = self._projection(fields)
+        if projection:
+            stages.append({"$project": projection})
+        return stages
+
+    def _map_result(self, result: Optional[dict], fields: List[str] = None) -> Optional[T]:
+        """
+        Map query result into appropriate object, projected documents are kept as dict.
+        """
+        if result is None or not self._is_pydantic_model:
+            return result
+        if fields is not None:
+            return {"id": result.pop("_id"), **result}
+        if self._builder is not None:
+            result["id"] = result.pop("_id")
+            return self._builder(result)
+        return self._model(id=result.pop("_id"), **result)
+
+    def _page(
+            self,
+            content: List[T],
+            page_request: PageRequest,
+            total_elements: int = None,
+            total_estimated: bool = False,
+            has_more: bool = None
+    ) -> Page[T]:
+        """
+        Build a page of results, without validation when documents are trusted.
+        """
+        values = {
+            "content": content,
+            "page_request": page_request,
+            "total_elements": total_elements,
+            "total_estimated": total_estimated,
+            "has_more": has_more
+        }
+        return Page.construct(**values) if self._builder is not None else Page(**values)
+
+
+class MongoRepository(Generic[T], PagingRepository, _MongoQueries):
     """
     Mongo repository.
 
     T: the type of object handled by the repository, can be a dict or `easyrepo.model.mongo.Document`.
+
+    id_generator: generator of the ids of new documents, assigned on the client side instead of by the server.
+    batch_size: the maximum number of documents sent per bulk write by `save_all`.
+    read_back: whether `save` returns the document as stored by the server, otherwise the saved document is returned
+    as is, without an additional round trip.
+    chunk_size: the maximum number of ids sent per query by `find_all_by_id` and `exists_all_by_id`.
+    executor: executor running the queries of the chunks concurrently, queries are run sequentially if missing.
+    trusted: whether the documents of the collection are trusted to match the model type, documents and pages are then
+    created without validation, see `easyrepo.model.hydration.model_builder`.
     """
 
-    def __init__(self, collection: pymongo.collection.Collection):
+    def __init__(
+            self,
+            collection: pymongo.collection.Collection,
+            id_generator: IdGenerator = None,
+            batch_size: int = 1000,
+            read_back: bool = True,
+            chunk_size: int = 1000,
+            executor: Executor = None,
+            trusted: bool = False
+    ):
         self._collection = collection
+        self._id_generator = id_generator
+        self._batch_size = batch_size
+        self._read_back = read_back
+        self._chunk_size = chunk_size
+        self._executor = executor
         self._model = get_args(self.__orig_bases__[0])[0]
         if type(self._model) == TypeVar:
             raise ValueError("Missing repository type")
         if not issubclass(self._model, (Document, dict)):
             raise ValueError(f"Model type {self._model} is not dict or `easyrepo.model.mongo.Document`")
         self._is_pydantic_model = issubclass(self._model, Document)
+        self._builder = model_builder(self._model) if trusted and self._is_pydantic_model else None
 
-    def count(self) -> int:
+    def count(self, criteria: Criteria = None) -> int:
         """
-        Returns the number of documents available.
+        Returns the number of documents matching the given criteria, estimated from the collection metadata when all
+        documents are counted.
         """
-        return self._collection.estimated_document_count()
+        if criteria is None:
+            return self._collection.estimated_document_count()
+        return self._collection.count_documents(self._filter_query(criteria))
 
     def delete_all(self):
         """
@@ -55,42 +245,112 @@ class MongoRepository(Generic[T], PagingRepository):
         """
         Returns whether a document with the given id exists.
         """
-        return bool(self._collection.count_documents({"_id": id}))
+        return self._collection.find_one({"_id": id}, projection={"_id": 1}) is not None
 
-    def find_all(self, sort: Sort = None) -> List[T]:
+    def exists_all_by_id(self, ids: Iterable[ObjectId]) -> Dict[ObjectId, bool]:
         """
-        Returns all documents sorted by the given options.
+        Returns whether a document exists for each of the given ids, with a query per chunk of ids.
         """
-        args = {
-            "filter": self._filter_query(),
-            "sort": self._sort_query(sort)
-        }
-        result = list(self._collection.find(**args))
-        return [self._map_result(r) for r in result]
+        ids = list(ids)
 
-    def find_page(self, page_request: PageRequest, sort: Sort = None) -> Page[T]:
+        def find(chunk):
+            return self._collection.find({"_id": {"$in": chunk}}, projection={"_id": 1})
+        found = {r["_id"] for r in map_chunks(find, list(set(ids)), self._chunk_size, self._executor)}
+        return {id: id in found for id in ids}
+
+    def find_all(self, sort: Sort = None, criteria: Criteria = None, fields: List[str] = None) -> List[T]:
         """
-        Returns a Page of document meeting the paging restriction.
+        Returns all documents matching the given criteria, sorted by the given options. With `fields`, only the given
+        fields of the documents are fetched, returned as dicts.
         """
         args = {
-            "filter": self._filter_query(),
+            "filter": self._filter_query(criteria),
             "sort": self._sort_query(sort),
-            "skip": page_request.offset(),
-            "limit": page_request.size
+            "projection": self._projection(fields)
         }
         result = list(self._collection.find(**args))
-        return Page(
-            content=[self._map_result(r) for r in result],
-            page_request=page_request,
-            total_elements=self.count()
+        return [self._map_result(r, fields) for r in result]
+
+    def find_page(
+            self,
+            page_request: PageRequest,
+            sort: Sort = None,
+            criteria: Criteria = None,
+            fields: List[str] = None,
+            total: TotalCount = TotalCount.EXACT
+    ) -> Page[T]:
+        """
+        Returns a Page of document matching the given criteria and meeting the paging restriction. The page content and
+        the exact number of matching documents are fetched by a single aggregation. Otherwise, the page is fetched with
+        one more document to know whether a next page exists, and the total of unfiltered pages is estimated from the
+        collection metadata if requested. With `fields`, only the given fields of the documents are fetched, returned as
+        dicts.
+        """
+        if total == TotalCount.NONE or (total == TotalCount.ESTIMATED and criteria is None):
+            args = {
+                "filter": self._filter_query(criteria),
+                "sort": self._sort_query(sort),
+                "projection": self._projection(fields),
+                "skip": page_request.offset(),
+                "limit": page_request.size + 1
+            }
+            result = [self._map_result(r, fields) for r in self._collection.find(**args)]
+            estimate = None
+            if total == TotalCount.ESTIMATED:
+                estimate = self._collection.estimated_document_count()
+            return self._page(
+                result[:page_request.size],
+                page_request,
+                estimate,
+                total_estimated=estimate is not None,
+                has_more=len(result) > page_request.size
+            )
+
+        pipeline = [{"$match": self._filter_query(criteria)}]
+        sort_query = self._sort_query(sort)
+        if sort_query:
+            pipeline.append({"$sort": dict(sort_query)})
+        pipeline.append({"$facet": {
+            "content": self._page_stages(page_request, fields),
+            "total": [{"$count": "count"}]
+        }})
+        result = next(self._collection.aggregate(pipeline))
+        return self._page(
+            [self._map_result(r, fields) for r in result["content"]],
+            page_request,
+            result["total"][0]["count"] if result["total"] else 0
         )
 
-    def find_all_by_id(self, ids: Iterable[ObjectId]) -> List[T]:
+    def find_slice(self, size: int, sort: Sort = None, after: str = None) -> Slice[T]:
         """
-        Returns all documents with the given IDs.
+        Returns a Slice of documents following the given cursor, sorted documents are seeked from the cursor values
+        instead of being skipped.
         """
-        result = list(self._collection.find(filter={"_id": {"$in": ids}}))
-        return [self._map_result(r) for r in result]
+        sort_query = self._sort_query((sort or Sort()).with_tiebreaker("_id"))
+        filter_query = self._filter_query()
+        if after is not None:
+            filter_query = {"$and": [filter_query, self._keyset_query(sort_query, decode_cursor(after))]}
+        result = list(self._collection.find(filter=filter_query, sort=sort_query, limit=size + 1))
+        next_cursor = None
+        if len(result) > size:
+            next_cursor = encode_cursor([get_value(result[size - 1], k) for k, _ in sort_query])
+        return Slice(content=[self._map_result(r) for r in result[:size]], size=size, next_cursor=next_cursor)
+
+    def find_all_by_id(self, ids: Iterable[ObjectId], fields: List[str] = None) -> List[Optional[T]]:
+        """
+        Returns the documents with the given IDs, in the same order, with None for missing documents. Documents are
+        fetched with a query per chunk of ids. With `fields`, only the given fields of the documents are fetched,
+        returned as dicts.
+        """
+        ids = list(ids)
+
+        def find(chunk):
+            return list(self._collection.find(filter={"_id": {"$in": chunk}}, projection=self._projection(fields)))
+        found = {}
+        for result in map_chunks(find, list(dict.fromkeys(ids)), self._chunk_size, self._executor):
+            id = result["_id"]
+            found[id] = self._map_result(result, fields)
+        return [found.get(id) for id in ids]
 
     def find_by_id(self, id: ObjectId) -> Optional[T]:
         """
@@ -99,56 +359,67 @@ class MongoRepository(Generic[T], PagingRepository):
         result = self._collection.find_one({"_id": id})
         return self._map_result(result)
 
-    def save(self, model: T) -> T:
+    def iter_all(self, sort: Sort = None, batch_size: int = 1000, fields: List[str] = None) -> Iterator[T]:
         """
-        Saves a given document.
+        Returns an iterator over all documents sorted by the given options, fetched from the server by batches. With
+        `fields`, only the given fields of the documents are fetched, returned as dicts.
         """
-        if isinstance(model, Document):
-            model = model.dict()
-            model["_id"] = model.pop("id", None)
-        elif not isinstance(model, dict):
-            raise ValueError(f"type {type(model)} not handled by repository.")
-
-        model_id = model.get("_id")
-        if model_id is None:
-            model.pop("_id", None)  # ensure there is no `_id` field in the document to not create it with None value
-            model_id = self._collection.insert_one(model).inserted_id
-        else:
-            self._collection.replace_one({"_id": model_id}, model)
-        return self.find_by_id(model_id)
+        cursor = self._collection.find(
+            filter=self._filter_query(),
+            sort=self._sort_query(sort),
+            projection=self._projection(fields)
+        ).batch_size(batch_size)
+        return (self._map_result(r, fields) for r in cursor)
 
-    def save_all(self, models: Iterable[T]) -> List[T]:
+    def save(self, model: T, read_back: bool = None) -> T:
         """
-        Saves all given documents.
+        Saves a given document. `read_back` overrides the repository setting for this call.
         """
-        return [self.save(m) for m in models]
+        read_back = self._read_back if read_back is None else read_back
+        document = self._to_document(model)
+        if document.get("_id") is None and self._id_generator is not None:
+            document["_id"] = self._id_generator.next_id()
+            return self._save_document(document, read_back, new=True)
+        return self._save_document(document, read_back)
 
-    @staticmethod
-    def _filter_query(filter: dict = None) -> dict:
+    def save_all(self, models: Iterable[T], ordered: bool = True) -> List[T]:
         """
-        Build mongo filter query.
+        Saves all given documents, using bulk writes: new documents are inserted first, then existing ones are replaced
+        or inserted if missing. With `ordered`, writes stop at the first error, otherwise all writes are attempted.
+        Saved documents are returned without being read back.
         """
-        if filter is None:
-            return {}
-        return {}
+        documents = [self._to_document(m) for m in models]
+        inserts = [d for d in documents if d.get("_id") is None]
+        replacements = [d for d in documents if d.get("_id") is not None]
+        ids = self._id_generator.next_ids(len(inserts)) if self._id_generator else [ObjectId() for _ in inserts]
+        for document, id in zip(inserts, ids):
+            document["_id"] = id
+        for i in range(0, len(inserts), self._batch_size):
+            self._collection.insert_many(inserts[i:i + self._batch_size], ordered=ordered)
+        for i in range(0, len(replacements), self._batch_size):
+            requests = [ReplaceOne({"_id": d["_id"]}, d, upsert=True) for d in replacements[i:i + self._batch_size]]
+            self._collection.bulk_write(requests, ordered=ordered)
+        return [self._map_result(d) for d in documents]
 
-    @staticmethod
-    def _sort_query(sort: Sort) -> List[Tuple[str, int]]:
+    def _save_document(self, document: dict, read_back: bool, new: bool = False) -> T:
         """
-        Build mongo sort query.
+        Inserts a new document, or replaces an existing one, inserted if missing like in `save_all`, and returns the
+        saved document. When read back, a replaced document is returned by the server in the same round trip.
         """
-        if sort is None:
-            return []
-        query = []
-        for order in sort.orders:
-            direction = pymongo.ASCENDING if order.direction.is_ascending() else pymongo.DESCENDING
-            query.append((order.key, direction))
-        return query
-
-    def _map_result(self, result: dict) -> T:
-        """
-        Map query result into appropriate object.
-        """
-        if not self._is_pydantic_model:
-            return result
-        return self._model(id=result.pop("_id"), **result)
+        model_id = document.get("_id")
+        if new or model_id is None:
+            if model_id is None:
+                # ensure there is no `_id` field in the document to not create it with None value
+                document.pop("_id", None)
+            model_id = document["_id"] = self._collection.insert_one(document).inserted_id
+            return self.find_by_id(model_id) if read_back else self._map_result(document)
+        if read_back:
+            result = self._collection.find_one_and_replace(
+                {"_id": model_id},
+                document,
+                upsert=True,
+                return_document=ReturnDocument.AFTER
+            )
+            return self._map_result(result)
+        self._collection.replace_one({"_id": model_id}, document, upsert=True)
+        return self._map_result(document)
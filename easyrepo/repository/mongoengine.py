@@ -1,11 +1,19 @@
-from typing import Optional, Iterable, List, TypeVar, Generic, get_args
+import functools
+import operator
+from concurrent.futures import Executor
+from typing import Any, Dict, Optional, Iterable, Iterator, List, TypeVar, Generic, get_args
 
+import pymongo
 from bson import ObjectId
-from mongoengine import Document, DoesNotExist
+from mongoengine import Document, DoesNotExist, Q, QuerySet
 
 from easyrepo.interface.paging import PagingRepository
-from easyrepo.model.paging import Page, PageRequest
+from easyrepo.model.criteria import Criteria, Eq, In, Range, Exists, And, Or, Not
+from easyrepo.model.paging import Page, PageRequest, Slice, TotalCount, encode_cursor, decode_cursor
 from easyrepo.model.sorting import Sort
+from easyrepo.repository.index import get_value
+from easyrepo.repository.mongo import _MongoQueries
+from easyrepo.utils import map_chunks
 
 T = TypeVar("T", bound=Document)
 
@@ -15,20 +23,25 @@ class MongoEngineRepository(Generic[T], PagingRepository):
     Mongo repository dedicated to MongoEngine ODM.
 
     T: the type of object handled by the repository, must be `mongoengine.Document`.
+
+    chunk_size: the maximum number of ids sent per query by `find_all_by_id` and `exists_all_by_id`.
+    executor: executor running the queries of the chunks concurrently, queries are run sequentially if missing.
     """
 
-    def __init__(self):
+    def __init__(self, chunk_size: int = 1000, executor: Executor = None):
+        self._chunk_size = chunk_size
+        self._executor = executor
         self._model = get_args(self.__orig_bases__[0])[0]
         if type(self._model) == TypeVar:
             raise ValueError("Missing repository type")
         if not issubclass(self._model, Document):
             raise ValueError(f"Model type {self._model} is not `mongoengine.Document`")
 
-    def count(self) -> int:
+    def count(self, criteria: Criteria = None) -> int:
         """
-        Returns the number of documents available.
+        Returns the number of documents matching the given criteria.
         """
-        return self._model.objects.count()
+        return self._model.objects(self._filter_query(criteria)).count()
 
     def delete_all(self):
         """
@@ -52,34 +65,89 @@ class MongoEngineRepository(Generic[T], PagingRepository):
         """
         Returns whether a document with the given id exists.
         """
-        return bool(self._model.objects(id=id).count())
+        return self._model.objects(id=id).scalar("id").first() is not None
+
+    def exists_all_by_id(self, ids: Iterable[ObjectId]) -> Dict[ObjectId, bool]:
+        """
+        Returns whether a document exists for each of the given ids, with a query per chunk of ids.
+        """
+        ids = list(ids)
+
+        def find(chunk):
+            return list(self._model.objects(id__in=chunk).scalar("id"))
+        found = set(map_chunks(find, list(set(ids)), self._chunk_size, self._executor))
+        return {id: id in found for id in ids}
 
-    def find_all(self, sort: Sort = None) -> List[T]:
+    def find_all(self, sort: Sort = None, criteria: Criteria = None, fields: List[str] = None) -> List[T]:
         """
-        Returns all documents sorted by the given options.
+        Returns all documents matching the given criteria, sorted by the given options. With `fields`, only the given
+        fields of the documents are loaded.
         """
         order_by = self._sort_query(sort)
-        query_set = self._model.objects().order_by(*order_by)
+        query_set = self._query_set(criteria, fields).order_by(*order_by)
         return list(query_set)
 
-    def find_page(self, page_request: PageRequest, sort: Sort = None) -> Page[T]:
+    def find_page(
+            self,
+            page_request: PageRequest,
+            sort: Sort = None,
+            criteria: Criteria = None,
+            fields: List[str] = None,
+            total: TotalCount = TotalCount.EXACT
+    ) -> Page[T]:
         """
-        Returns a Page of document meeting the paging restriction.
+        Returns a Page of document matching the given criteria and meeting the paging restriction. With `fields`, only
+        the given fields of the documents are loaded. Without exact count, the page is fetched with one more document to
+        know whether a next page exists, and the total of unfiltered pages is estimated from the collection metadata if
+        requested.
         """
         order_by = self._sort_query(sort)
-        query_set = self._model.objects().skip(page_request.offset()).limit(page_request.size).order_by(*order_by)
-        result = list(query_set)
+        query_set = self._query_set(criteria, fields).skip(page_request.offset()).order_by(*order_by)
+        if total == TotalCount.NONE or (total == TotalCount.ESTIMATED and criteria is None):
+            result = list(query_set.limit(page_request.size + 1))
+            estimate = None
+            if total == TotalCount.ESTIMATED:
+                estimate = self._model._get_collection().estimated_document_count()
+            return Page(
+                content=result[:page_request.size],
+                page_request=page_request,
+                total_elements=estimate,
+                total_estimated=estimate is not None,
+                has_more=len(result) > page_request.size
+            )
+        result = list(query_set.limit(page_request.size))
         return Page(
             content=result,
             page_request=page_request,
-            total_elements=self.count()
+            total_elements=self.count(criteria)
         )
 
-    def find_all_by_id(self, ids: Iterable[ObjectId]) -> List[T]:
+    def find_slice(self, size: int, sort: Sort = None, after: str = None) -> Slice[T]:
         """
-        Returns all documents with the given IDs.
+        Returns a Slice of documents following the given cursor, sorted documents are seeked from the cursor values
+        instead of being skipped.
         """
-        return list(self._model.objects(id__in=ids))
+        sort = (sort or Sort()).with_tiebreaker("id")
+        query_set = self._model.objects()
+        if after is not None:
+            query_set = query_set.filter(__raw__=self._keyset_query(sort, decode_cursor(after)))
+        result = list(query_set.order_by(*self._sort_query(sort)).limit(size + 1))
+        next_cursor = None
+        if len(result) > size:
+            next_cursor = encode_cursor([get_value(result[size - 1], o.key) for o in sort.orders])
+        return Slice(content=result[:size], size=size, next_cursor=next_cursor)
+
+    def find_all_by_id(self, ids: Iterable[ObjectId], fields: List[str] = None) -> List[Optional[T]]:
+        """
+        Returns the documents with the given IDs, in the same order, with None for missing documents. Documents are
+        fetched with a query per chunk of ids. With `fields`, only the given fields of the documents are loaded.
+        """
+        ids = list(ids)
+
+        def find(chunk):
+            return list(self._query_set(fields=fields).filter(id__in=chunk))
+        found = {d.id: d for d in map_chunks(find, list(dict.fromkeys(ids)), self._chunk_size, self._executor)}
+        return [found.get(id) for id in ids]
 
     def find_by_id(self, id: ObjectId) -> Optional[T]:
         """
@@ -90,6 +158,14 @@ class MongoEngineRepository(Generic[T], PagingRepository):
         except DoesNotExist:
             return None
 
+    def iter_all(self, sort: Sort = None, batch_size: int = 1000, fields: List[str] = None) -> Iterator[T]:
+        """
+        Returns an iterator over all documents sorted by the given options, fetched from the server by batches and not
+        cached by the query set. With `fields`, only the given fields of the documents are loaded.
+        """
+        order_by = self._sort_query(sort)
+        return iter(self._query_set(fields=fields).order_by(*order_by).no_cache().batch_size(batch_size))
+
     def save(self, model: T) -> T:
         """
         Saves a given document.
@@ -106,6 +182,40 @@ class MongoEngineRepository(Generic[T], PagingRepository):
         """
         return [self.save(m) for m in models]
 
+    def _query_set(self, criteria: Criteria = None, fields: List[str] = None) -> QuerySet:
+        """
+        Build the query set of the documents matching the given criteria, loading only the given fields if any.
+        """
+        query_set = self._model.objects(self._filter_query(criteria))
+        return query_set if fields is None else query_set.only(*fields)
+
+    @classmethod
+    def _filter_query(cls, criteria: Criteria = None, negate: bool = False) -> Q:
+        """
+        Build mongoengine filter query, negated criteria are pushed down to the property lookups.
+        """
+        if criteria is None:
+            return Q()
+        if isinstance(criteria, (Eq, In, Range, Exists)):
+            path = criteria.key.replace(".", "__")
+            if isinstance(criteria, Eq):
+                return Q(**{f"{path}__ne" if negate else path: criteria.value})
+            if isinstance(criteria, In):
+                return Q(**{f"{path}__nin" if negate else f"{path}__in": criteria.values})
+            if isinstance(criteria, Exists):
+                return Q(**{path if negate else f"{path}__ne": None})
+            bounds = {"gt": criteria.gt, "gte": criteria.gte, "lt": criteria.lt, "lte": criteria.lte}
+            prefix = f"{path}__not__" if negate else f"{path}__"
+            lookups = [Q(**{prefix + k: v}) for k, v in bounds.items() if v is not None]
+            return functools.reduce(operator.or_ if negate else operator.and_, lookups, Q())
+        if isinstance(criteria, (And, Or)):
+            conjunction = isinstance(criteria, And) != negate
+            queries = [cls._filter_query(c, negate) for c in criteria.criteria]
+            return functools.reduce(operator.and_ if conjunction else operator.or_, queries, Q())
+        if isinstance(criteria, Not):
+            return cls._filter_query(criteria.criteria, not negate)
+        raise ValueError(f"criteria {type(criteria)} not handled by repository.")
+
     @staticmethod
     def _sort_query(sort: Sort) -> List[str]:
         """
@@ -118,3 +228,16 @@ class MongoEngineRepository(Generic[T], PagingRepository):
             direction = "+" if order.direction.is_ascending() else "-"
             query.append(f"{direction}{order.key}")
         return query
+
+    def _keyset_query(self, sort: Sort, values: List[Any]) -> dict:
+        """
+        Build raw mongo filter query matching the documents sorted after the given sort values.
+        """
+        sort_query = [
+            (
+                self._model._db_field_map.get(o.key, o.key),
+                pymongo.ASCENDING if o.direction.is_ascending() else pymongo.DESCENDING
+            )
+            for o in sort.orders
+        ]
+        return _MongoQueries._keyset_query(sort_query, values)
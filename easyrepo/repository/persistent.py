@@ -0,0 +1,250 @@
+import bisect
+from collections.abc import ItemsView, Mapping, ValuesView
+from typing import Any, Dict, Hashable, Iterator, List, Optional, Tuple
+
+_BITS = 5
+_WIDTH = 1 << _BITS
+_MASK = _WIDTH - 1
+_MAX_SHIFT = 64
+_LEAF_SIZE = 16
+_CHUNK_SIZE = 256
+_MISSING = object()
+
+
+class PersistentMap(Mapping):
+    """
+    Immutable hash map sharing its structure with the maps derived from it. `set` and `delete` return a new map in
+    logarithmic time, copying only the path of nodes leading to the updated entry, so that maps are copied in constant
+    time. Entries are stored in a trie of 32 branches indexed by the bits of the key hashes, with leaves of at most 16
+    entries.
+    """
+    __slots__ = ("_root", "_len")
+
+    def __init__(self, entries: Mapping = None):
+        entries = dict(entries or {})
+        self._root = _build(entries, 0) if entries else None
+        self._len = len(entries)
+
+    def __getitem__(self, key: Hashable) -> Any:
+        node = self._root
+        h = hash(key)
+        shift = 0
+        while isinstance(node, tuple):
+            node = node[(h >> shift) & _MASK]
+            shift += _BITS
+        if node is None:
+            raise KeyError(key)
+        return node[key]
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def __contains__(self, key: Hashable) -> bool:
+        return self.get(key, _MISSING) is not _MISSING
+
+    def __iter__(self) -> Iterator[Hashable]:
+        for leaf in _leaves(self._root):
+            yield from leaf
+
+    def __len__(self) -> int:
+        return self._len
+
+    def values(self) -> ValuesView:
+        return _PersistentValues(self)
+
+    def items(self) -> ItemsView:
+        return _PersistentItems(self)
+
+    def set(self, key: Hashable, value: Any) -> "PersistentMap":
+        """
+        Returns a map with the given entry added or replaced.
+        """
+        root, added = _set(self._root, key, hash(key), 0, value)
+        return _derive(root, self._len + added)
+
+    def delete(self, key: Hashable) -> "PersistentMap":
+        """
+        Returns a map without the entry of the given key, raises a KeyError if missing.
+        """
+        return _derive(_delete(self._root, key, hash(key), 0), self._len - 1)
+
+
+class _PersistentValues(ValuesView):
+
+    def __iter__(self) -> Iterator[Any]:
+        for leaf in _leaves(self._mapping._root):
+            yield from leaf.values()
+
+
+class _PersistentItems(ItemsView):
+
+    def __iter__(self) -> Iterator[Tuple[Hashable, Any]]:
+        for leaf in _leaves(self._mapping._root):
+            yield from leaf.items()
+
+
+def _derive(root: Any, length: int) -> PersistentMap:
+    result = PersistentMap.__new__(PersistentMap)
+    result._root = root
+    result._len = length
+    return result
+
+
+def _build(entries: Dict[Hashable, Any], shift: int) -> Any:
+    """
+    Returns the node holding the given entries, split into branches while leaves are too large.
+    """
+    if len(entries) <= _LEAF_SIZE or shift >= _MAX_SHIFT:
+        return entries
+    branches: List[Optional[Dict[Hashable, Any]]] = [None] * _WIDTH
+    for key, value in entries.items():
+        i = (hash(key) >> shift) & _MASK
+        if branches[i] is None:
+            branches[i] = {}
+        branches[i][key] = value
+    return tuple(None if b is None else _build(b, shift + _BITS) for b in branches)
+
+
+def _set(node: Any, key: Hashable, h: int, shift: int, value: Any) -> Tuple[Any, bool]:
+    """
+    Returns a copy of the node with the given entry set, and whether the entry was added.
+    """
+    if node is None:
+        return {key: value}, True
+    if isinstance(node, dict):
+        added = key not in node
+        leaf = dict(node)
+        leaf[key] = value
+        return _build(leaf, shift), added
+    i = (h >> shift) & _MASK
+    child, added = _set(node[i], key, h, shift + _BITS, value)
+    return node[:i] + (child,) + node[i + 1:], added
+
+
+def _delete(node: Any, key: Hashable, h: int, shift: int) -> Any:
+    """
+    Returns a copy of the node without the given entry, None if empty.
+    """
+    if node is None:
+        raise KeyError(key)
+    if isinstance(node, dict):
+        if key not in node:
+            raise KeyError(key)
+        leaf = dict(node)
+        del leaf[key]
+        return leaf or None
+    i = (h >> shift) & _MASK
+    child = _delete(node[i], key, h, shift + _BITS)
+    if child is None and all(c is None for j, c in enumerate(node) if j != i):
+        return None
+    return node[:i] + (child,) + node[i + 1:]
+
+
+def _leaves(root: Any) -> Iterator[Dict[Hashable, Any]]:
+    """
+    Iterates over the leaves of a trie.
+    """
+    stack = [root]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, tuple):
+            stack.extend(c for c in reversed(node) if c is not None)
+        elif node:
+            yield node
+
+
+class PersistentSortedList:
+    """
+    Immutable sorted list sharing its structure with the lists derived from it. Values are stored in chunks of at most
+    256 values, `add` and `remove` return a new list copying only the updated chunk and the sequence of chunks.
+    """
+    __slots__ = ("_chunks", "_maxes", "_len")
+
+    def __init__(self, values: List[Any] = None):
+        values = sorted(values or [])
+        self._chunks = tuple(tuple(values[i:i + _CHUNK_SIZE]) for i in range(0, len(values), _CHUNK_SIZE))
+        self._maxes = tuple(c[-1] for c in self._chunks)
+        self._len = len(values)
+
+    def __len__(self) -> int:
+        return self._len
+
+    def __iter__(self) -> Iterator[Any]:
+        for chunk in self._chunks:
+            yield from chunk
+
+    def add(self, value: Any) -> "PersistentSortedList":
+        """
+        Returns a list with the given value inserted.
+        """
+        if not self._chunks:
+            return _derive_list(((value,),), 1)
+        i = min(bisect.bisect_left(self._maxes, value), len(self._chunks) - 1)
+        chunk = list(self._chunks[i])
+        bisect.insort(chunk, value)
+        if len(chunk) > _CHUNK_SIZE:
+            half = len(chunk) // 2
+            replaced = (tuple(chunk[:half]), tuple(chunk[half:]))
+        else:
+            replaced = (tuple(chunk),)
+        return _derive_list(self._chunks[:i] + replaced + self._chunks[i + 1:], self._len + 1)
+
+    def remove(self, value: Any) -> "PersistentSortedList":
+        """
+        Returns a list without one occurrence of the given value, raises a ValueError if missing.
+        """
+        i = bisect.bisect_left(self._maxes, value)
+        chunk = self._chunks[i] if i < len(self._chunks) else ()
+        j = bisect.bisect_left(chunk, value)
+        if j == len(chunk) or chunk[j] != value:
+            raise ValueError(f"{value} not in list")
+        chunk = chunk[:j] + chunk[j + 1:]
+        replaced = (chunk,) if chunk else ()
+        return _derive_list(self._chunks[:i] + replaced + self._chunks[i + 1:], self._len - 1)
+
+    def range(self, gt: Any = None, gte: Any = None, lt: Any = None, lte: Any = None) -> List[Any]:
+        """
+        Returns the values within the given bounds, in order.
+        """
+        start = (0, 0)
+        end = (len(self._chunks), 0)
+        if gte is not None:
+            start = self._position(gte, bisect.bisect_left)
+        if gt is not None:
+            start = max(start, self._position(gt, bisect.bisect_right))
+        if lte is not None:
+            end = self._position(lte, bisect.bisect_right)
+        if lt is not None:
+            end = min(end, self._position(lt, bisect.bisect_left))
+        if start >= end:
+            return []
+        (first, offset), (last, last_offset) = start, end
+        if first == last:
+            return list(self._chunks[first][offset:last_offset])
+        result = list(self._chunks[first][offset:])
+        for chunk in self._chunks[first + 1:last]:
+            result.extend(chunk)
+        if last < len(self._chunks):
+            result.extend(self._chunks[last][:last_offset])
+        return result
+
+    def _position(self, value: Any, search) -> Tuple[int, int]:
+        """
+        Returns the chunk and offset found by the given bisect function, the first position past a chunk being the
+        start of the next one.
+        """
+        i = search(self._maxes, value)
+        if i == len(self._chunks):
+            return i, 0
+        return i, search(self._chunks[i], value)
+
+
+def _derive_list(chunks: Tuple[Tuple[Any, ...], ...], length: int) -> PersistentSortedList:
+    result = PersistentSortedList.__new__(PersistentSortedList)
+    result._chunks = chunks
+    result._maxes = tuple(c[-1] for c in chunks)
+    result._len = length
+    return result
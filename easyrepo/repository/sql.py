@@ -1,35 +1,409 @@
-from typing import TypeVar, Generic, get_args, Iterable, List, Optional
+import threading
+from contextlib import contextmanager
+from typing import (
+    Any, Callable, ContextManager, Dict, TypeVar, Generic, get_args, Iterable, Iterator, List, Optional, Tuple, Type
+)
 
-from sqlalchemy.orm import Session
+from sqlalchemy import and_, or_, not_, true, false, bindparam, event, func, insert, inspect, text
+from sqlalchemy.exc import UnboundExecutionError
+from sqlalchemy.orm import Query, Session, make_transient_to_detached
+from sqlalchemy.orm.attributes import set_committed_value
+from sqlalchemy.sql import Executable
 
 from easyrepo import PagingRepository
-from easyrepo.model.paging import PageRequest, Page
+from easyrepo.interface.cache import Cache
+from easyrepo.interface.hook import record_round_trip
+from easyrepo.model.criteria import Criteria, Eq, In, Range, Exists, And, Or, Not
+from easyrepo.model.identity import IdGenerator
+from easyrepo.model.paging import PageRequest, Page, Slice, TotalCount, encode_cursor, decode_cursor
 from easyrepo.model.sorting import Sort
 from easyrepo.model.sql import Entity
+from easyrepo.repository.cache import LRUCache
+from easyrepo.repository.index import get_value
+from easyrepo.utils import map_chunks
 
 T = TypeVar("T", bound=Entity)
 
+_TRANSACTION_DEPTH = "easyrepo.transaction_depth"
 
-class SqlRepository(Generic[T], PagingRepository):
+CountEstimator = Callable[[Session, Type[Entity]], Optional[int]]
+
+# dialects sorting NULL values after all others in ascending order
+_NULLS_HIGH_DIALECTS = frozenset(["postgresql", "oracle"])
+
+# first SQLite version supporting RETURNING, not compiled by SQLAlchemy 1.4
+_SQLITE_RETURNING = (3, 35)
+
+
+_listen_lock = threading.Lock()
+
+
+def _record_statement(*args: Any):
+    """
+    Records each statement sent by a repository engine as a round trip of the current repository operation, if any.
+    """
+    record_round_trip()
+
+
+def _record_statements(session: Session, model: Type[Entity]):
+    """
+    Listens to the statements sent through the bind of the session for the given model, once per bind. Unbound
+    sessions are not listened to.
+    """
+    try:
+        bind = session.get_bind(model)
+    except UnboundExecutionError:
+        return
+    with _listen_lock:
+        if not event.contains(bind, "before_cursor_execute", _record_statement):
+            event.listen(bind, "before_cursor_execute", _record_statement)
+
+
+@contextmanager
+def transaction(session: Session) -> Iterator[Session]:
+    """
+    Groups the writes of the repositories using the given session in a single commit, at the end of the block. Writes
+    are rolled back if the block fails. Nested blocks use savepoints, rolled back alone if the nested block fails.
+    """
+    depth = session.info.get(_TRANSACTION_DEPTH, 0)
+    session.info[_TRANSACTION_DEPTH] = depth + 1
+    try:
+        if depth:
+            with session.begin_nested():
+                yield session
+            return
+        try:
+            yield session
+            session.commit()
+        except BaseException:
+            session.rollback()
+            raise
+    finally:
+        session.info[_TRANSACTION_DEPTH] = depth
+
+
+def postgresql_count_estimate(session: Session, model: Type[Entity]) -> Optional[int]:
+    """
+    Estimates the number of rows of the table of an entity type from the PostgreSQL planner statistics, kept up to date
+    by `ANALYZE` and autovacuum. Returns None when the table has never been analyzed.
+    """
+    statement = text("SELECT reltuples FROM pg_class WHERE oid = CAST(:table AS regclass)")
+    estimate = session.execute(statement, {"table": model.__table__.fullname}).scalar()
+    return int(estimate) if estimate is not None and estimate >= 0 else None
+
+
+class CachedCount:
+    """
+    Count estimator returning the number of rows of the table of an entity type, counted again only when expired from
+    the cache.
+
+    cache: the cache of the counts, by default a `LRUCache` expiring counts after a minute.
+    """
+
+    def __init__(self, cache: Cache = None):
+        self._cache = cache if cache is not None else LRUCache(ttl=60)
+
+    def __call__(self, session: Session, model: Type[Entity]) -> Optional[int]:
+        count = self._cache.get(model)
+        if count is None:
+            count = session.query(func.count()).select_from(model).scalar()
+            self._cache.set(model, count)
+        return count
+
+
+class _SqlQueries:
+    """
+    Query building shared by the blocking and asynchronous SQL repositories, for the entity type `_model`.
+    """
+
+    def _insert_batches(self, models: List[T], returning: bool) -> Iterator[Tuple[bool, List[Tuple[T, dict]]]]:
+        """
+        Groups new entities into batches of at most `_batch_size` rows with the same columns, each inserted by a single
+        statement. Entities without id are only inserted in bulk when their ids can be returned and their rows matched
+        by their inserted values, other entities are left to the session.
+        """
+        batches = {}
+        for model in models:
+            if model.id is not None or returning:
+                row = self._to_row(model)
+                if model.id is None and not _matchable(row):
+                    continue
+                batches.setdefault((model.id is None, frozenset(row)), []).append((model, row))
+        for (missing_id, _), batch in batches.items():
+            for i in range(0, len(batch), self._batch_size):
+                yield missing_id, batch[i:i + self._batch_size]
+
+    def _returning_insert(self, chunk: List[Tuple[T, dict]], dialect: Any) -> Executable:
+        """
+        Returns the statement inserting a batch of rows and returning their generated ids along with their inserted
+        values. On SQLite, RETURNING is not compiled by SQLAlchemy 1.4 and the statement is written as text.
+        """
+        table = self._model.__table__
+        columns = [table.c[k] for k in chunk[0][1]]
+        returned = [table.c.id] + columns
+        if not _compiles_returning(dialect):
+            preparer = dialect.identifier_preparer
+            params = []
+            for i, (_, row) in enumerate(chunk):
+                params.append([bindparam(f"p{i}_{j}", row[c.key], type_=c.type) for j, c in enumerate(columns)])
+            values = ", ".join("(" + ", ".join(f":{p.key}" for p in row) + ")" for row in params)
+            statement = text(
+                f"INSERT INTO {preparer.format_table(table)} ({', '.join(preparer.format_column(c) for c in columns)}) "
+                f"VALUES {values} RETURNING {', '.join(preparer.format_column(c) for c in returned)}"
+            )
+            return statement.bindparams(*(p for row in params for p in row)).columns(*returned)
+        return insert(table).values([row for _, row in chunk]).returning(*returned)
+
+    @staticmethod
+    def _set_returned_ids(chunk: List[Tuple[T, dict]], rows: Iterable[Any]):
+        """
+        Sets the generated ids returned by an insert to the entities of the rows with the same inserted values, as
+        databases do not guarantee that returned rows follow the inserted ones. Entities with the same values are
+        interchangeable.
+        """
+        pending = {}
+        for model, row in chunk:
+            pending.setdefault(tuple(row.values()), []).append(model)
+        for new_id, *values in rows:
+            models = pending.get(tuple(values))
+            if not models:
+                raise ValueError(f"returned row {values} does not match any inserted entity.")
+            models.pop(0).id = new_id
+
+    @staticmethod
+    def _inserted_values(models: List[T]) -> List[Tuple[T, Dict[str, Any]]]:
+        """
+        Returns the loaded column values of flushed new entities, unset values being left to the column defaults.
+        """
+        inserted = []
+        for model in models:
+            state = inspect(model)
+            values = {a.key: state.dict.get(a.key) for a in state.mapper.column_attrs}
+            inserted.append((model, {k: v for k, v in values.items() if v is not None}))
+        return inserted
+
+    @staticmethod
+    def _keep_loaded(inserted: List[Tuple[T, Dict[str, Any]]]):
+        """
+        Sets back the inserted values of entities expired by the commit, so that reading them does not select them
+        again.
+        """
+        for model, values in inserted:
+            for key, value in values.items():
+                set_committed_value(model, key, value)
+
+    @staticmethod
+    def _to_row(model: T) -> dict:
+        """
+        Map an entity into the column values to insert, unset values are left to the column defaults.
+        """
+        row = {}
+        for attr in inspect(model).mapper.column_attrs:
+            value = getattr(model, attr.key)
+            if value is not None:
+                row[attr.columns[0].key] = value
+        return row
+
+    def _filter_query(self, criteria: Criteria):
+        """
+        Build sqlalchemy filter matching the given criteria.
+        """
+        if isinstance(criteria, (Eq, In, Range, Exists)):
+            column = getattr(self._model, criteria.key)
+            if isinstance(criteria, Eq):
+                return column.is_(None) if criteria.value is None else column == criteria.value
+            if isinstance(criteria, In):
+                return column.in_(criteria.values)
+            if isinstance(criteria, Exists):
+                return column.isnot(None)
+            conditions = []
+            if criteria.gt is not None:
+                conditions.append(column > criteria.gt)
+            if criteria.gte is not None:
+                conditions.append(column >= criteria.gte)
+            if criteria.lt is not None:
+                conditions.append(column < criteria.lt)
+            if criteria.lte is not None:
+                conditions.append(column <= criteria.lte)
+            return and_(true(), *conditions)
+        if isinstance(criteria, And):
+            return and_(true(), *[self._filter_query(c) for c in criteria.criteria])
+        if isinstance(criteria, Or):
+            return or_(false(), *[self._filter_query(c) for c in criteria.criteria])
+        if isinstance(criteria, Not):
+            return not_(self._filter_query(criteria.criteria))
+        raise ValueError(f"criteria {type(criteria)} not handled by repository.")
+
+    @staticmethod
+    def _projected_keys(fields: List[str]) -> List[str]:
+        """
+        Returns the keys of the projected fields, starting with the id.
+        """
+        return ["id"] + [f for f in fields if f != "id"]
+
+    def _columns(self, fields: List[str]) -> list:
+        """
+        Build sqlalchemy columns selected for the given fields.
+        """
+        return [getattr(self._model, k) for k in self._projected_keys(fields)]
+
+    def _map_rows(self, rows: Iterable[Any], fields: Optional[List[str]]) -> Iterator[Any]:
+        """
+        Map query results into entities, or into dicts of the projected fields.
+        """
+        if fields is None:
+            return iter(rows)
+        keys = self._projected_keys(fields)
+        return (dict(zip(keys, row)) for row in rows)
+
+    def _split_total(self, rows: List[Any], fields: Optional[List[str]]) -> Tuple[List[T], Optional[int]]:
+        """
+        Split the rows of a page query selecting the window count, into the page content and the total number of
+        matching rows, None when the page is empty.
+        """
+        content = [row[0] for row in rows] if fields is None else [tuple(row[:-1]) for row in rows]
+        return list(self._map_rows(content, fields)), rows[0][-1] if rows else None
+
+    def _usable_estimate(self, estimate: Optional[int], total: TotalCount) -> Optional[int]:
+        """
+        Returns the estimated number of rows of the table if it can be used as page total instead of counting rows, when
+        requested or when the table is large enough.
+        """
+        if estimate is None or (total == TotalCount.EXACT and estimate < self._estimate_threshold):
+            return None
+        return estimate
+
+    def _uncounted_page(
+            self,
+            rows: List[Any],
+            page_request: PageRequest,
+            fields: Optional[List[str]],
+            estimate: Optional[int]
+    ) -> Page[T]:
+        """
+        Build a page from the rows of a page query fetching one more row than the page size.
+        """
+        return Page(
+            content=list(self._map_rows(rows[:page_request.size], fields)),
+            page_request=page_request,
+            total_elements=estimate,
+            total_estimated=estimate is not None,
+            has_more=len(rows) > page_request.size
+        )
+
+    def _sort_query(self, sort: Sort) -> List[str]:
+        """
+        Build sqlalchemy sort query.
+        """
+        if sort is None:
+            return []
+        query = []
+        for order in sort.orders:
+            attr = getattr(self._model, order.key)
+            order_by = attr.asc() if order.direction.is_ascending() else attr.desc()
+            query.append(order_by)
+        return query
+
+    def _keyset_query(self, sort: Sort, values: List[Any], dialect: str):
+        """
+        Build sqlalchemy filter matching the entities sorted after the given sort values. NULL values sort as the given
+        dialect sorts them by default: after all others with PostgreSQL and Oracle, before them otherwise.
+        """
+        nulls_high = dialect in _NULLS_HIGH_DIALECTS
+        columns = [getattr(self._model, o.key) for o in sort.orders]
+        clauses = []
+        for i, order in enumerate(sort.orders):
+            condition = _sorted_after(columns[i], values[i], order.direction.is_ascending(), nulls_high)
+            if condition is None:
+                continue
+            equalities = [c.is_(None) if v is None else c == v for c, v in zip(columns[:i], values[:i])]
+            clauses.append(and_(*equalities, condition))
+        return or_(*clauses)
+
+
+def _compiles_returning(dialect: Any) -> bool:
+    """
+    Returns whether SQLAlchemy compiles RETURNING clauses of inserts for the given dialect.
     """
-    SQL repository.
+    return bool(getattr(dialect, "insert_returning", None) or getattr(dialect, "full_returning", False))
+
+
+def _supports_returning(dialect: Any) -> bool:
+    """
+    Returns whether the database of the given dialect supports RETURNING clauses of inserts.
+    """
+    if _compiles_returning(dialect):
+        return True
+    return dialect.name == "sqlite" and getattr(dialect.dbapi, "sqlite_version_info", ()) >= _SQLITE_RETURNING
+
+
+def _matchable(row: dict) -> bool:
+    """
+    Returns whether the inserted values of a row can identify the row returned by the database.
+    """
+    try:
+        hash(tuple(row.values()))
+    except TypeError:
+        return False
+    return bool(row)
+
+
+def _sorted_after(column: Any, value: Any, ascending: bool, nulls_high: bool) -> Optional[Any]:
+    """
+    Build the condition of the values of a column sorted after the given value, None if no value is.
+    """
+    if value is None:
+        return column.isnot(None) if ascending != nulls_high else None
+    condition = column > value if ascending else column < value
+    return or_(condition, column.is_(None)) if ascending == nulls_high else condition
+
+
+class SqlRepository(Generic[T], PagingRepository, _SqlQueries):
+    """
+    SQL repository. Saved entities are committed, or only flushed within a `transaction` block, while deletions are
+    executed in the current transaction of the session, committed by the caller or by the next save.
 
     T: the type of object handled by the repository, must be `easyrepo.model.sql.Entity`.
+
+    id_generator: generator of the ids of new entities, assigned on the client side instead of by the database.
+    batch_size: the maximum number of rows inserted per statement by `save_all`.
+    chunk_size: the maximum number of ids sent per query by `find_all_by_id` and `exists_all_by_id`. Chunks are
+    queried sequentially, as sessions cannot be shared between threads.
+    count_estimator: estimator of the number of rows of the table, such as `postgresql_count_estimate` or
+    `CachedCount`, used as total of the unfiltered pages requested with an estimated total, or of tables of at least
+    `estimate_threshold` rows.
     """
 
-    def __init__(self, session: Session):
+    def __init__(
+            self,
+            session: Session,
+            id_generator: IdGenerator = None,
+            batch_size: int = 500,
+            chunk_size: int = 500,
+            count_estimator: CountEstimator = None,
+            estimate_threshold: int = 100000
+    ):
         self._session = session
+        self._id_generator = id_generator
+        self._batch_size = batch_size
+        self._chunk_size = chunk_size
+        self._count_estimator = count_estimator
+        self._estimate_threshold = estimate_threshold
         self._model = get_args(self.__orig_bases__[0])[0]
         if type(self._model) == TypeVar:
             raise ValueError("Missing repository type")
         if not issubclass(self._model, Entity):
             raise ValueError(f"Model type {self._model} is not `easyrepo.model.sql.Entity`")
+        _record_statements(session, self._model)
 
-    def count(self) -> int:
+    def count(self, criteria: Criteria = None) -> int:
         """
-        Returns the number of entities available.
+        Returns the number of entities matching the given criteria.
         """
-        return self._session.query(self._model).count()
+        query = self._session.query(func.count()).select_from(self._model)
+        if criteria is not None:
+            query = query.filter(self._filter_query(criteria))
+        return query.scalar()
 
     def delete_all(self):
         """
@@ -53,38 +427,90 @@ class SqlRepository(Generic[T], PagingRepository):
         """
         Returns whether an entity with the given id exists.
         """
-        return bool(self._session.query(self._model).filter(self._model.id == id).count())
+        return self._session.query(self._session.query(self._model.id).filter(self._model.id == id).exists()).scalar()
 
-    def find_all(self, sort: Sort = None) -> List[T]:
+    def exists_all_by_id(self, ids: Iterable[int]) -> Dict[int, bool]:
         """
-        Returns all entities sorted by the given options.
+        Returns whether an entity exists for each of the given ids, with a query per chunk of ids.
         """
-        query = self._session.query(self._model)
+        ids = list(ids)
+
+        def find(chunk):
+            return [id for id, in self._session.query(self._model.id).filter(self._model.id.in_(chunk))]
+        found = set(map_chunks(find, list(set(ids)), self._chunk_size))
+        return {id: id in found for id in ids}
+
+    def find_all(self, sort: Sort = None, criteria: Criteria = None, fields: List[str] = None) -> List[T]:
+        """
+        Returns all entities matching the given criteria, sorted by the given options. With `fields`, only the given
+        columns are selected, returned as dicts.
+        """
+        query = self._query(criteria, fields)
         order_by = self._sort_query(sort)
         if order_by:
             query = query.order_by(*order_by)
-        return query.all()
+        return list(self._map_rows(query.all(), fields))
 
-    def find_page(self, page_request: PageRequest, sort: Sort = None) -> Page[T]:
+    def find_page(
+            self,
+            page_request: PageRequest,
+            sort: Sort = None,
+            criteria: Criteria = None,
+            fields: List[str] = None,
+            total: TotalCount = TotalCount.EXACT
+    ) -> Page[T]:
         """
-        Returns a Page of entities meeting the paging restriction.
+        Returns a Page of entities matching the given criteria and meeting the paging restriction. With `fields`, only
+        the given columns are selected, returned as dicts.
+
+        The page and the number of matching entities are fetched by a single statement, with a `count(*) OVER ()`
+        window. The total of unfiltered pages is estimated instead when a count estimator is set, if requested or for
+        large tables. Pages without exact count are fetched with one more row to know whether a next page exists.
         """
-        query = self._session.query(self._model).offset(page_request.offset()).limit(page_request.size)
+        query = self._query(criteria, fields)
         order_by = self._sort_query(sort)
         if order_by:
             query = query.order_by(*order_by)
-        result = query.all()
-        return Page(
-            content=result,
-            page_request=page_request,
-            total_elements=self.count()
-        )
+        query = query.offset(page_request.offset())
+        estimate = None
+        if criteria is None and total != TotalCount.NONE and self._count_estimator is not None:
+            estimate = self._usable_estimate(self._count_estimator(self._session, self._model), total)
+        if total == TotalCount.NONE or estimate is not None:
+            return self._uncounted_page(query.limit(page_request.size + 1).all(), page_request, fields, estimate)
+        query = query.add_columns(func.count().over()).limit(page_request.size)
+        content, total_elements = self._split_total(query.all(), fields)
+        if total_elements is None:
+            # the window count is only known from the rows of the page
+            total_elements = self.count(criteria) if page_request.offset() else 0
+        return Page(content=content, page_request=page_request, total_elements=total_elements)
+
+    def find_slice(self, size: int, sort: Sort = None, after: str = None) -> Slice[T]:
+        """
+        Returns a Slice of entities following the given cursor, sorted entities are seeked from the cursor values
+        instead of being skipped.
+        """
+        sort = (sort or Sort()).with_tiebreaker("id")
+        query = self._session.query(self._model)
+        if after is not None:
+            dialect = self._session.get_bind(self._model).dialect.name
+            query = query.filter(self._keyset_query(sort, decode_cursor(after), dialect))
+        result = query.order_by(*self._sort_query(sort)).limit(size + 1).all()
+        next_cursor = None
+        if len(result) > size:
+            next_cursor = encode_cursor([get_value(result[size - 1], o.key) for o in sort.orders])
+        return Slice(content=result[:size], size=size, next_cursor=next_cursor)
 
-    def find_all_by_id(self, ids: Iterable[id]) -> List[T]:
+    def find_all_by_id(self, ids: Iterable[id], fields: List[str] = None) -> List[Optional[T]]:
         """
-        Returns all entities with the given IDs.
+        Returns the entities with the given IDs, in the same order, with None for missing entities. Entities are fetched
+        with a query per chunk of ids. With `fields`, only the given columns are selected, returned as dicts.
         """
-        return self._session.query(self._model).filter(self._model.id.in_(ids)).all()
+        ids = list(ids)
+
+        def find(chunk):
+            return self._map_rows(self._query(fields=fields).filter(self._model.id.in_(chunk)).all(), fields)
+        found = {get_value(e, "id"): e for e in map_chunks(find, list(dict.fromkeys(ids)), self._chunk_size)}
+        return [found.get(id) for id in ids]
 
     def find_by_id(self, id: id) -> Optional[T]:
         """
@@ -92,38 +518,88 @@ class SqlRepository(Generic[T], PagingRepository):
         """
         return self._session.query(self._model).filter(self._model.id == id).one_or_none()
 
+    def iter_all(self, sort: Sort = None, batch_size: int = 1000, fields: List[str] = None) -> Iterator[T]:
+        """
+        Returns an iterator over all entities sorted by the given options, fetched from the database by batches using a
+        server side cursor when supported. With `fields`, only the given columns are selected, returned as dicts.
+        """
+        query = self._query(fields=fields)
+        order_by = self._sort_query(sort)
+        if order_by:
+            query = query.order_by(*order_by)
+        return self._map_rows(query.yield_per(batch_size), fields)
+
     def save(self, model: T) -> T:
         """
         Saves a given entity.
         """
         if not isinstance(model, Entity):
             raise ValueError(f"type {type(model)} not handled by repository.")
+        if model.id is None and self._id_generator is not None:
+            model.id = self._id_generator.next_id()
         self._session.add(model)
-        self._session.commit()
-        self._session.refresh(model)
+        self._commit()
         return model
 
     def save_all(self, models: Iterable[T]) -> List[T]:
         """
-        Saves all given entities.
+        Saves all given entities. New entities are inserted in bulk, by batches of `batch_size`, and get their generated
+        ids back from the database without being refreshed.
         """
+        models = list(models)
         if any(not isinstance(m, Entity) for m in models):
             raise ValueError(f"one of type in the list of model is not handled by repository.")
+        new_models = [m for m in models if inspect(m).transient]
+        if self._id_generator is not None:
+            missing_ids = [m for m in new_models if m.id is None]
+            for model, new_id in zip(missing_ids, self._id_generator.next_ids(len(missing_ids))):
+                model.id = new_id
+        if new_models and not inspect(self._model).relationships:
+            self._bulk_insert(new_models)
         self._session.add_all(models)
-        self._session.commit()
-        for m in models:
-            self._session.refresh(m)
-        return list(models)
+        self._session.flush()
+        inserted = self._inserted_values(new_models)
+        self._commit()
+        self._keep_loaded(inserted)
+        return models
 
-    def _sort_query(self, sort: Sort) -> List[str]:
+    def transaction(self) -> ContextManager[Session]:
         """
-        Build sqlalchemy sort query.
+        Returns a context manager grouping the writes of the block in a single commit, see `transaction`.
         """
-        if sort is None:
-            return []
-        query = []
-        for order in sort.orders:
-            attr = getattr(self._model, order.key)
-            order_by = attr.asc() if order.direction.is_ascending() else attr.desc()
-            query.append(order_by)
+        return transaction(self._session)
+
+    def _query(self, criteria: Criteria = None, fields: List[str] = None) -> Query:
+        """
+        Build the query of the entities matching the given criteria, or of their projected columns.
+        """
+        query = self._session.query(self._model) if fields is None else self._session.query(*self._columns(fields))
+        if criteria is not None:
+            query = query.filter(self._filter_query(criteria))
         return query
+
+    def _commit(self):
+        """
+        Commits the pending writes, or only flushes them within a transaction block.
+        """
+        if self._session.info.get(_TRANSACTION_DEPTH):
+            self._session.flush()
+        else:
+            self._session.commit()
+
+    def _bulk_insert(self, models: List[T]):
+        """
+        Inserts new entities with multi-rows statements, then attaches them to the session as persisted entities.
+        Entities without id are inserted with a RETURNING clause where supported by the database, including SQLite
+        3.35 and later, otherwise they are left to the session.
+        """
+        dialect = self._session.get_bind().dialect
+        table = self._model.__table__
+        for missing_id, chunk in self._insert_batches(models, _supports_returning(dialect)):
+            if missing_id:
+                self._set_returned_ids(chunk, self._session.execute(self._returning_insert(chunk, dialect)))
+            else:
+                self._session.execute(insert(table), [row for _, row in chunk])
+            for model, _ in chunk:
+                make_transient_to_detached(model)
+                self._session.add(model)
@@ -0,0 +1,188 @@
+import mmap
+import os
+import pickle
+import struct
+import threading
+import time
+import zlib
+from typing import Any, Dict, Hashable, Iterator, Optional, Tuple
+
+SAVE = "save"
+DELETE = "delete"
+CLEAR = "clear"
+
+_HEADER = struct.Struct("<II")
+
+
+class WriteAheadLog:
+    """
+    Append-only log persisting the writes of a `MemoryRepository` in a local directory.
+
+    Records are flushed to the operating system on every write and fsynced every `sync_every` records or `sync_interval`
+    seconds, by a background thread when no further write comes. Once `snapshot_every` records have been appended, the
+    repository compacts the log into a snapshot of all entities. Entities are stored with pickle, the directory must
+    only be writable by trusted processes.
+
+    directory: the directory holding the log and snapshot files, created if missing.
+    """
+
+    def __init__(self, directory: str, sync_every: int = 100, sync_interval: float = 1.0, snapshot_every: int = 10000):
+        self.directory = directory
+        self.sync_every = sync_every
+        self.sync_interval = sync_interval
+        self.snapshot_every = snapshot_every
+        self._log_path = os.path.join(directory, "wal.log")
+        self._snapshot_path = os.path.join(directory, "snapshot")
+        self._file = None
+        self._records = 0
+        self._unsynced = 0
+        self._synced_at = time.monotonic()
+        self._lock = threading.RLock()
+        self._closed = threading.Event()
+        self._timer: Optional[threading.Thread] = None
+
+    def load(self) -> Dict[Hashable, Any]:
+        """
+        Returns the entities persisted by the snapshot and the log, and opens the log for appending. A truncated or
+        corrupted log tail, left by a crash during a write, is discarded.
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        data = self._read_snapshot()
+        end = 0
+        if os.path.exists(self._log_path):
+            with open(self._log_path, "rb") as f:
+                buffer = f.read()
+            for record, end in _read_records(buffer):
+                _apply(data, record)
+                self._records += 1
+        self._file = open(self._log_path, "ab")
+        self._file.truncate(end)
+        self._closed.clear()
+        if self.sync_interval > 0:
+            self._timer = threading.Thread(target=self._sync_periodically, name="easyrepo-wal-sync", daemon=True)
+            self._timer.start()
+        return data
+
+    def append(self, operation: str, payload: Any = None):
+        """
+        Appends a write operation to the log.
+        """
+        body = pickle.dumps((operation, payload), protocol=pickle.HIGHEST_PROTOCOL)
+        with self._lock:
+            self._file.write(_HEADER.pack(len(body), zlib.crc32(body)))
+            self._file.write(body)
+            self._file.flush()
+            self._records += 1
+            self._unsynced += 1
+            if self._unsynced >= self.sync_every or time.monotonic() - self._synced_at >= self.sync_interval:
+                self.sync()
+
+    def needs_snapshot(self) -> bool:
+        """
+        Returns whether the log grew enough to be compacted.
+        """
+        return self._records >= self.snapshot_every
+
+    def snapshot(self, data: Dict[Hashable, Any]):
+        """
+        Persists all entities into a new snapshot, then empties the log.
+        """
+        tmp_path = self._snapshot_path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            pickle.dump(data, f, protocol=pickle.HIGHEST_PROTOCOL)
+            f.flush()
+            os.fsync(f.fileno())
+        with self._lock:
+            os.replace(tmp_path, self._snapshot_path)
+            self._sync_directory()
+            self._file.truncate(0)
+            self.sync()
+            self._records = 0
+
+    def sync(self):
+        """
+        Forces the appended records to be written to disk.
+        """
+        with self._lock:
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self._unsynced = 0
+            self._synced_at = time.monotonic()
+
+    def close(self):
+        """
+        Syncs and closes the log, and stops its background sync.
+        """
+        self._closed.set()
+        if self._timer is not None:
+            self._timer.join()
+            self._timer = None
+        with self._lock:
+            if self._file is None:
+                return
+            self.sync()
+            self._file.close()
+            self._file = None
+
+    def _sync_periodically(self):
+        """
+        Syncs the records left unsynced for `sync_interval` seconds, until the log is closed.
+        """
+        while not self._closed.wait(self.sync_interval):
+            with self._lock:
+                if self._file is not None and self._unsynced:
+                    self.sync()
+
+    def _read_snapshot(self) -> Dict[Hashable, Any]:
+        """
+        Reads the snapshot file, memory-mapped when possible.
+        """
+        if not os.path.exists(self._snapshot_path):
+            return {}
+        with open(self._snapshot_path, "rb") as f:
+            try:
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+                    return pickle.loads(buffer)
+            except (ValueError, OSError):
+                return pickle.loads(f.read())
+
+    def _sync_directory(self):
+        """
+        Syncs the directory entry of a replaced file, where supported by the platform.
+        """
+        if not hasattr(os, "O_DIRECTORY"):
+            return
+        fd = os.open(self.directory, os.O_RDONLY | os.O_DIRECTORY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+
+def _read_records(buffer: bytes) -> Iterator[Tuple[Tuple[str, Any], int]]:
+    """
+    Decodes the valid records of a log, each with the offset following it.
+    """
+    offset = 0
+    while offset + _HEADER.size <= len(buffer):
+        length, checksum = _HEADER.unpack_from(buffer, offset)
+        start, end = offset + _HEADER.size, offset + _HEADER.size + length
+        body = buffer[start:end]
+        if len(body) < length or zlib.crc32(body) != checksum:
+            break
+        yield pickle.loads(body), end
+        offset = end
+
+
+def _apply(data: Dict[Hashable, Any], record: Tuple[str, Optional[Any]]):
+    """
+    Replays a log record on the given entities.
+    """
+    operation, payload = record
+    if operation == SAVE:
+        data.update(payload)
+    elif operation == DELETE:
+        for id in payload:
+            data.pop(id, None)
+    elif operation == CLEAR:
+        data.clear()
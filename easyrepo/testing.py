@@ -0,0 +1,94 @@
+import threading
+from collections import Counter
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Tuple
+
+from easyrepo.interface.hook import RepositoryHook, add_hook, remove_hook
+from easyrepo.model.hook import OperationEvent
+
+
+class QueryRecorder(RepositoryHook):
+    """
+    Hook recording the repository calls made while it is active, with their round trips to the database, to catch code
+    paths querying once per entity. Round trips are the statements executed by SQLAlchemy and the commands sent by
+    pymongo and MongoEngine repositories.
+
+        with QueryRecorder() as recorder:
+            service.process(order_ids)
+        recorder.assert_max_queries(2, calls=1)
+    """
+
+    def __init__(self):
+        self.calls: List[OperationEvent] = []
+        self._lock = threading.Lock()
+
+    def __enter__(self) -> "QueryRecorder":
+        add_hook(self)
+        return self
+
+    def __exit__(self, *exc_info):
+        remove_hook(self)
+
+    def on_operation(self, event: OperationEvent):
+        if not event.nested:
+            with self._lock:
+                self.calls.append(event)
+
+    @property
+    def queries(self) -> int:
+        """
+        Returns the number of round trips of the recorded calls.
+        """
+        return sum(e.round_trips for e in self.calls)
+
+    def counts(self) -> Dict[Tuple[str, str], int]:
+        """
+        Returns the number of recorded calls by repository class name and operation.
+        """
+        return dict(Counter((e.repository.__name__, e.operation) for e in self.calls))
+
+    def summary(self) -> str:
+        """
+        Returns the recorded calls and round trips by repository and operation, one per line.
+        """
+        round_trips = Counter()
+        for e in self.calls:
+            round_trips[(e.repository.__name__, e.operation)] += e.round_trips
+        return "\n".join(
+            f"{repository}.{operation}: {count} calls, {round_trips[(repository, operation)]} round trips"
+            for (repository, operation), count in self.counts().items()
+        )
+
+    def assert_max_queries(self, count: int, calls: int = None):
+        """
+        Raises an AssertionError if the recorded calls sent more than `count` round trips, or if any operation of a
+        repository was called more than `calls` times, the sign of an N+1 pattern.
+        """
+        if self.queries > count:
+            raise AssertionError(f"Expected at most {count} queries, got {self.queries}:\n{self.summary()}")
+        if calls is not None:
+            repeated = {k: n for k, n in self.counts().items() if n > calls}
+            if repeated:
+                names = ", ".join(f"{repository}.{operation} ({n})" for (repository, operation), n in repeated.items())
+                raise AssertionError(f"Expected operations to be called at most {calls} times, got {names}")
+
+    def reset(self):
+        """
+        Forgets the recorded calls.
+        """
+        with self._lock:
+            self.calls.clear()
+
+
+@contextmanager
+def assert_max_queries(count: int, calls: int = None) -> Iterator[QueryRecorder]:
+    """
+    Fails with an AssertionError if the repository calls made within the block send more than `count` round trips to
+    the database, or if any operation of a repository is called more than `calls` times.
+
+        with assert_max_queries(1):
+            repository.find_all_by_id(ids)
+    """
+    with QueryRecorder() as recorder:
+        yield recorder
+    recorder.assert_max_queries(count, calls)
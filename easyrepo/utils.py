@@ -0,0 +1,31 @@
+import contextvars
+from concurrent.futures import Executor
+from typing import Any, Callable, Iterable, List, TypeVar
+
+T = TypeVar("T")
+
+
+def chunks(items: List[T], size: int) -> List[List[T]]:
+    """
+    Splits a list into chunks of at most the given size.
+    """
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+
+def map_chunks(
+        function: Callable[[List[T]], Iterable[Any]],
+        items: List[T],
+        size: int,
+        executor: Executor = None
+) -> List[Any]:
+    """
+    Applies a function to each chunk of the given items, concurrently on the executor if any, and returns all results
+    in a single list. Functions run on the executor see the context variables of the caller.
+    """
+    parts = chunks(items, size)
+    if executor is None or len(parts) < 2:
+        results = map(function, parts)
+    else:
+        context = contextvars.copy_context()
+        results = executor.map(lambda part: context.copy().run(function, part), parts)
+    return [r for result in results for r in result]
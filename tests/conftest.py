@@ -0,0 +1,47 @@
+import functools
+import itertools
+import threading
+
+import mongomock.collection
+import pytest
+from pymongo import monitoring
+
+# collection methods sending a command with pymongo, mongomock does not publish command events
+_COMMANDS = [
+    "aggregate", "bulk_write", "count_documents", "create_index", "create_indexes", "delete_many", "delete_one",
+    "distinct", "drop", "drop_index", "drop_indexes", "estimated_document_count", "find", "find_one",
+    "find_one_and_delete", "find_one_and_replace", "find_one_and_update", "index_information", "insert_many",
+    "insert_one", "list_indexes", "replace_one", "update_many", "update_one"
+]
+
+_request_ids = itertools.count(1)
+_calling = threading.local()
+
+
+def _publishing(method):
+    """
+    Wraps a mongomock collection method to notify the registered command listeners of a command per outermost call.
+    """
+    @functools.wraps(method)
+    def wrapper(collection, *args, **kwargs):
+        if getattr(_calling, "depth", 0) == 0:
+            request_id = next(_request_ids)
+            event = monitoring.CommandStartedEvent(
+                {method.__name__: collection.name}, collection.database.name, request_id, ("localhost", 27017),
+                request_id
+            )
+            for listener in monitoring._LISTENERS.command_listeners:
+                listener.started(event)
+        _calling.depth = getattr(_calling, "depth", 0) + 1
+        try:
+            return method(collection, *args, **kwargs)
+        finally:
+            _calling.depth -= 1
+    return wrapper
+
+
+@pytest.fixture(autouse=True)
+def mongomock_commands(monkeypatch):
+    for name in _COMMANDS:
+        method = getattr(mongomock.collection.Collection, name)
+        monkeypatch.setattr(mongomock.collection.Collection, name, _publishing(method))
@@ -0,0 +1,68 @@
+from unittest import mock
+
+import pytest
+
+from easyrepo.interface.crud import CRUDRepository
+from easyrepo.model.sorting import Sort, Order, Direction
+from easyrepo.repository.memory import MemoryRepository
+
+
+class DictRepo(MemoryRepository[dict]):
+    pass
+
+
+class LegacyRepo(CRUDRepository):
+    """
+    Repository implementing only the operations of the first versions of the interface.
+    """
+
+    def __init__(self, repository: DictRepo):
+        self.repository = repository
+
+    def count(self):
+        return self.repository.count()
+
+    def delete_all(self):
+        self.repository.delete_all()
+
+    def delete_all_by_id(self, ids):
+        self.repository.delete_all_by_id(ids)
+
+    def delete_by_id(self, id):
+        self.repository.delete_by_id(id)
+
+    def exists_by_id(self, id):
+        return self.repository.exists_by_id(id)
+
+    def find_all(self, sort=None):
+        return self.repository.find_all(sort)
+
+    def find_all_by_id(self, ids):
+        return self.repository.find_all_by_id(ids)
+
+    def find_by_id(self, id):
+        return self.repository.find_by_id(id)
+
+    def save(self, model):
+        return self.repository.save(model)
+
+    def save_all(self, models):
+        return self.repository.save_all(models)
+
+
+@pytest.fixture
+def repo():
+    repository = DictRepo()
+    repository.save_all([{"name": f"entity{i}"} for i in range(1, 6)])
+    yield LegacyRepo(repository)
+
+
+def test_exists_all_by_id(repo):
+    with mock.patch.object(repo, "find_all_by_id", wraps=repo.find_all_by_id) as find_all_by_id:
+        assert repo.exists_all_by_id(iter([3, 6, 1, 3])) == {3: True, 6: False, 1: True}
+        find_all_by_id.assert_called_once_with([3, 6, 1, 3])
+
+
+def test_iter_all(repo):
+    result = repo.iter_all(Sort(orders=[Order(key="name", direction=Direction.DES)]), batch_size=2)
+    assert [m["name"] for m in result] == [f"entity{i}" for i in range(5, 0, -1)]
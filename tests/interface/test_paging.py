@@ -0,0 +1,84 @@
+import pytest
+
+from easyrepo.interface.paging import PagingRepository
+from easyrepo.model.paging import encode_cursor
+from easyrepo.model.sorting import Sort, Order, Direction
+from easyrepo.repository.memory import MemoryRepository
+
+
+class DictRepo(MemoryRepository[dict]):
+    pass
+
+
+class LegacyPagingRepo(PagingRepository):
+    """
+    Paging repository implementing only the operations of the first versions of the interface.
+    """
+
+    def __init__(self, repository: DictRepo):
+        self.repository = repository
+
+    def count(self):
+        return self.repository.count()
+
+    def delete_all(self):
+        self.repository.delete_all()
+
+    def delete_all_by_id(self, ids):
+        self.repository.delete_all_by_id(ids)
+
+    def delete_by_id(self, id):
+        self.repository.delete_by_id(id)
+
+    def exists_by_id(self, id):
+        return self.repository.exists_by_id(id)
+
+    def find_all(self, sort=None):
+        return self.repository.find_all(sort)
+
+    def find_all_by_id(self, ids):
+        return self.repository.find_all_by_id(ids)
+
+    def find_by_id(self, id):
+        return self.repository.find_by_id(id)
+
+    def find_page(self, page_request, sort=None):
+        return self.repository.find_page(page_request, sort)
+
+    def save(self, model):
+        return self.repository.save(model)
+
+    def save_all(self, models):
+        return self.repository.save_all(models)
+
+
+@pytest.fixture
+def repo():
+    repository = DictRepo()
+    repository.save_all([{"name": f"entity{i}"} for i in range(1, 6)])
+    yield LegacyPagingRepo(repository)
+
+
+def test_find_slice(repo):
+    sort = Sort(orders=[Order(key="name", direction=Direction.DES)])
+    names = []
+    cursor = None
+    for size in [2, 2, 2]:
+        result = repo.find_slice(size, sort, cursor)
+        names += [m["name"] for m in result.content]
+        cursor = result.next_cursor
+    assert names == [f"entity{i}" for i in range(5, 0, -1)]
+    assert cursor is None
+
+
+def test_find_slice_unaligned_cursor(repo):
+    result = repo.find_slice(2, after=encode_cursor([1]))
+    assert [m["name"] for m in result.content] == ["entity2", "entity3"]
+    result = repo.find_slice(3, after=result.next_cursor)
+    assert [m["name"] for m in result.content] == ["entity4", "entity5"]
+    assert not result.has_next()
+
+
+def test_find_slice_invalid_cursor(repo):
+    with pytest.raises(ValueError):
+        repo.find_slice(2, after=encode_cursor(["a"]))
@@ -0,0 +1,11 @@
+from easyrepo.model.criteria import And, Eq, Exists, Not, Or, Range
+
+
+def test_criteria_operators():
+    criteria = (Eq(key="a", value=1) & Range(key="b", gte=2)) | ~Exists(key="c")
+    assert isinstance(criteria, Or)
+    assert isinstance(criteria.criteria[0], And)
+    assert isinstance(criteria.criteria[0].criteria[1], Range)
+    assert criteria.criteria[0].criteria[1].gte == 2
+    assert isinstance(criteria.criteria[1], Not)
+    assert criteria.criteria[1].criteria == Exists(key="c")
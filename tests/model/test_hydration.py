@@ -0,0 +1,51 @@
+from typing import List, Optional
+
+from pydantic import BaseModel, Extra, Field, PrivateAttr
+
+from easyrepo.model.hydration import model_builder
+
+
+class Child(BaseModel):
+    name: str
+    tags: List[str] = Field(default_factory=list)
+
+
+class Parent(BaseModel):
+    id: Optional[int]
+    child: Optional[Child]
+    children: List[Child] = []
+    parent: Optional["Parent"]
+    _cache: dict = PrivateAttr(default_factory=dict)
+
+
+Parent.update_forward_refs()
+
+
+class Open(BaseModel):
+    value: int
+
+    class Config:
+        extra = Extra.allow
+
+
+def test_model_builder_without_validation():
+    model = model_builder(Parent)({"id": "1", "unknown": 1})
+    assert model.id == "1"
+    assert model.child is None and model.children == [] and model._cache == {}
+    assert model.__fields_set__ == {"id"}
+    assert not hasattr(model, "unknown")
+    assert model_builder(Parent) is model_builder(Parent)
+
+
+def test_model_builder_nested_models():
+    data = {"id": 1, "child": {"name": "a"}, "children": [{"name": "b", "tags": ["x"]}], "parent": {"id": 0}}
+    model = model_builder(Parent)(data)
+    assert model == Parent(**data)
+    assert model.child.tags == []
+    assert isinstance(model.parent, Parent)
+
+
+def test_model_builder_extra_allowed():
+    model = model_builder(Open)({"value": 1, "other": 2})
+    assert model.other == 2
+    assert model.__fields_set__ == {"value", "other"}
@@ -0,0 +1,38 @@
+import uuid
+
+from bson import ObjectId
+
+from easyrepo.model.identity import SequenceIdGenerator, UUIDGenerator, ObjectIdGenerator
+
+
+def test_sequence_next_id():
+    generator = SequenceIdGenerator()
+    assert [generator.next_id() for _ in range(3)] == [1, 2, 3]
+
+
+def test_sequence_next_ids():
+    generator = SequenceIdGenerator(start=10)
+    assert generator.next_ids(3) == [10, 11, 12]
+    assert generator.next_id() == 13
+
+
+def test_sequence_observe():
+    generator = SequenceIdGenerator()
+    generator.observe(5)
+    generator.observe(2)
+    generator.observe("id")
+    assert generator.next_id() == 6
+
+
+def test_uuid_next_id():
+    generator = UUIDGenerator()
+    ids = generator.next_ids(2)
+    assert all(isinstance(i, uuid.UUID) for i in ids)
+    assert ids[0] != ids[1]
+
+
+def test_object_id_next_id():
+    generator = ObjectIdGenerator()
+    ids = generator.next_ids(2)
+    assert all(isinstance(i, ObjectId) for i in ids)
+    assert ids[0] < ids[1]
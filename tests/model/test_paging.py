@@ -1,7 +1,11 @@
+import datetime
+import uuid
+
 import pytest
+from bson import ObjectId
 from pydantic import ValidationError
 
-from easyrepo.model.paging import PageRequest, Page
+from easyrepo.model.paging import PageRequest, Page, Slice, encode_cursor, decode_cursor
 
 
 def test_page_request_validation():
@@ -85,6 +89,29 @@ def test_page_total_pages():
     assert page.total_pages() == 1
 
 
+def test_page_without_exact_total():
+    page = Page(content=[1, 2], page_request=PageRequest(number=1, size=2), has_more=True)
+    assert page.has_next() and not page.is_last()
+    assert page.total_pages() == 3
+    assert page.next_page_request() == PageRequest(number=2, size=2)
+
+    page = Page(content=[1], page_request=PageRequest(number=1, size=2), has_more=False)
+    assert not page.has_next() and page.is_last()
+    assert page.total_pages() == 2
+
+    page = Page(content=[1, 2], page_request=PageRequest(number=1, size=2), total_elements=9, total_estimated=True,
+                has_more=True)
+    assert page.total_pages() == 5
+
+    page = Page(content=[1, 2], page_request=PageRequest(number=1, size=2), total_elements=2, total_estimated=True,
+                has_more=True)
+    assert page.total_pages() == 3 and page.has_next()
+
+    page = Page(content=[1], page_request=PageRequest(number=1, size=2), total_elements=9, total_estimated=True,
+                has_more=False)
+    assert page.total_pages() == 2 and page.is_last()
+
+
 def test_page_has_content():
     page = Page(content=[1, 2, 3], page_request=PageRequest(number=1, size=10), total_elements=13)
     assert page.has_content()
@@ -157,3 +184,29 @@ def test_page_previous_page_request():
 
     page = Page(content=[])
     assert page.previous_page_request() is None
+
+
+def test_slice_has_next():
+    assert Slice(content=[1, 2], size=2, next_cursor="cursor").has_next()
+    assert not Slice(content=[1], size=2).has_next()
+
+
+def test_slice_content():
+    assert Slice(content=[1, 2], size=2).number_of_elements() == 2
+    assert not Slice(content=[], size=2).has_content()
+
+
+def test_cursor_round_trip():
+    values = [
+        "value", 1, 1.5, None, True,
+        datetime.datetime(2022, 1, 2, 3, 4, 5), datetime.date(2022, 1, 2), uuid.uuid4(), ObjectId()
+    ]
+    assert decode_cursor(encode_cursor(values)) == values
+
+
+def test_cursor_invalid():
+    with pytest.raises(ValueError):
+        decode_cursor("invalid")
+
+    with pytest.raises(ValueError):
+        decode_cursor(encode_cursor({"key": "value"}))
@@ -49,3 +49,12 @@ def test_sort_descending():
     sort.descending()
     assert sort.orders[0].direction == Direction.DES
     assert sort.orders[1].direction == Direction.DES
+
+
+def test_sort_with_tiebreaker():
+    sort = Sort.by("key1", direction=Direction.DES).with_tiebreaker("id")
+    assert [o.key for o in sort.orders] == ["key1", "id"]
+    assert sort.orders[1].direction == Direction.ASC
+
+    sort = Sort.by("id", direction=Direction.DES).with_tiebreaker("id")
+    assert [o.key for o in sort.orders] == ["id"]
@@ -0,0 +1,86 @@
+import asyncio
+from typing import Optional
+
+import pytest
+from pydantic import BaseModel
+
+from easyrepo.model.paging import PageRequest
+from easyrepo.model.sorting import Sort, Direction
+from easyrepo.repository.async_memory import AsyncMemoryRepository
+from easyrepo.repository.index import HashIndex
+from easyrepo.repository.wal import WriteAheadLog
+
+
+class TestModel(BaseModel):
+    id: Optional[int]
+    name: str
+
+
+class DictRepo(AsyncMemoryRepository[dict]):
+    pass
+
+
+class ModelRepo(AsyncMemoryRepository[TestModel]):
+    pass
+
+
+class NoTypeRepo(AsyncMemoryRepository):
+    pass
+
+
+@pytest.fixture
+def dict_repo():
+    repo = DictRepo(indexes=[HashIndex("name")])
+    asyncio.run(repo.save_all([{"name": "entity1"}, {"name": "entity2"}, {"name": "entity3"}]))
+    yield repo
+
+
+def test_create_repo_with_missing_type():
+    with pytest.raises(ValueError):
+        NoTypeRepo()
+
+
+def test_crud(dict_repo):
+    async def main():
+        assert await dict_repo.count() == 3
+        assert await dict_repo.exists_by_id(1)
+        assert await dict_repo.exists_all_by_id([1, 4]) == {1: True, 4: False}
+        assert (await dict_repo.find_by_id(2))["name"] == "entity2"
+        assert [r["id"] if r else None for r in await dict_repo.find_all_by_id([3, 4, 1])] == [3, None, 1]
+        assert [r["id"] for r in await dict_repo.find_by(name="entity2")] == [2]
+        await dict_repo.delete_by_id(1)
+        await dict_repo.delete_all_by_id([2])
+        assert await dict_repo.count() == 1
+        await dict_repo.delete_all()
+        assert await dict_repo.count() == 0
+    asyncio.run(main())
+
+
+def test_find_and_iter_sorted(dict_repo):
+    async def main():
+        sort = Sort.by("name", direction=Direction.DES)
+        assert [r["id"] for r in await dict_repo.find_all(sort)] == [3, 2, 1]
+        page = await dict_repo.find_page(PageRequest.of_size(2), sort)
+        assert [r["id"] for r in page.content] == [3, 2]
+        first = await dict_repo.find_slice(2, sort)
+        second = await dict_repo.find_slice(2, sort, after=first.next_cursor)
+        assert [r["id"] for r in second.content] == [1]
+        assert [r["id"] async for r in dict_repo.iter_all(sort)] == [3, 2, 1]
+    asyncio.run(main())
+
+
+def test_save_pydantic_model():
+    repo = ModelRepo()
+    model = asyncio.run(repo.save(TestModel(name="entity1")))
+    assert model.id == 1
+
+
+def test_wal_closed_by_context_manager(tmp_path):
+    async def main():
+        async with DictRepo(concurrent=True, wal=WriteAheadLog(str(tmp_path)), stripes=4) as repo:
+            assert len(repo._repository._stripes) == 4
+            await repo.save_all([{"name": "entity1"}, {"name": "entity2"}])
+        repo = DictRepo(wal=WriteAheadLog(str(tmp_path)))
+        assert await repo.count() == 2
+        await repo.close()
+    asyncio.run(main())
@@ -0,0 +1,161 @@
+import asyncio
+
+import pytest
+from bson import ObjectId
+from mongomock import MongoClient
+
+from easyrepo.model.mongo import Document
+from easyrepo.model.paging import PageRequest, TotalCount
+from easyrepo.model.sorting import Sort, Direction
+from easyrepo.repository.async_mongo import AsyncMongoRepository
+
+
+class TestModel(Document):
+    value: str
+
+
+class DictRepo(AsyncMongoRepository[dict]):
+    pass
+
+
+class ModelRepo(AsyncMongoRepository[TestModel]):
+    pass
+
+
+class AsyncCursor:
+    """
+    Motor-like cursor over a mongomock cursor.
+    """
+
+    def __init__(self, cursor):
+        self._cursor = cursor
+
+    def batch_size(self, batch_size):
+        self._cursor.batch_size(batch_size)
+        return self
+
+    async def to_list(self, length):
+        return list(self._cursor)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        try:
+            return next(self._cursor)
+        except StopIteration:
+            raise StopAsyncIteration
+
+
+class AsyncCollection:
+    """
+    Motor-like collection over a mongomock collection, as in-process mongo stand-in.
+    """
+
+    def __init__(self, collection):
+        self._collection = collection
+
+    def find(self, *args, **kwargs):
+        return AsyncCursor(self._collection.find(*args, **kwargs))
+
+    def aggregate(self, pipeline):
+        return AsyncCursor(self._collection.aggregate(pipeline))
+
+    def __getattr__(self, name):
+        method = getattr(self._collection, name)
+
+        async def call(*args, **kwargs):
+            return method(*args, **kwargs)
+        return call
+
+
+@pytest.fixture
+def collection():
+    yield MongoClient().db.collection
+
+
+@pytest.fixture
+def dict_repo(collection):
+    yield DictRepo(AsyncCollection(collection))
+
+
+@pytest.fixture
+def model_repo(collection):
+    yield ModelRepo(AsyncCollection(collection))
+
+
+def _insert_documents(collection, n):
+    return collection.insert_many([{"value": f"value {i}"} for i in range(n)]).inserted_ids
+
+
+def test_crud(collection, dict_repo):
+    ids = _insert_documents(collection, 3)
+
+    async def main():
+        assert await dict_repo.count() == 3
+        assert await dict_repo.exists_by_id(ids[0])
+        missing = ObjectId()
+        assert await dict_repo.exists_all_by_id([ids[1], missing]) == {ids[1]: True, missing: False}
+        assert (await dict_repo.find_by_id(ids[1]))["value"] == "value 1"
+        res = await dict_repo.find_all_by_id([ids[2], missing, ids[0]])
+        assert [r["value"] if r else None for r in res] == ["value 2", None, "value 0"]
+        await dict_repo.delete_by_id(ids[0])
+        await dict_repo.delete_all_by_id(ids[1:2])
+        assert await dict_repo.count() == 1
+        await dict_repo.delete_all()
+        assert await dict_repo.count() == 0
+    asyncio.run(main())
+
+
+def test_find_and_iter_sorted(collection, model_repo):
+    _insert_documents(collection, 3)
+
+    async def main():
+        sort = Sort.by("value", direction=Direction.DES)
+        assert [r.value for r in await model_repo.find_all(sort)] == ["value 2", "value 1", "value 0"]
+        page = await model_repo.find_page(PageRequest.of_size(2), sort)
+        assert [r.value for r in page.content] == ["value 2", "value 1"]
+        assert page.total_elements == 3
+        page = await model_repo.find_page(PageRequest.of_size(2), sort, total=TotalCount.NONE)
+        assert [r.value for r in page.content] == ["value 2", "value 1"]
+        assert page.has_next()
+        page = await model_repo.find_page(PageRequest.of_size(2), sort, total=TotalCount.ESTIMATED)
+        assert page.total_elements == 3 and page.total_estimated
+        first = await model_repo.find_slice(2, sort)
+        second = await model_repo.find_slice(2, sort, after=first.next_cursor)
+        assert [r.value for r in second.content] == ["value 0"]
+        assert [r.value async for r in model_repo.iter_all(sort, batch_size=2)] == ["value 2", "value 1", "value 0"]
+        by_id = Sort.by("id", direction=Direction.DES)
+        assert [r.value for r in await model_repo.find_all(by_id)] == ["value 2", "value 1", "value 0"]
+    asyncio.run(main())
+
+
+def test_find_slice_nullable_sort_key(collection, dict_repo):
+    ids = collection.insert_many([{"rank": 2}, {"rank": None}, {"rank": 1}, {}, {"rank": 3}, {"rank": None}])
+    ids = ids.inserted_ids
+
+    async def main():
+        for direction, expected in [(Direction.ASC, [1, 3, 5, 2, 0, 4]), (Direction.DES, [4, 0, 2, 1, 3, 5])]:
+            sort = Sort.by("rank", direction=direction)
+            res = await dict_repo.find_slice(2, sort)
+            found = [r["_id"] for r in res.content]
+            while res.has_next():
+                res = await dict_repo.find_slice(2, sort, after=res.next_cursor)
+                found += [r["_id"] for r in res.content]
+            assert found == [ids[i] for i in expected]
+    asyncio.run(main())
+
+
+def test_save(collection, model_repo):
+    async def main():
+        model = await model_repo.save(TestModel(value="value 0"))
+        assert model.id is not None
+        model.value = "value 1"
+        assert (await model_repo.save(model, read_back=False)).value == "value 1"
+        res = await model_repo.save_all([model, TestModel(value="value 2")])
+        assert all(r.id is not None for r in res)
+        assert await model_repo.count() == 2
+        missing = ObjectId()
+        assert (await model_repo.save(TestModel(id=missing, value="value 3"))).id == missing
+        assert await model_repo.count() == 3
+    asyncio.run(main())
@@ -0,0 +1,153 @@
+import asyncio
+
+import pytest
+from sqlalchemy import Column, Integer, String
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+from easyrepo.model.criteria import Range
+from easyrepo.model.paging import PageRequest, TotalCount
+from easyrepo.model.sorting import Sort, Direction
+from easyrepo.model.sql import Entity
+from easyrepo.repository.async_sql import AsyncSqlRepository
+
+
+class AsyncTestModel(Entity):
+    id = Column(Integer, primary_key=True, index=True)
+    value: str = Column(String, nullable=False)
+
+
+class TestRepo(AsyncSqlRepository[AsyncTestModel]):
+    pass
+
+
+class AsyncNullableModel(Entity):
+    id = Column(Integer, primary_key=True)
+    rank: int = Column(Integer)
+
+
+class NullableRepo(AsyncSqlRepository[AsyncNullableModel]):
+    pass
+
+
+def _run(test):
+    async def main():
+        engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+        async with engine.begin() as connection:
+            await connection.run_sync(Entity.metadata.create_all)
+        async with AsyncSession(engine, expire_on_commit=False) as session:
+            repo = TestRepo(session)
+            await repo.save_all([AsyncTestModel(value=f"value {i}") for i in range(1, 4)])
+            await test(repo)
+        await engine.dispose()
+    asyncio.run(main())
+
+
+def test_create_repo_with_unexpected_model_type():
+    class IntRepo(AsyncSqlRepository[int]):
+        pass
+
+    with pytest.raises(ValueError):
+        IntRepo(None)
+
+
+def test_crud():
+    async def test(repo):
+        assert await repo.count() == 3
+        assert await repo.exists_by_id(1)
+        assert not await repo.exists_by_id(4)
+        assert await repo.exists_all_by_id([1, 4]) == {1: True, 4: False}
+        assert (await repo.find_by_id(2)).value == "value 2"
+        assert [r.id if r else None for r in await repo.find_all_by_id([3, 4, 1])] == [3, None, 1]
+        await repo.delete_by_id(1)
+        await repo.delete_all_by_id([2])
+        assert await repo.count() == 1
+        await repo.delete_all()
+        assert await repo.count() == 0
+    _run(test)
+
+
+def test_find_and_iter_sorted():
+    async def test(repo):
+        sort = Sort.by("value", direction=Direction.DES)
+        assert [r.value for r in await repo.find_all(sort)] == ["value 3", "value 2", "value 1"]
+        page = await repo.find_page(PageRequest.of_size(2), sort)
+        assert [r.value for r in page.content] == ["value 3", "value 2"]
+        assert page.total_elements == 3
+        first = await repo.find_slice(2, sort)
+        second = await repo.find_slice(2, sort, after=first.next_cursor)
+        assert [r.value for r in second.content] == ["value 1"]
+        assert [r.value async for r in repo.iter_all(sort, batch_size=2)] == ["value 3", "value 2", "value 1"]
+    _run(test)
+
+
+def test_find_slice_nullable_sort_key():
+    async def test(repo):
+        repo = NullableRepo(repo._session)
+        ranks = [2, None, 1, None, 3, None]
+        await repo.save_all([AsyncNullableModel(id=i, rank=rank) for i, rank in enumerate(ranks, 1)])
+        for direction, expected in [(Direction.ASC, [2, 4, 6, 3, 1, 5]), (Direction.DES, [5, 1, 3, 2, 4, 6])]:
+            sort = Sort.by("rank", direction=direction)
+            res = await repo.find_slice(2, sort)
+            ids = [r.id for r in res.content]
+            while res.has_next():
+                res = await repo.find_slice(2, sort, after=res.next_cursor)
+                ids += [r.id for r in res.content]
+            assert ids == expected
+    _run(test)
+
+
+def test_find_criteria():
+    async def test(repo):
+        criteria = Range(key="id", gte=2)
+        assert [r.id for r in await repo.find_all(criteria=criteria)] == [2, 3]
+        page = await repo.find_page(PageRequest.of_size(1), Sort.by("id"), criteria=criteria)
+        assert [r.id for r in page.content] == [2]
+        assert page.total_elements == 2
+        assert await repo.count(~criteria) == 1
+    _run(test)
+
+
+def test_find_page_estimated_total():
+    async def test(repo):
+        page = await repo.find_page(PageRequest(number=1, size=2), Sort.by("id"))
+        assert [r.id for r in page.content] == [3]
+        assert page.total_elements == 3
+        repo._count_estimator = lambda session, model: 1000
+        assert (await repo.find_page(PageRequest.of_size(1))).total_elements == 3
+        repo._estimate_threshold = 1000
+        assert (await repo.find_page(PageRequest.of_size(1))).total_elements == 1000
+        page = await repo.find_page(PageRequest(number=1, size=2), Sort.by("id"), total=TotalCount.NONE)
+        assert [r.id for r in page.content] == [3]
+        assert page.total_elements is None and page.is_last()
+    _run(test)
+
+
+def test_find_fields():
+    async def test(repo):
+        assert (await repo.find_all(Sort.by("id"), fields=["value"]))[0] == {"id": 1, "value": "value 1"}
+        assert (await repo.find_page(PageRequest.of_size(1), fields=["id"])).content == [{"id": 1}]
+        assert await repo.find_all_by_id([3, 4], fields=["value"]) == [{"id": 3, "value": "value 3"}, None]
+        assert [r async for r in repo.iter_all(fields=["value"])][1] == {"id": 2, "value": "value 2"}
+    _run(test)
+
+
+def test_save():
+    async def test(repo):
+        model = await repo.save(AsyncTestModel(value="value 4"))
+        assert model.id == 4
+        model.value = "value 4bis"
+        await repo.save(model)
+        assert (await repo.find_by_id(4)).value == "value 4bis"
+    _run(test)
+
+
+def test_transaction_rollback():
+    async def test(repo):
+        with pytest.raises(RuntimeError):
+            async with repo.transaction():
+                await repo.save(AsyncTestModel(value="value 4"))
+                async with repo.transaction():
+                    await repo.delete_by_id(1)
+                raise RuntimeError()
+        assert await repo.count() == 3
+    _run(test)
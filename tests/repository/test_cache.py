@@ -0,0 +1,181 @@
+import pickle
+from unittest import mock
+
+import pytest
+
+from easyrepo.interface.cache import Cache
+from easyrepo.repository.cache import CachingRepository, LRUCache
+from easyrepo.repository.index import HashIndex
+from easyrepo.repository.memory import MemoryRepository
+
+
+class DictRepo(MemoryRepository[dict]):
+    pass
+
+
+class OtherDictRepo(MemoryRepository[dict]):
+    pass
+
+
+class PicklingCache(Cache):
+
+    def __init__(self):
+        self.entries = {}
+
+    def get(self, key, default=None):
+        return pickle.loads(self.entries[key]) if key in self.entries else default
+
+    def set(self, key, value):
+        self.entries[key] = pickle.dumps(value)
+
+    def delete(self, key):
+        self.entries.pop(key, None)
+
+    def clear(self):
+        self.entries.clear()
+
+
+@pytest.fixture
+def backend():
+    backend = DictRepo(indexes=[HashIndex("name")])
+    backend.save_all([{"name": "entity1"}, {"name": "entity2"}, {"name": "entity3"}])
+    yield backend
+
+
+@pytest.fixture
+def repo(backend):
+    repo = CachingRepository(backend, LRUCache(max_size=2))
+    yield repo
+
+
+def test_lru_cache_evicts_least_recently_used():
+    cache = LRUCache(max_size=2)
+    cache.set(1, "a")
+    cache.set(2, "b")
+    assert cache.get(1) == "a"
+    cache.set(3, "c")
+    assert cache.get(2) is None
+    assert cache.get(1) == "a"
+    assert len(cache) == 2
+
+
+def test_lru_cache_ttl():
+    cache = LRUCache(ttl=10)
+    with mock.patch("time.monotonic", return_value=100):
+        cache.set(1, "a")
+    with mock.patch("time.monotonic", return_value=105):
+        assert cache.get(1) == "a"
+    with mock.patch("time.monotonic", return_value=110):
+        assert cache.get(1, "missing") == "missing"
+
+
+def test_lru_cache_invalid_size():
+    with pytest.raises(ValueError):
+        LRUCache(max_size=0)
+
+
+def test_find_by_id(repo, backend):
+    with mock.patch.object(backend, "find_by_id", wraps=backend.find_by_id) as find_by_id:
+        assert repo.find_by_id(1)["name"] == "entity1"
+        assert repo.find_by_id(1)["name"] == "entity1"
+        assert repo.find_by_id(4) is None
+        assert repo.find_by_id(4) is None
+        assert find_by_id.call_count == 2
+    assert repo.stats.hits == 2
+    assert repo.stats.misses == 2
+    assert repo.stats.hit_ratio() == 0.5
+
+
+def test_find_all_by_id_fetches_missing_only(repo, backend):
+    repo.find_by_id(2)
+    with mock.patch.object(backend, "find_all_by_id", wraps=backend.find_all_by_id) as find_all_by_id:
+        res = repo.find_all_by_id([3, 2, 4])
+        find_all_by_id.assert_called_once_with([3, 4])
+    assert res[0]["name"] == "entity3"
+    assert res[1]["name"] == "entity2"
+    assert res[2] is None
+
+
+def test_exists_by_id(repo, backend):
+    with mock.patch.object(backend, "exists_by_id", wraps=backend.exists_by_id) as exists_by_id:
+        assert repo.exists_by_id(1)
+        assert repo.exists_by_id(1)
+        assert not repo.exists_by_id(4)
+        assert exists_by_id.call_count == 2
+    assert repo.find_by_id(1)["name"] == "entity1"
+
+
+def test_save_writes_through(repo, backend):
+    model = repo.save({"name": "entity4"})
+    with mock.patch.object(backend, "find_by_id") as find_by_id:
+        assert repo.find_by_id(model["id"]) is model
+        find_by_id.assert_not_called()
+
+
+def test_save_invalidates(backend):
+    repo = CachingRepository(backend, write_through=False)
+    repo.find_by_id(1)
+    repo.save({"id": 1, "name": "entity1bis"})
+    assert repo.stats.misses == 1
+    assert repo.find_by_id(1)["name"] == "entity1bis"
+    assert repo.stats.misses == 2
+
+
+def test_delete_invalidates(repo):
+    repo.find_by_id(1)
+    repo.find_by_id(2)
+    repo.delete_by_id(1)
+    assert repo.find_by_id(1) is None
+    repo.delete_all_by_id([2])
+    assert repo.find_by_id(2) is None
+    repo.find_by_id(3)
+    repo.delete_all()
+    assert repo.find_by_id(3) is None
+
+
+def test_delegates_other_methods(repo):
+    assert repo.count() == 3
+    assert len(repo.find_all()) == 3
+    assert [m["id"] for m in repo.find_by(name="entity2")] == [2]
+
+
+def test_shared_cache(backend):
+    cache = LRUCache()
+    other_backend = OtherDictRepo()
+    other_backend.save_all([{"name": "other1"}])
+    repo = CachingRepository(backend, cache)
+    other_repo = CachingRepository(other_backend, cache)
+    assert repo.find_by_id(1)["name"] == "entity1"
+    assert other_repo.find_by_id(1)["name"] == "other1"
+    assert not other_repo.exists_by_id(2)
+    assert repo.exists_by_id(2)
+    other_repo.delete_by_id(1)
+    assert repo.find_by_id(1)["name"] == "entity1"
+    assert set(cache._entries) == {("DictRepo", 1), ("DictRepo", 2), ("OtherDictRepo", 2)}
+
+
+def test_serializing_cache(backend):
+    repo = CachingRepository(backend, PicklingCache())
+    assert repo.exists_by_id(1)
+    assert repo.exists_by_id(1)
+    assert repo.find_by_id(1) == {"id": 1, "name": "entity1"}
+    assert repo.find_all_by_id([1, 2]) == [{"id": 1, "name": "entity1"}, {"id": 2, "name": "entity2"}]
+    assert repo.stats.hits == 2
+
+
+def test_delete_all_keeps_other_namespaces(backend):
+    cache = LRUCache()
+    other_backend = OtherDictRepo()
+    other_backend.save_all([{"name": "other1"}])
+    repo = CachingRepository(backend, cache)
+    other_repo = CachingRepository(other_backend, cache)
+    repo.find_by_id(1)
+    other_repo.find_by_id(1)
+    repo.delete_all()
+    assert repo.find_by_id(1) is None
+    with mock.patch.object(other_backend, "find_by_id") as find_by_id:
+        assert other_repo.find_by_id(1)["name"] == "other1"
+        find_by_id.assert_not_called()
+    backend.save({"name": "entity4"})
+    assert repo.find_by_id(4)["name"] == "entity4"
+    assert repo.find_by_id(1) is None
@@ -0,0 +1,144 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+
+import pytest
+
+from easyrepo.repository.loader import AsyncBatchLoader, BatchLoader
+from easyrepo.repository.memory import MemoryRepository
+
+
+class DictRepo(MemoryRepository[dict]):
+    pass
+
+
+@pytest.fixture
+def repo():
+    repo = DictRepo()
+    repo.save_all([{"name": f"entity{i}"} for i in range(1, 6)])
+    yield repo
+
+
+def test_load_coalesces_threads(repo):
+    loader = BatchLoader(repo, window=0.05)
+    with mock.patch.object(repo, "find_all_by_id", wraps=repo.find_all_by_id) as find_all_by_id:
+        with ThreadPoolExecutor(max_workers=5) as executor:
+            res = list(executor.map(loader.load, [1, 2, 3, 6, 2]))
+        assert find_all_by_id.call_count == 1
+        assert sorted(find_all_by_id.call_args[0][0]) == [1, 2, 3, 6]
+    assert [r["name"] if r else None for r in res] == ["entity1", "entity2", "entity3", None, "entity2"]
+
+
+def test_load_memoizes(repo):
+    loader = BatchLoader(repo, window=0)
+    with mock.patch.object(repo, "find_all_by_id", wraps=repo.find_all_by_id) as find_all_by_id:
+        assert [r["id"] for r in loader.load_many([1, 2])] == [1, 2]
+        assert loader.load(2)["id"] == 2
+        assert find_all_by_id.call_count == 1
+        loader.clear(2)
+        assert loader.load(2)["id"] == 2
+        assert find_all_by_id.call_args[0][0] == [2]
+
+
+def test_load_failure_is_not_memoized(repo):
+    loader = BatchLoader(repo, window=0)
+    with mock.patch.object(repo, "find_all_by_id", side_effect=RuntimeError("down")):
+        with pytest.raises(RuntimeError):
+            loader.load(1)
+    assert loader.load(1)["id"] == 1
+
+
+def test_load_interruption_resolves_waiting_threads(repo):
+    loader = BatchLoader(repo, window=0.05)
+
+    def load(id):
+        try:
+            return loader.load(id)
+        except KeyboardInterrupt as e:
+            return e
+
+    with mock.patch.object(repo, "find_all_by_id", side_effect=KeyboardInterrupt()):
+        with ThreadPoolExecutor(max_workers=3) as executor:
+            res = list(executor.map(load, [1, 2, 3]))
+    assert all(isinstance(r, KeyboardInterrupt) for r in res)
+    assert loader.load(1)["id"] == 1
+
+
+def test_async_load_cancelled_batch(repo):
+    class AsyncRepo:
+
+        async def find_all_by_id(self, ids):
+            await asyncio.sleep(1)
+
+    loader = AsyncBatchLoader(AsyncRepo())
+
+    async def main():
+        waiting = asyncio.ensure_future(loader.load(1))
+        await asyncio.sleep(0.01)
+        for task in loader._tasks:
+            task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await asyncio.wait_for(waiting, 1)
+
+    asyncio.run(main())
+
+
+def test_async_load_coalesces_tasks(repo):
+    loader = AsyncBatchLoader(repo)
+
+    async def main():
+        return await asyncio.gather(loader.load(1), loader.load(3), loader.load_many([3, 6]))
+
+    with mock.patch.object(repo, "find_all_by_id", wraps=repo.find_all_by_id) as find_all_by_id:
+        first, third, many = asyncio.run(main())
+        find_all_by_id.assert_called_once_with([1, 3, 6])
+    assert first["name"] == "entity1"
+    assert third["name"] == "entity3"
+    assert many[0] is third
+    assert many[1] is None
+
+
+def test_async_load_cancellation(repo):
+    loader = AsyncBatchLoader(repo, window=0.01)
+
+    async def main():
+        cancelled = asyncio.ensure_future(loader.load(1))
+        many = asyncio.ensure_future(loader.load_many([1, 2]))
+        waiting = asyncio.ensure_future(loader.load(1))
+        await asyncio.sleep(0)
+        cancelled.cancel()
+        many.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await cancelled
+        with pytest.raises(asyncio.CancelledError):
+            await many
+        return await waiting, await loader.load(2)
+
+    with mock.patch.object(repo, "find_all_by_id", wraps=repo.find_all_by_id) as find_all_by_id:
+        first, second = asyncio.run(main())
+        find_all_by_id.assert_called_once_with([1, 2])
+    assert first["id"] == 1
+    assert second["id"] == 2
+    assert not loader._tasks
+
+
+def test_async_load_async_repository(repo):
+    class AsyncRepo:
+        calls = []
+
+        async def find_all_by_id(self, ids):
+            self.calls.append(ids)
+            return repo.find_all_by_id(ids)
+
+    async_repo = AsyncRepo()
+    loader = AsyncBatchLoader(async_repo, window=0.01)
+
+    async def main():
+        first = asyncio.ensure_future(loader.load(1))
+        await asyncio.sleep(0)
+        second = await loader.load(2)
+        return await first, second, await loader.load(1)
+
+    res = asyncio.run(main())
+    assert [r["id"] for r in res] == [1, 2, 1]
+    assert async_repo.calls == [[1, 2]]
@@ -1,10 +1,19 @@
+import threading
+import time
+import uuid
+from unittest import mock
 from typing import Optional
 
 import pytest
 from pydantic import BaseModel
 
-from easyrepo.model.paging import PageRequest
+from easyrepo.model.criteria import Eq, Exists, In, Range
+from easyrepo.model.identity import UUIDGenerator
+from easyrepo.model.paging import PageRequest, TotalCount
+from easyrepo.model.sorting import Sort, Direction, Order
+from easyrepo.repository.index import HashIndex, SortedIndex
 from easyrepo.repository.memory import MemoryRepository
+from easyrepo.repository.wal import WriteAheadLog
 
 
 class TestModel(BaseModel):
@@ -31,6 +40,17 @@ def dict_repo():
     yield repo
 
 
+@pytest.fixture
+def indexed_repo():
+    repo = DictRepo(indexes=[HashIndex("name"), SortedIndex("rank")])
+    repo.save_all([
+        {"name": "entity1", "rank": 3},
+        {"name": "entity2", "rank": 1},
+        {"name": "entity2", "rank": 2}
+    ])
+    yield repo
+
+
 @pytest.fixture
 def model_repo():
     repo = ModelRepo()
@@ -61,20 +81,106 @@ def test_exists_by_id(dict_repo):
     assert not dict_repo.exists_by_id(4)
 
 
+def test_exists_all_by_id(dict_repo):
+    assert dict_repo.exists_all_by_id([1, 4, 3]) == {1: True, 4: False, 3: True}
+
+
 def test_find_all(dict_repo):
     assert len(dict_repo.find_all()) == 3
 
+    res = dict_repo.find_all(sort=Sort.by("name", direction=Direction.DES))
+    assert [r["name"] for r in res] == ["entity3", "entity2", "entity1"]
+
+
+def test_find_all_multiple_orders(indexed_repo):
+    sort = Sort(orders=[Order(key="name", direction=Direction.DES), Order(key="rank", direction=Direction.ASC)])
+    assert [r["id"] for r in indexed_repo.find_all(sort)] == [2, 3, 1]
+
+
+def test_iter_all(dict_repo):
+    res = dict_repo.iter_all()
+    dict_repo.save({"name": "entity4"})
+    assert [r["id"] for r in res] == [1, 2, 3]
+
+    res = dict_repo.iter_all(Sort.by("name", direction=Direction.DES), batch_size=2)
+    assert [r["id"] for r in res] == [4, 3, 2, 1]
+
+
+def test_iter_all_concurrent():
+    repo = DictRepo(concurrent=True)
+    repo.save_all([{"name": "entity1"}, {"name": "entity2"}])
+    res = repo.iter_all()
+    repo.delete_all()
+    assert [r["id"] for r in res] == [1, 2]
+
 
 def test_find_page(dict_repo):
     res = dict_repo.find_page(PageRequest.of_size(2))
     assert len(res.content) == 2
     assert res.total_elements == 3
 
+    res = dict_repo.find_page(PageRequest(number=1, size=2))
+    assert [r["id"] for r in res.content] == [3]
+
+    sort = Sort.by("name", direction=Direction.DES)
+    res = dict_repo.find_page(PageRequest(number=0, size=2), sort)
+    assert [r["id"] for r in res.content] == [3, 2]
+    res = dict_repo.find_page(PageRequest(number=1, size=2), sort)
+    assert [r["id"] for r in res.content] == [1]
+
+
+def test_find_page_consistent_with_find_all(indexed_repo):
+    indexed_repo.save({"name": "entity4"})
+    sort = Sort(orders=[Order(key="name", direction=Direction.DES), Order(key="rank", direction=Direction.DES)])
+    expected = [r["id"] for r in indexed_repo.find_all(sort)]
+    pages = [indexed_repo.find_page(PageRequest(number=n, size=3), sort).content for n in range(2)]
+    assert [r["id"] for page in pages for r in page] == expected
+
+
+def test_find_slice(indexed_repo):
+    indexed_repo.save({"name": "entity4", "rank": 4})
+    res = indexed_repo.find_slice(3)
+    assert [r["id"] for r in res.content] == [1, 2, 3]
+    assert res.has_next()
+    res = indexed_repo.find_slice(3, after=res.next_cursor)
+    assert [r["id"] for r in res.content] == [4]
+    assert not res.has_next()
+
+    sort = Sort.by("name", direction=Direction.DES)
+    ids = []
+    res = indexed_repo.find_slice(1, sort)
+    while res.has_content():
+        ids += [r["id"] for r in res.content]
+        if not res.has_next():
+            break
+        res = indexed_repo.find_slice(1, sort, after=res.next_cursor)
+    assert ids == [4, 2, 3, 1]
+
+
+def test_find_slice_nullable_sort_key():
+    repo = DictRepo()
+    repo.save_all([{"rank": rank} for rank in [2, None, 1, None, 3, None]])
+    for direction, expected in [(Direction.ASC, [2, 4, 6, 3, 1, 5]), (Direction.DES, [5, 1, 3, 2, 4, 6])]:
+        sort = Sort.by("rank", direction=direction)
+        res = repo.find_slice(2, sort)
+        ids = [r["id"] for r in res.content]
+        while res.has_next():
+            res = repo.find_slice(2, sort, after=res.next_cursor)
+            ids += [r["id"] for r in res.content]
+        assert ids == expected
+
 
 def test_find_all_by_id(dict_repo):
     assert len(dict_repo.find_all_by_id([1, 2])) == 2
 
 
+def test_find_all_by_id_keeps_order(dict_repo):
+    res = dict_repo.find_all_by_id([3, 4, 1])
+    assert res[0]["name"] == "entity3"
+    assert res[1] is None
+    assert res[2]["name"] == "entity1"
+
+
 def test_find_by_id(dict_repo):
     assert dict_repo.find_by_id(1)["name"] == "entity1"
     assert dict_repo.find_by_id(4) is None
@@ -88,6 +194,22 @@ def test_save_dict_type(dict_repo):
     assert res["name"] == "entity4bis"
 
 
+def test_save_does_not_reuse_deleted_ids():
+    repo = DictRepo()
+    repo.save_all([{"name": "entity1"}, {"name": "entity2"}, {"name": "entity3"}])
+    repo.delete_by_id(2)
+    assert repo.save({"name": "entity4"})["id"] == 4
+    assert repo.save({"name": "entity5"})["id"] == 5
+    assert repo.count() == 4
+
+
+def test_save_with_id_generator():
+    repo = DictRepo(id_generator=UUIDGenerator())
+    res = repo.save_all([{"name": "entity1"}, {"name": "entity2"}])
+    assert all(isinstance(r["id"], uuid.UUID) for r in res)
+    assert repo.count() == 2
+
+
 def test_save_pydantic_model_type(model_repo):
     res = model_repo.save(TestModel(name="entity1"))
     assert res.id == 1
@@ -119,3 +241,290 @@ def test_save_pydantic_model_type_list(model_repo):
     ])
     assert len(res) == 3
     assert len(model_repo.find_all()) == 3
+
+
+def test_find_by(dict_repo, indexed_repo):
+    assert [r["id"] for r in dict_repo.find_by(name="entity2")] == [2]
+    assert sorted(r["id"] for r in indexed_repo.find_by(name="entity2")) == [2, 3]
+    assert [r["id"] for r in indexed_repo.find_by(name="entity2", rank=2)] == [3]
+    assert indexed_repo.find_by(name="entity4") == []
+
+
+def test_find_by_none(indexed_repo):
+    indexed_repo.save({"name": "entity4"})
+    plain_repo = DictRepo()
+    plain_repo.save_all(indexed_repo.find_all())
+    assert [r["id"] for r in indexed_repo.find_by(rank=None)] == [4]
+    assert [r["id"] for r in plain_repo.find_by(rank=None)] == [4]
+    assert [r["id"] for r in indexed_repo.find_all(criteria=Eq(key="rank", value=None))] == [4]
+    assert [r["id"] for r in indexed_repo.find_all_where("rank", lte=2)] == [2, 3]
+    indexed_repo.delete_by_id(4)
+    assert indexed_repo.find_by(rank=None) == []
+
+
+def test_find_all_where(dict_repo, indexed_repo):
+    assert [r["id"] for r in dict_repo.find_all_where("id", gte=2)] == [2, 3]
+    assert [r["id"] for r in indexed_repo.find_all_where("rank", gt=1)] == [3, 1]
+    assert [r["id"] for r in indexed_repo.find_all_where("rank", lte=2)] == [2, 3]
+
+
+def test_find_all_criteria(dict_repo, indexed_repo):
+    assert [r["id"] for r in dict_repo.find_all(criteria=In(key="name", values=["entity1", "entity3"]))] == [1, 3]
+    assert [r["id"] for r in dict_repo.find_all(criteria=~Eq(key="name", value="entity1"))] == [2, 3]
+    assert dict_repo.count(Exists(key="rank")) == 0
+
+    criteria = Eq(key="name", value="entity2") & (Range(key="rank", gt=1) | Eq(key="rank", value=None))
+    with mock.patch.object(HashIndex, "get", autospec=True, side_effect=HashIndex.get) as get:
+        assert [r["id"] for r in indexed_repo.find_all(criteria=criteria)] == [3]
+        get.assert_called_once()
+    assert indexed_repo.count(criteria) == 1
+    assert indexed_repo.count(Range(key="rank", lt=3)) == 2
+
+
+def test_find_page_without_total(dict_repo):
+    res = dict_repo.find_page(PageRequest(number=0, size=2), total=TotalCount.NONE)
+    assert [r["id"] for r in res.content] == [1, 2]
+    assert res.total_elements is None and res.has_next()
+    assert not dict_repo.find_page(PageRequest(number=1, size=2), total=TotalCount.NONE).has_next()
+
+
+def test_find_page_criteria(indexed_repo):
+    res = indexed_repo.find_page(PageRequest.of_size(1), Sort.by("rank"), criteria=Eq(key="name", value="entity2"))
+    assert [r["id"] for r in res.content] == [2]
+    assert res.total_elements == 2
+
+
+def test_find_all_fields(indexed_repo, model_repo):
+    assert indexed_repo.find_all(Sort.by("rank"), fields=["rank"]) == [
+        {"id": 2, "rank": 1},
+        {"id": 3, "rank": 2},
+        {"id": 1, "rank": 3}
+    ]
+    assert indexed_repo.find_page(PageRequest.of_size(1), fields=["name"]).content == [{"id": 1, "name": "entity1"}]
+    assert indexed_repo.find_all_by_id([3, 4], fields=["name"]) == [{"id": 3, "name": "entity2"}, None]
+    model_repo.save(TestModel(name="model"))
+    assert list(model_repo.iter_all(fields=["id"])) == [{"id": 1}]
+
+
+def test_indexes_follow_writes(indexed_repo):
+    indexed_repo.save({"id": 1, "name": "entity2", "rank": 0})
+    assert sorted(r["id"] for r in indexed_repo.find_by(name="entity2")) == [1, 2, 3]
+    assert [r["id"] for r in indexed_repo.find_all_where("rank", lt=2)] == [1, 2]
+
+    indexed_repo.delete_by_id(2)
+    assert sorted(r["id"] for r in indexed_repo.find_by(name="entity2")) == [1, 3]
+
+    indexed_repo.delete_all_by_id([1, 3])
+    assert indexed_repo.find_by(name="entity2") == []
+
+    indexed_repo.save({"name": "entity5", "rank": 5})
+    indexed_repo.delete_all()
+    assert indexed_repo.find_all_where("rank") == []
+
+
+@pytest.mark.parametrize("concurrent", [False, True])
+def test_save_all_mixed_ids(concurrent):
+    repo = DictRepo(concurrent=concurrent)
+    res = repo.save_all([{"id": 1, "name": "a"}, {"name": "b"}, {"name": "c"}, {"id": 2, "name": "d"}])
+    assert [m["id"] for m in res] == [1, 3, 4, 2]
+    assert repo.count() == 4
+    assert repo.save({"name": "e"})["id"] == 5
+
+
+def test_failed_write_is_rolled_back():
+    repo = DictRepo(indexes=[HashIndex("name")])
+    repo.save_all([{"name": "entity1"}, {"name": "entity2"}])
+    with pytest.raises(ValueError):
+        repo.save_all([{"id": 1, "name": "entity1bis"}, {"name": "entity3"}, 1])
+    with pytest.raises(KeyError):
+        repo.delete_all_by_id([2, 99])
+    assert repo.find_all() == [{"id": 1, "name": "entity1"}, {"id": 2, "name": "entity2"}]
+    assert [m["id"] for m in repo.find_by(name="entity1")] == [1]
+    assert repo.find_by(name="entity3") == []
+
+
+@pytest.mark.parametrize("concurrent", [False, True])
+def test_wal_skips_failed_write(tmp_path, concurrent):
+    with DictRepo(wal=WriteAheadLog(str(tmp_path)), concurrent=concurrent) as repo:
+        repo.save_all([{"name": "entity1"}, {"name": "entity2"}])
+        with pytest.raises(KeyError):
+            repo.delete_all_by_id([1, 99])
+        assert repo.count() == 2
+
+    with DictRepo(wal=WriteAheadLog(str(tmp_path))) as repo:
+        assert repo.find_by_id(1) == {"id": 1, "name": "entity1"}
+        assert repo.count() == 2
+
+
+def test_concurrent_reads_see_snapshots():
+    repo = DictRepo(indexes=[HashIndex("name")], concurrent=True)
+    repo.save_all([{"name": "entity1"}, {"name": "entity2"}])
+    data, indexes = repo._read()
+
+    repo.save({"name": "entity3"})
+    repo.delete_by_id(1)
+    assert len(data) == 2 and len(indexes["name"].get("entity1")) == 1
+    assert repo.count() == 2
+    assert repo.find_by(name="entity1") == []
+
+
+def test_concurrent_failed_write_is_discarded():
+    repo = DictRepo(concurrent=True)
+    repo.save({"name": "entity1"})
+    with pytest.raises(ValueError):
+        repo.save_all([{"name": "entity2"}, 1])
+    assert repo.count() == 1
+
+
+def test_concurrent_writes_and_reads():
+    repo = DictRepo(indexes=[SortedIndex("rank")], concurrent=True)
+    errors = []
+
+    def write(offset):
+        for i in range(100):
+            repo.save({"id": offset + i, "rank": i})
+
+    def read():
+        try:
+            for _ in range(100):
+                data = repo.find_all()
+                assert len(repo.find_all_where("rank", gte=0)) >= len(data)
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=write, args=(n * 100,)) for n in range(4)]
+    threads += [threading.Thread(target=read) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert not errors
+    assert repo.count() == 400
+
+
+def test_concurrent_writes_copy_touched_stripes():
+    repo = DictRepo(indexes=[HashIndex("name"), SortedIndex("rank")], concurrent=True, stripes=4)
+    repo.save_all([{"name": f"entity{i % 3}", "rank": 10 - i} for i in range(10)])
+    stripes = repo._stripes
+    repo.save({"id": 1, "name": "entity1", "rank": 0})
+    assert [old is new for old, new in zip(stripes, repo._stripes)] == [True, False, True, True]
+    assert [r["id"] for r in repo.find_all_where("rank", lte=3)] == [1, 10, 9, 8]
+    assert sorted(r["id"] for r in repo.find_by(name="entity1")) == [1, 2, 5, 8]
+    assert [r["id"] for r in repo.find_all(criteria=Range(key="rank", gte=9))] == [2]
+    assert [r["id"] for r in repo.find_page(PageRequest.of_size(3), Sort.by("rank")).content] == [1, 10, 9]
+    assert repo.exists_all_by_id([1, 11]) == {1: True, 11: False}
+
+
+def test_concurrent_writes_share_untouched_entries():
+    repo = DictRepo(indexes=[SortedIndex("rank")], concurrent=True, stripes=1)
+    repo.save_all([{"rank": i} for i in range(1, 5001)])
+    stripe = repo._stripes[0]
+    repo.save({"id": 1, "rank": 0})
+    updated = repo._stripes[0]
+    assert sum(old is new for old, new in zip(stripe.data._root, updated.data._root)) == 31
+    old_chunks, new_chunks = stripe.indexes["rank"]._keys._chunks, updated.indexes["rank"]._keys._chunks
+    assert sum(old is new for old, new in zip(old_chunks, new_chunks)) == len(old_chunks) - 1
+    assert stripe.data[1]["rank"] == 1 and updated.data[1]["rank"] == 0
+    assert stripe.indexes["rank"].range(lte=1) == [1] and updated.indexes["rank"].range(lte=1) == [1]
+    assert updated.indexes["rank"].get(1) == set()
+
+
+def test_concurrent_bulk_writes_rebuild_stripes():
+    repo = DictRepo(indexes=[HashIndex("name"), SortedIndex("rank")], concurrent=True, stripes=2)
+    repo.save_all([{"name": f"entity{i % 2}", "rank": i % 5} for i in range(100)])
+    repo.delete_all_by_id(range(1, 61))
+    repo.save_all([{"id": id, "name": "entity2", "rank": None} for id in range(95, 105)])
+    assert repo.count() == 44
+    assert sorted(m["id"] for m in repo.find_by(name="entity0")) == list(range(61, 95, 2))
+    assert sorted(m["id"] for m in repo.find_all_where("rank", gte=4)) == list(range(65, 95, 5))
+    assert sorted(m["id"] for m in repo.find_by(rank=None)) == list(range(95, 105))
+    with pytest.raises(KeyError):
+        repo.delete_all_by_id([61, 1])
+    assert repo.count() == 44
+
+
+def test_concurrent_batch_writes_across_stripes():
+    repo = DictRepo(concurrent=True, stripes=4)
+    errors = []
+
+    def write(offset):
+        try:
+            for i in range(50):
+                ids = [offset + i * 5 + n for n in range(5)]
+                repo.save_all([{"id": id, "name": f"entity{id}"} for id in ids])
+                repo.delete_all_by_id(ids[:2])
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=write, args=(n * 1000,)) for n in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert not errors
+    assert repo.count() == 600
+    assert all(r["name"] == f"entity{r['id']}" for r in repo.find_all())
+
+
+def test_wal_restores_dict_type(tmp_path):
+    with DictRepo(wal=WriteAheadLog(str(tmp_path))) as repo:
+        repo.save_all([{"name": "entity1"}, {"name": "entity2"}, {"name": "entity3"}])
+        repo.save({"id": 2, "name": "entity2bis"})
+        repo.delete_by_id(1)
+
+    with DictRepo(indexes=[HashIndex("name")], wal=WriteAheadLog(str(tmp_path))) as repo:
+        assert repo.find_all() == [{"id": 2, "name": "entity2bis"}, {"id": 3, "name": "entity3"}]
+        assert repo.find_by(name="entity3")[0]["id"] == 3
+        repo.delete_all()
+
+    with DictRepo(wal=WriteAheadLog(str(tmp_path))) as repo:
+        assert repo.count() == 0
+
+
+def test_wal_restores_pydantic_model_type(tmp_path):
+    with ModelRepo(wal=WriteAheadLog(str(tmp_path))) as repo:
+        repo.save(TestModel(name="entity1"))
+
+    with ModelRepo(wal=WriteAheadLog(str(tmp_path))) as repo:
+        assert repo.find_by_id(1) == TestModel(id=1, name="entity1")
+
+
+def test_wal_snapshot_compaction(tmp_path):
+    with DictRepo(wal=WriteAheadLog(str(tmp_path), snapshot_every=3)) as repo:
+        for i in range(4):
+            repo.save({"id": i, "name": f"entity{i}"})
+    assert (tmp_path / "snapshot").exists()
+    assert (tmp_path / "wal.log").stat().st_size < (tmp_path / "snapshot").stat().st_size
+
+    with DictRepo(wal=WriteAheadLog(str(tmp_path))) as repo:
+        assert repo.count() == 4
+
+
+def test_wal_ignores_torn_tail(tmp_path):
+    with DictRepo(wal=WriteAheadLog(str(tmp_path))) as repo:
+        repo.save({"name": "entity1"})
+        repo.save({"name": "entity2"})
+    with open(tmp_path / "wal.log", "r+b") as f:
+        f.truncate((tmp_path / "wal.log").stat().st_size - 1)
+
+    with DictRepo(wal=WriteAheadLog(str(tmp_path))) as repo:
+        assert [r["name"] for r in repo.find_all()] == ["entity1"]
+        repo.save({"name": "entity3"})
+    with DictRepo(wal=WriteAheadLog(str(tmp_path))) as repo:
+        assert repo.count() == 2
+
+
+def test_wal_syncs_on_interval(tmp_path):
+    wal = WriteAheadLog(str(tmp_path), sync_every=100, sync_interval=0.05)
+    repo = DictRepo(wal=wal)
+    with mock.patch("os.fsync") as fsync:
+        repo.save({"name": "entity1"})
+        for _ in range(100):
+            if fsync.called:
+                break
+            time.sleep(0.01)
+        assert fsync.called
+    repo.close()
+    repo.close()
+    with DictRepo(wal=WriteAheadLog(str(tmp_path))) as repo:
+        assert repo.count() == 1
@@ -0,0 +1,297 @@
+import asyncio
+import logging
+from unittest import mock
+
+import pytest
+from mongomock import MongoClient
+from pymongo import monitoring
+from sqlalchemy import Column, Integer, String, create_engine, event
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from easyrepo import RepositoryHook, add_hook, remove_hook
+from easyrepo.model.criteria import Criteria
+from easyrepo.model.hook import Histogram, OperationEvent
+from easyrepo.model.mongo import Document
+from easyrepo.model.paging import PageRequest
+from easyrepo.model.sql import Entity
+from easyrepo.repository.async_memory import AsyncMemoryRepository
+from easyrepo.repository.cache import CachingRepository
+from easyrepo.repository.memory import MemoryRepository
+from easyrepo.repository.metrics import LatencyHistograms, OpenTelemetrySpans, SlowOperationLog
+from easyrepo.repository.mongo import MongoRepository, RoundTripListener
+from easyrepo.repository.sql import SqlRepository, _record_statement
+
+
+class MetricsModel(Entity):
+    id = Column(Integer, primary_key=True, index=True)
+    value: str = Column(String, nullable=False)
+
+
+class MongoModel(Document):
+    value: str
+
+
+class DictRepo(MemoryRepository[dict]):
+    pass
+
+
+class AsyncDictRepo(AsyncMemoryRepository[dict]):
+    pass
+
+
+class SqlRepo(SqlRepository[MetricsModel]):
+    pass
+
+
+class MongoRepo(MongoRepository[MongoModel]):
+    pass
+
+
+class Recorder(RepositoryHook):
+
+    def __init__(self):
+        self.events = []
+
+    def on_operation(self, event: OperationEvent):
+        self.events.append(event)
+
+
+@pytest.fixture
+def recorder():
+    recorder = Recorder()
+    add_hook(recorder)
+    yield recorder
+    remove_hook(recorder)
+
+
+@pytest.fixture
+def repo():
+    repo = DictRepo()
+    repo.save_all([{"name": "entity1"}, {"name": "entity2"}])
+    yield repo
+
+
+def test_hook_receives_operations(repo, recorder):
+    repo.find_by_id(1)
+    repo.find_by_id(3)
+    repo.count()
+    repo.save_all([{"name": "entity3"}])
+    assert [(e.operation, e.rows, e.round_trips) for e in recorder.events] == [
+        ("find_by_id", 1, 0),
+        ("find_by_id", 0, 0),
+        ("count", None, 0),
+        ("save_all", 1, 0)
+    ]
+    assert all(e.repository is DictRepo and e.model is dict and e.latency >= 0 for e in recorder.events)
+
+
+def test_hook_reports_errors_and_iterators(repo, recorder):
+    with pytest.raises(ValueError):
+        repo.find_all(criteria=Criteria())
+    iterator = repo.iter_all()
+    assert not [e for e in recorder.events if e.operation == "iter_all"]
+    assert len(list(iterator)) == 2
+    assert [(e.operation, e.rows, type(e.error)) for e in recorder.events] == [
+        ("find_all", None, ValueError),
+        ("iter_all", 2, type(None))
+    ]
+
+
+def test_hook_removed(repo):
+    recorder = Recorder()
+    add_hook(recorder)
+    remove_hook(recorder)
+    repo.find_all()
+    assert recorder.events == []
+
+
+def test_hook_nested_operations(repo, recorder):
+    cached = CachingRepository(repo)
+    cached.find_by_id(1)
+    cached.find_by_id(1)
+    assert [(e.repository, e.operation, e.model) for e in recorder.events] == [
+        (DictRepo, "find_by_id", dict),
+        (CachingRepository, "find_by_id", dict),
+        (CachingRepository, "find_by_id", dict)
+    ]
+
+
+def test_hook_counts_round_trips(recorder):
+    engine = create_engine("sqlite:///:memory:")
+    Entity.metadata.create_all(engine)
+    session = Session(bind=engine)
+    session.add_all([MetricsModel(id=i, value=f"value {i}") for i in range(1, 4)])
+    session.commit()
+    sql_repo = SqlRepo(session, chunk_size=2)
+    sql_repo.find_all_by_id([1, 2, 3])
+    sql_repo.find_page(PageRequest.of_size(2))
+    mongo_repo = MongoRepo(MongoClient().db.collection)
+    mongo_repo.save(MongoModel(value="value"))
+    assert [(e.operation, e.rows, e.round_trips) for e in recorder.events] == [
+        ("find_all_by_id", 3, 2),
+        ("find_page", 2, 1),
+        ("save", 1, 2)
+    ]
+
+
+def test_round_trip_listener_counts_commands(recorder):
+    assert any(isinstance(listener, RoundTripListener) for listener in monitoring._LISTENERS.command_listeners)
+    repo = MongoRepo(MongoClient().db.collection)
+    repo.save_all([MongoModel(value=f"value {i}") for i in range(3)])
+    assert len(list(repo.iter_all(batch_size=2))) == 3
+    find = monitoring.CommandStartedEvent({"find": "collection"}, "db", 1, ("localhost", 0), 1)
+    get_more = monitoring.CommandStartedEvent({"getMore": 1, "collection": "collection"}, "db", 2, ("localhost", 0), 1)
+    with mock.patch.object(repo._collection, "find", side_effect=lambda **kwargs: _notify(find, get_more)):
+        repo.find_all()
+    assert [(e.operation, e.round_trips) for e in recorder.events] == [
+        ("save_all", 1),
+        ("iter_all", 1),
+        ("find_all", 2)
+    ]
+
+
+def _notify(*events):
+    for event in events:
+        for listener in monitoring._LISTENERS.command_listeners + [RoundTripListener()]:
+            listener.started(event)
+    return []
+
+
+def test_statements_recorded_on_repository_binds():
+    engine = create_engine("sqlite:///:memory:")
+    other_engine = create_engine("sqlite:///:memory:")
+    SqlRepo(Session(bind=engine))
+    SqlRepo(Session(bind=engine))
+    SqlRepo(Session())
+    assert not event.contains(Engine, "before_cursor_execute", _record_statement)
+    assert event.contains(engine, "before_cursor_execute", _record_statement)
+    assert not event.contains(other_engine, "before_cursor_execute", _record_statement)
+
+
+def test_repository_hook(repo):
+    other_repo = DictRepo()
+    recorder = Recorder()
+    repo.add_hook(recorder)
+    repo.find_by_id(1)
+    other_repo.find_by_id(1)
+    async_repo = AsyncDictRepo()
+    async_repo.add_hook(recorder)
+    asyncio.run(async_repo.count())
+    repo.remove_hook(recorder)
+    repo.count()
+    assert [(e.repository, e.operation) for e in recorder.events] == [
+        (DictRepo, "find_by_id"),
+        (AsyncDictRepo, "count")
+    ]
+
+
+def test_hook_async_operations(recorder):
+    repo = AsyncDictRepo()
+
+    async def main():
+        await repo.save_all([{"name": "entity1"}, {"name": "entity2"}])
+        return [m async for m in repo.iter_all()]
+
+    assert len(asyncio.run(main())) == 2
+    assert [(e.repository.__name__, e.operation, e.rows) for e in recorder.events] == [
+        ("MemoryRepository", "save_all", 2),
+        ("AsyncDictRepo", "save_all", 2),
+        ("MemoryRepository", "iter_all", 2),
+        ("AsyncDictRepo", "iter_all", 2)
+    ]
+
+
+def test_latency_histograms(repo):
+    histograms = LatencyHistograms(bounds=[0.001, 1])
+    add_hook(histograms)
+    try:
+        for _ in range(3):
+            repo.find_all()
+    finally:
+        remove_hook(histograms)
+    histogram = histograms.snapshot()[("find_all", dict)]
+    assert histogram.count == 3 and histogram.rows == 6
+    assert sum(histogram.counts) == 3
+    histograms.reset()
+    assert histograms.snapshot() == {}
+
+
+def test_histogram_quantiles():
+    histogram = Histogram.of_bounds([0.01, 0.1, 1])
+    for latency in [0.005, 0.005, 0.05, 0.5, 2]:
+        histogram.record(OperationEvent(operation="find_all", repository=DictRepo, started_at=0, latency=latency))
+    assert histogram.counts == [2, 1, 1, 1]
+    assert histogram.quantile(0.4) == 0.01
+    assert histogram.quantile(0.5) == 0.1
+    assert histogram.quantile(0.99) == 2
+    assert histogram.mean() == pytest.approx(0.512)
+
+
+def test_slow_operation_log(repo, caplog):
+    log = SlowOperationLog(threshold=0)
+    add_hook(log)
+    try:
+        with caplog.at_level(logging.WARNING, logger="easyrepo.slow"):
+            repo.find_by_id(1)
+    finally:
+        remove_hook(log)
+    assert len(caplog.records) == 1
+    assert caplog.records[0].getMessage().startswith("DictRepo.find_by_id took")
+    assert "(1 rows, 0 round trips)" in caplog.records[0].getMessage()
+
+
+def test_open_telemetry_spans(repo):
+    class Span:
+        def __init__(self, name, **options):
+            self.name = name
+            self.options = options
+            self.exceptions = []
+
+        def record_exception(self, exception):
+            self.exceptions.append(exception)
+
+        def set_status(self, status):
+            pass
+
+        def end(self, end_time):
+            self.end_time = end_time
+
+    class Tracer:
+        spans = []
+
+        def start_span(self, name, **options):
+            self.spans.append(Span(name, **options))
+            return self.spans[-1]
+
+    spans = OpenTelemetrySpans(Tracer())
+    add_hook(spans)
+    try:
+        repo.find_all()
+        with pytest.raises(ValueError):
+            repo.count(Criteria())
+    finally:
+        remove_hook(spans)
+    first, second = Tracer.spans
+    assert first.name == "DictRepo.find_all"
+    assert first.options["attributes"]["easyrepo.rows"] == 2
+    assert first.end_time >= first.options["start_time"]
+    assert isinstance(second.exceptions[0], ValueError)
+
+
+def test_open_telemetry_exporter(repo):
+    trace = pytest.importorskip("opentelemetry.sdk.trace")
+    export = pytest.importorskip("opentelemetry.sdk.trace.export")
+    in_memory = pytest.importorskip("opentelemetry.sdk.trace.export.in_memory_span_exporter")
+    exporter = in_memory.InMemorySpanExporter()
+    provider = trace.TracerProvider()
+    provider.add_span_processor(export.SimpleSpanProcessor(exporter))
+    spans = OpenTelemetrySpans(provider.get_tracer("easyrepo"))
+    add_hook(spans)
+    try:
+        repo.find_by_id(1)
+    finally:
+        remove_hook(spans)
+    span, = exporter.get_finished_spans()
+    assert span.name == "DictRepo.find_by_id"
+    assert span.attributes["easyrepo.round_trips"] == 0
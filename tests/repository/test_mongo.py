@@ -1,8 +1,14 @@
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+
 import pytest
+from bson import ObjectId
 from mongomock import MongoClient
 
+from easyrepo.model.criteria import Eq, Exists, In, Range
+from easyrepo.model.identity import ObjectIdGenerator
 from easyrepo.model.mongo import Document
-from easyrepo.model.paging import PageRequest
+from easyrepo.model.paging import PageRequest, TotalCount
 from easyrepo.model.sorting import Sort, Direction
 from easyrepo.repository.mongo import MongoRepository
 
@@ -63,6 +69,13 @@ def test_delete_by_id(collection, dict_repo):
 def test_exists_by_id(collection, dict_repo):
     ids = _insert_documents(collection, 3)
     assert dict_repo.exists_by_id(ids[0])
+    assert not dict_repo.exists_by_id(ObjectId())
+
+
+def test_exists_all_by_id(collection, dict_repo):
+    ids = _insert_documents(collection, 2)
+    missing = ObjectId()
+    assert dict_repo.exists_all_by_id([ids[0], missing, ids[1]]) == {ids[0]: True, missing: False, ids[1]: True}
 
 
 def test_find_all_dict_type(collection, dict_repo):
@@ -81,6 +94,62 @@ def test_find_all_pydantic_model_type(collection, model_repo):
     assert [r.value for r in res] == ["value 2", "value 1", "value 0"]
 
 
+def test_iter_all(collection, model_repo):
+    _insert_documents(collection, 3)
+    res = model_repo.iter_all(Sort.by("value", direction=Direction.DES), batch_size=2)
+    assert not isinstance(res, list)
+    assert [r.value for r in res] == ["value 2", "value 1", "value 0"]
+
+
+def test_find_all_criteria(collection, dict_repo, model_repo):
+    ids = _insert_documents(collection, 4)
+    criteria = In(key="value", values=["value 0", "value 2", "value 3"]) & ~Eq(key="value", value="value 2")
+    assert [r["value"] for r in dict_repo.find_all(criteria=criteria)] == ["value 0", "value 3"]
+    assert dict_repo.count(criteria) == 2
+    assert dict_repo.count(Exists(key="other")) == 0
+    assert [r.id for r in model_repo.find_all(criteria=Eq(key="id", value=ids[1]))] == [ids[1]]
+    criteria = Range(key="value", gt="value 0", lte="value 2") | Eq(key="value", value="value 3")
+    assert dict_repo._filter_query(criteria) == {"$or": [
+        {"value": {"$gt": "value 0", "$lte": "value 2"}},
+        {"value": "value 3"}
+    ]}
+    assert model_repo.count(criteria) == 3
+
+
+def test_find_page_criteria(collection, dict_repo):
+    _insert_documents(collection, 4)
+    criteria = Range(key="value", gte="value 1")
+    page = dict_repo.find_page(PageRequest.of_size(2), Sort.by("value"), criteria=criteria)
+    assert [r["value"] for r in page.content] == ["value 1", "value 2"]
+    assert page.total_elements == 3
+
+
+def test_find_all_fields(collection, dict_repo, model_repo):
+    ids = _insert_documents(collection, 2)
+    collection.update_many({}, {"$set": {"other": "other"}})
+    assert dict_repo.find_all(fields=["value"]) == [{"_id": i, "value": f"value {n}"} for n, i in enumerate(ids)]
+    res = model_repo.find_all(Sort.by("value", direction=Direction.DES), fields=["id"])
+    assert res == [{"id": ids[1]}, {"id": ids[0]}]
+    page = model_repo.find_page(PageRequest.of_size(1), fields=["value"])
+    assert page.content == [{"id": ids[0], "value": "value 0"}]
+    assert page.total_elements == 2
+    page = model_repo.find_page(PageRequest.of_size(1), fields=["other"], total=TotalCount.NONE)
+    assert page.content == [{"id": ids[0], "other": "other"}]
+    res = model_repo.find_all_by_id([ids[1], ObjectId()], fields=["value"])
+    assert res == [{"id": ids[1], "value": "value 1"}, None]
+    assert list(model_repo.iter_all(fields=["other"])) == [{"id": i, "other": "other"} for i in ids]
+
+
+def test_trusted_model_type(collection):
+    repo = ModelRepo(collection, trusted=True)
+    id = collection.insert_one({"value": 1}).inserted_id
+    assert repo.find_by_id(id) == TestModel.construct(id=id, value=1)
+    assert ModelRepo(collection).find_by_id(id).value == "1"
+    page = repo.find_page(PageRequest.of_size(1))
+    assert page.content == [TestModel.construct(id=id, value=1)]
+    assert page.total_elements == 1
+
+
 def test_find_page_dict_type(collection, dict_repo):
     _insert_documents(collection, 3)
     res = dict_repo.find_page(PageRequest.of_size(2))
@@ -95,6 +164,87 @@ def test_find_page_pydantic_model_type(collection, model_repo):
     assert res.total_elements == 3
 
 
+def test_find_page_sorted(collection, dict_repo):
+    _insert_documents(collection, 3)
+    res = dict_repo.find_page(PageRequest(number=1, size=2), Sort.by("value", direction=Direction.DES))
+    assert [r["value"] for r in res.content] == ["value 0"]
+    assert res.total_elements == 3
+
+    res = dict_repo.find_page(PageRequest(number=2, size=2))
+    assert res.content == [] and res.total_elements == 3
+
+
+def test_find_page_without_total(collection, dict_repo):
+    _insert_documents(collection, 3)
+    with mock.patch.object(collection, "estimated_document_count") as count:
+        res = dict_repo.find_page(PageRequest.of_size(2), total=TotalCount.NONE)
+    assert count.call_count == 0
+    assert len(res.content) == 2
+    assert res.total_elements is None and res.has_next()
+    assert not dict_repo.find_page(PageRequest(number=1, size=2), total=TotalCount.NONE).has_next()
+
+
+def test_find_page_estimated_total(collection, model_repo):
+    _insert_documents(collection, 3)
+    with mock.patch.object(collection, "estimated_document_count", return_value=10), \
+            mock.patch.object(collection, "aggregate") as aggregate:
+        res = model_repo.find_page(PageRequest(number=1, size=2), total=TotalCount.ESTIMATED)
+    assert aggregate.call_count == 0
+    assert [r.value for r in res.content] == ["value 2"]
+    assert res.total_elements == 10 and res.total_estimated
+    assert res.is_last() and res.total_pages() == 2
+    criteria = Eq(key="value", value="value 0")
+    res = model_repo.find_page(PageRequest.of_size(2), criteria=criteria, total=TotalCount.ESTIMATED)
+    assert res.total_elements == 1 and not res.total_estimated
+
+
+def test_find_slice_dict_type(collection, dict_repo):
+    ids = _insert_documents(collection, 3)
+    collection.insert_one({"value": "value 1"})
+    res = dict_repo.find_slice(2)
+    assert [r["_id"] for r in res.content] == ids[0:2]
+    res = dict_repo.find_slice(2, after=res.next_cursor)
+    assert len(res.content) == 2 and not res.has_next()
+
+    sort = Sort.by("value", direction=Direction.DES)
+    res = dict_repo.find_slice(2, sort)
+    assert [r["value"] for r in res.content] == ["value 2", "value 1"]
+    res = dict_repo.find_slice(2, sort, after=res.next_cursor)
+    assert [r["value"] for r in res.content] == ["value 1", "value 0"]
+    assert not res.has_next()
+
+
+def test_find_slice_nullable_sort_key(collection, dict_repo):
+    ids = collection.insert_many([{"rank": 2}, {"rank": None}, {"rank": 1}, {}, {"rank": 3}, {"rank": None}])
+    ids = ids.inserted_ids
+    for direction, expected in [(Direction.ASC, [1, 3, 5, 2, 0, 4]), (Direction.DES, [4, 0, 2, 1, 3, 5])]:
+        sort = Sort.by("rank", direction=direction)
+        res = dict_repo.find_slice(2, sort)
+        found = [r["_id"] for r in res.content]
+        while res.has_next():
+            res = dict_repo.find_slice(2, sort, after=res.next_cursor)
+            found += [r["_id"] for r in res.content]
+        assert found == [ids[i] for i in expected]
+
+
+def test_find_slice_pydantic_model_type(collection, model_repo):
+    _insert_documents(collection, 3)
+    res = model_repo.find_slice(2, Sort.by("value"))
+    assert [r.value for r in res.content] == ["value 0", "value 1"]
+    res = model_repo.find_slice(2, Sort.by("value"), after=res.next_cursor)
+    assert [r.value for r in res.content] == ["value 2"]
+
+
+def test_sort_by_id_pydantic_model_type(collection, model_repo):
+    ids = _insert_documents(collection, 3)
+    sort = Sort.by("id", direction=Direction.DES)
+    assert [r.id for r in model_repo.find_all(sort=sort)] == ids[::-1]
+    assert [r.id for r in model_repo.find_page(PageRequest.of_size(2), sort).content] == ids[:0:-1]
+    res = model_repo.find_slice(2, sort)
+    assert [r.id for r in res.content] == ids[:0:-1]
+    assert [r.id for r in model_repo.find_slice(2, sort, after=res.next_cursor).content] == ids[:1]
+
+
 def test_find_all_by_id_dict_type(collection, dict_repo):
     ids = _insert_documents(collection, 3)
     assert len(dict_repo.find_all_by_id(ids[0:2])) == 2
@@ -105,6 +255,34 @@ def test_find_all_by_id_pydantic_model_type(collection, model_repo):
     assert len(model_repo.find_all_by_id(ids[0:2])) == 2
 
 
+def test_find_all_by_id_keeps_order(collection, model_repo):
+    ids = _insert_documents(collection, 3)
+    res = model_repo.find_all_by_id([ids[2], ObjectId(), ids[0], ids[2]])
+    assert res[0].value == "value 2"
+    assert res[1] is None
+    assert res[2].value == "value 0"
+    assert res[3].value == "value 2"
+
+
+def test_find_all_by_id_chunks(collection):
+    ids = _insert_documents(collection, 5)
+    repo = DictRepo(collection, chunk_size=2)
+    with mock.patch.object(collection, "find", wraps=collection.find) as find:
+        res = repo.find_all_by_id(list(reversed(ids)))
+        assert find.call_count == 3
+    assert [r["value"] for r in res] == ["value 4", "value 3", "value 2", "value 1", "value 0"]
+    missing = ObjectId()
+    assert repo.exists_all_by_id([ids[0], ids[4], missing]) == {ids[0]: True, ids[4]: True, missing: False}
+
+
+def test_find_all_by_id_executor(collection):
+    ids = _insert_documents(collection, 5)
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        repo = DictRepo(collection, chunk_size=2, executor=executor)
+        res = repo.find_all_by_id(ids)
+    assert [r["value"] for r in res] == ["value 0", "value 1", "value 2", "value 3", "value 4"]
+
+
 def test_find_by_id_dict_type(collection, dict_repo):
     ids = _insert_documents(collection, 3)
     assert dict_repo.find_by_id(ids[0])["value"] == "value 0"
@@ -160,5 +338,56 @@ def test_save_pydantic_model_type_list(collection, model_repo):
     assert len(model_repo.find_all()) == 5
 
 
+def test_save_without_read_back(collection):
+    repo = ModelRepo(collection, read_back=False)
+    with mock.patch.object(collection, "find_one", wraps=collection.find_one) as find_one:
+        res = repo.save(TestModel(value="value 0"))
+        assert res.id is not None and res.value == "value 0"
+        res.value = "value 1"
+        res = repo.save(res)
+    assert find_one.call_count == 0
+    assert res.value == "value 1"
+    assert repo.find_by_id(res.id).value == "value 1"
+
+
+def test_save_with_read_back_per_call(collection, dict_repo):
+    ids = _insert_documents(collection, 1)
+    with mock.patch.object(collection, "find_one_and_replace", wraps=collection.find_one_and_replace) as replace:
+        res = dict_repo.save({"_id": ids[0], "value": "value 0bis"}, read_back=True)
+    assert replace.call_count == 1
+    assert res == {"_id": ids[0], "value": "value 0bis"}
+    missing = ObjectId()
+    assert dict_repo.save({"_id": missing, "value": "missing"}) == {"_id": missing, "value": "missing"}
+    assert dict_repo.save({"_id": ObjectId(), "value": "missing"}, read_back=False)["value"] == "missing"
+    assert dict_repo.count() == 3
+
+
+def test_save_all_bulk_writes(collection):
+    repo = ModelRepo(collection, batch_size=2)
+    ids = _insert_documents(collection, 3)
+    models = [TestModel(value=f"value {i}") for i in range(3, 8)]
+    models += [TestModel(id=ids[0], value="value 0bis"), TestModel(id=ObjectId(), value="value 8")]
+    with mock.patch.object(collection, "insert_many", wraps=collection.insert_many) as insert_many, \
+            mock.patch.object(collection, "bulk_write", wraps=collection.bulk_write) as bulk_write, \
+            mock.patch.object(collection, "find_one", wraps=collection.find_one) as find_one:
+        res = repo.save_all(models, ordered=False)
+    assert insert_many.call_count == 3 and bulk_write.call_count == 1 and find_one.call_count == 0
+    assert [r.value for r in res] == [m.value for m in models]
+    assert all(r.id is not None for r in res)
+    assert repo.count() == 9
+    assert repo.find_by_id(ids[0]).value == "value 0bis"
+    assert repo.find_by_id(res[2].id).value == "value 5"
+
+
+def test_save_with_id_generator(collection):
+    repo = ModelRepo(collection, id_generator=ObjectIdGenerator())
+    first = repo.save(TestModel(value="value 0"))
+    assert first.id is not None
+
+    res = repo.save_all([TestModel(value="value 1"), TestModel(value="value 2"), first])
+    assert res[0].id > first.id and res[1].id > res[0].id and res[2].id == first.id
+    assert repo.count() == 3
+
+
 def _insert_documents(collection, size):
     return [collection.insert_one({"value": f"value {i}"}).inserted_id for i in range(size)]
@@ -1,7 +1,11 @@
+from concurrent.futures import ThreadPoolExecutor
+
 import pytest
-from mongoengine import Document, connect, disconnect, StringField
+from bson import ObjectId
+from mongoengine import Document, IntField, connect, disconnect, StringField
 
-from easyrepo.model.paging import PageRequest
+from easyrepo.model.criteria import Eq, Exists, In, Range
+from easyrepo.model.paging import PageRequest, TotalCount
 from easyrepo.model.sorting import Sort, Direction
 from easyrepo.repository.mongoengine import MongoEngineRepository
 
@@ -14,6 +18,14 @@ class TestRepo(MongoEngineRepository[TestModel]):
     pass
 
 
+class NullableModel(Document):
+    rank: int = IntField(db_field="r")
+
+
+class NullableRepo(MongoEngineRepository[NullableModel]):
+    pass
+
+
 class IntRepo(MongoEngineRepository[int]):
     pass
 
@@ -62,6 +74,13 @@ def test_delete_by_id(repo):
 def test_exists_by_id(repo):
     ids = _insert_documents(3)
     assert repo.exists_by_id(ids[0])
+    assert not repo.exists_by_id(ObjectId())
+
+
+def test_exists_all_by_id(repo):
+    ids = _insert_documents(2)
+    missing = ObjectId()
+    assert repo.exists_all_by_id([ids[0], missing, ids[1]]) == {ids[0]: True, missing: False, ids[1]: True}
 
 
 def test_find_all(repo):
@@ -72,6 +91,50 @@ def test_find_all(repo):
     assert [r.value for r in res] == ["value 2", "value 1", "value 0"]
 
 
+def test_iter_all(repo):
+    _insert_documents(3)
+    res = repo.iter_all(Sort.by("value", direction=Direction.DES), batch_size=2)
+    assert not isinstance(res, list)
+    assert [r.value for r in res] == ["value 2", "value 1", "value 0"]
+
+
+def test_find_all_criteria(repo):
+    ids = _insert_documents(4)
+    criteria = In(key="value", values=["value 0", "value 2", "value 3"]) & ~Eq(key="value", value="value 2")
+    assert [r.value for r in repo.find_all(criteria=criteria)] == ["value 0", "value 3"]
+    assert repo.count(criteria) == 2
+    assert repo.count(~Exists(key="value")) == 0
+    assert [r.id for r in repo.find_all(criteria=Eq(key="id", value=ids[1]))] == [ids[1]]
+    criteria = ~(Range(key="value", gt="value 0", lte="value 2") | Eq(key="value", value="value 3"))
+    assert [r.value for r in repo.find_all(criteria=criteria)] == ["value 0"]
+
+
+def test_find_page_without_exact_total(repo):
+    _insert_documents(3)
+    res = repo.find_page(PageRequest.of_size(2), total=TotalCount.NONE)
+    assert [r.value for r in res.content] == ["value 0", "value 1"]
+    assert res.total_elements is None and res.has_next()
+    res = repo.find_page(PageRequest(number=1, size=2), total=TotalCount.ESTIMATED)
+    assert [r.value for r in res.content] == ["value 2"]
+    assert res.total_elements == 3 and res.total_estimated and res.is_last()
+
+
+def test_find_all_fields(repo):
+    ids = _insert_documents(2)
+    res = repo.find_all(fields=["id"])
+    assert [(r.id, r.value) for r in res] == [(ids[0], None), (ids[1], None)]
+    assert [r.value for r in repo.find_page(PageRequest.of_size(1), fields=["value"]).content] == ["value 0"]
+    assert [r.value if r else None for r in repo.find_all_by_id([ids[1], ObjectId()], fields=["id"])] == [None, None]
+    assert [r.value for r in repo.iter_all(fields=["value"])] == ["value 0", "value 1"]
+
+
+def test_find_page_criteria(repo):
+    _insert_documents(4)
+    page = repo.find_page(PageRequest.of_size(2), Sort.by("value"), criteria=Range(key="value", gte="value 1"))
+    assert [r.value for r in page.content] == ["value 1", "value 2"]
+    assert page.total_elements == 3
+
+
 def test_find_page(repo):
     _insert_documents(3)
     res = repo.find_page(PageRequest.of_size(2))
@@ -79,11 +142,53 @@ def test_find_page(repo):
     assert res.total_elements == 3
 
 
+def test_find_slice(repo):
+    _insert_documents(3)
+    TestModel(value="value 1").save()
+    sort = Sort.by("value", direction=Direction.DES)
+    res = repo.find_slice(2, sort)
+    assert [r.value for r in res.content] == ["value 2", "value 1"]
+    assert res.has_next()
+    res = repo.find_slice(2, sort, after=res.next_cursor)
+    assert [r.value for r in res.content] == ["value 1", "value 0"]
+    assert not res.has_next()
+
+
+def test_find_slice_nullable_sort_key(connection):
+    repo = NullableRepo()
+    ids = [NullableModel(rank=rank).save().id for rank in [2, None, 1, None, 3, None]]
+    for direction, expected in [(Direction.ASC, [1, 3, 5, 2, 0, 4]), (Direction.DES, [4, 0, 2, 1, 3, 5])]:
+        sort = Sort.by("rank", direction=direction)
+        res = repo.find_slice(2, sort)
+        found = [r.id for r in res.content]
+        while res.has_next():
+            res = repo.find_slice(2, sort, after=res.next_cursor)
+            found += [r.id for r in res.content]
+        assert found == [ids[i] for i in expected]
+
+
 def test_find_all_by_id(repo):
     ids = _insert_documents(3)
     assert len(repo.find_all_by_id(ids[0:2])) == 2
 
 
+def test_find_all_by_id_keeps_order(repo):
+    ids = _insert_documents(3)
+    res = repo.find_all_by_id([ids[2], ObjectId(), ids[0]])
+    assert res[0].value == "value 2"
+    assert res[1] is None
+    assert res[2].value == "value 0"
+
+
+def test_find_all_by_id_chunks(connection):
+    ids = _insert_documents(5)
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        repo = TestRepo(chunk_size=2, executor=executor)
+        res = repo.find_all_by_id(list(reversed(ids)))
+        assert repo.exists_all_by_id(ids) == {id: True for id in ids}
+    assert [r.value for r in res] == ["value 4", "value 3", "value 2", "value 1", "value 0"]
+
+
 def test_find_by_id(repo):
     ids = _insert_documents(3)
     assert repo.find_by_id(ids[0]).value == "value 0"
@@ -0,0 +1,87 @@
+import random
+
+import pytest
+
+from easyrepo.repository.persistent import PersistentMap, PersistentSortedList
+
+
+def test_map_operations():
+    rng = random.Random(0)
+    expected = {}
+    versions = []
+    result = PersistentMap()
+    for _ in range(3000):
+        key = rng.randrange(1000)
+        if key in expected and rng.random() < 0.4:
+            result = result.delete(key)
+            del expected[key]
+        else:
+            result = result.set(key, key * 2)
+            expected[key] = key * 2
+        versions.append((result, dict(expected)))
+    for version, entries in versions[::100]:
+        assert dict(version.items()) == entries
+        assert len(version) == len(entries)
+        assert sorted(version.values()) == sorted(entries.values())
+    assert all(result[k] == v for k, v in expected.items())
+    assert result.get(1000) is None
+    assert 1000 not in result
+
+
+def test_map_shares_entries():
+    original = PersistentMap({i: str(i) for i in range(100)})
+    updated = original.set(5, "five").delete(6)
+    assert original[5] == "5" and original[6] == "6"
+    assert updated[5] == "five" and 6 not in updated
+    assert len(original) == 100 and len(updated) == 99
+    with pytest.raises(KeyError):
+        updated.delete(6)
+
+
+def test_map_hash_collisions():
+    class Key:
+        def __init__(self, value):
+            self.value = value
+
+        def __hash__(self):
+            return 1
+
+        def __eq__(self, other):
+            return self.value == other.value
+
+    result = PersistentMap()
+    for i in range(50):
+        result = result.set(Key(i), i)
+    assert [result[Key(i)] for i in range(50)] == list(range(50))
+    assert len(result.delete(Key(3))) == 49
+
+
+def test_sorted_list_operations():
+    rng = random.Random(0)
+    expected = []
+    result = PersistentSortedList()
+    for _ in range(2000):
+        value = rng.randrange(500)
+        if value in expected and rng.random() < 0.4:
+            result = result.remove(value)
+            expected.remove(value)
+        else:
+            result = result.add(value)
+            expected.append(value)
+    expected.sort()
+    assert list(result) == expected
+    assert len(result) == len(expected)
+    assert result.range(gte=100, lt=200) == [v for v in expected if 100 <= v < 200]
+    assert result.range(gt=100, lte=200) == [v for v in expected if 100 < v <= 200]
+    assert result.range(gt=600) == []
+    assert result.range(lt=-1) == []
+    with pytest.raises(ValueError):
+        result.remove(1000)
+
+
+def test_sorted_list_shares_chunks():
+    original = PersistentSortedList(list(range(1000)))
+    updated = original.add(500).remove(10)
+    assert list(original) == list(range(1000))
+    assert updated.range(gte=9, lte=11) == [9, 11]
+    assert updated.range(gte=500, lte=500) == [500, 500]
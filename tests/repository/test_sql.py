@@ -1,11 +1,15 @@
+from unittest import mock
+
 import pytest
-from sqlalchemy import Column, Integer, String, create_engine
+from sqlalchemy import Column, Integer, String, create_engine, event
 from sqlalchemy.orm import Session
 
-from easyrepo.model.paging import PageRequest
+from easyrepo.model.criteria import Eq, Exists, In, Range
+from easyrepo.model.identity import SequenceIdGenerator
+from easyrepo.model.paging import PageRequest, TotalCount
 from easyrepo.model.sorting import Sort, Direction
 from easyrepo.model.sql import Entity
-from easyrepo.repository.sql import SqlRepository
+from easyrepo.repository.sql import CachedCount, SqlRepository, transaction
 
 
 class TestModel(Entity):
@@ -17,6 +21,15 @@ class TestRepo(SqlRepository[TestModel]):
     pass
 
 
+class NullableModel(Entity):
+    id = Column(Integer, primary_key=True)
+    rank: int = Column(Integer)
+
+
+class NullableRepo(SqlRepository[NullableModel]):
+    pass
+
+
 @pytest.fixture
 def session():
     engine = create_engine("sqlite:///:memory:")
@@ -54,11 +67,26 @@ def test_delete_by_id(repo):
     assert repo.count() == 2
 
 
+def test_delete_in_caller_transaction(repo, session):
+    repo.delete_by_id(1)
+    repo.delete_all_by_id([2])
+    assert repo.count() == 1
+    session.rollback()
+    assert repo.count() == 3
+    repo.delete_all()
+    session.commit()
+    assert repo.count() == 0
+
+
 def test_exists_by_id(repo):
     assert repo.exists_by_id(1)
     assert not repo.exists_by_id(4)
 
 
+def test_exists_all_by_id(repo):
+    assert repo.exists_all_by_id([1, 4, 3]) == {1: True, 4: False, 3: True}
+
+
 def test_find_all(repo):
     assert len(repo.find_all()) == 3
 
@@ -66,16 +94,121 @@ def test_find_all(repo):
     assert [r.value for r in res] == ["value 3", "value 2", "value 1"]
 
 
+def test_iter_all(repo):
+    res = repo.iter_all(Sort.by("value", direction=Direction.DES), batch_size=2)
+    assert not isinstance(res, list)
+    assert [r.value for r in res] == ["value 3", "value 2", "value 1"]
+
+
 def test_find_pag(repo):
     res = repo.find_page(PageRequest.of_size(2))
     assert len(res.content) == 2
     assert res.total_elements == 3
 
 
+def test_find_slice(repo):
+    repo.save(TestModel(value="value 2"))
+    res = repo.find_slice(3)
+    assert [r.id for r in res.content] == [1, 2, 3]
+    res = repo.find_slice(3, after=res.next_cursor)
+    assert [r.id for r in res.content] == [4] and not res.has_next()
+
+    sort = Sort.by("value", direction=Direction.DES)
+    res = repo.find_slice(2, sort)
+    assert [r.id for r in res.content] == [3, 2]
+    res = repo.find_slice(2, sort, after=res.next_cursor)
+    assert [r.id for r in res.content] == [4, 1]
+    assert not res.has_next()
+
+
+def test_find_all_criteria(repo):
+    criteria = In(key="value", values=["value 1", "value 2", "value 3"]) & ~Eq(key="value", value="value 2")
+    assert [r.id for r in repo.find_all(criteria=criteria)] == [1, 3]
+    assert repo.count(criteria) == 2
+    assert repo.count(Exists(key="value")) == 3
+    criteria = Range(key="id", gt=1, lte=2) | Eq(key="value", value="value 3")
+    assert [r.id for r in repo.find_all(criteria=criteria)] == [2, 3]
+    assert repo.count(Eq(key="value", value=None)) == 0
+
+
+def test_find_page_criteria(repo):
+    page = repo.find_page(PageRequest.of_size(1), Sort.by("id"), criteria=Range(key="id", gte=2))
+    assert [r.id for r in page.content] == [2]
+    assert page.total_elements == 2
+
+
+def test_find_page_single_statement(repo, session):
+    statements = []
+    event.listen(session.get_bind(), "before_cursor_execute", lambda *args: statements.append(args[2]))
+    page = repo.find_page(PageRequest(number=1, size=2), Sort.by("id", direction=Direction.DES), fields=["value"])
+    assert page.content == [{"id": 1, "value": "value 1"}]
+    assert page.total_elements == 3
+    assert len(statements) == 1 and "OVER ()" in statements[0]
+    assert repo.find_page(PageRequest(number=2, size=2)).total_elements == 3
+    assert repo.find_page(PageRequest.of_size(2), criteria=Eq(key="value", value="other")).total_elements == 0
+
+
+def test_find_page_estimated_total(session):
+    repo = TestRepo(session, count_estimator=CachedCount(), estimate_threshold=3)
+    assert repo.find_page(PageRequest.of_size(1)).total_elements == 3
+    session.add(TestModel(id=4, value="value 4"))
+    session.commit()
+    assert repo.find_page(PageRequest.of_size(1)).total_elements == 3
+    assert repo.find_page(PageRequest.of_size(1), criteria=Range(key="id", gte=2)).total_elements == 3
+    repo = TestRepo(session, count_estimator=lambda *args: 2, estimate_threshold=3)
+    assert repo.find_page(PageRequest.of_size(1)).total_elements == 4
+    page = repo.find_page(PageRequest(number=1, size=2), total=TotalCount.ESTIMATED)
+    assert [r.id for r in page.content] == [3, 4]
+    assert page.total_elements == 2 and page.total_estimated
+    assert not page.has_next() and page.total_pages() == 2
+
+
+def test_find_page_without_total(repo, session):
+    statements = []
+    event.listen(session.get_bind(), "before_cursor_execute", lambda *args: statements.append(args[2]))
+    page = repo.find_page(PageRequest.of_size(2), fields=["value"], total=TotalCount.NONE)
+    assert page.content == [{"id": 1, "value": "value 1"}, {"id": 2, "value": "value 2"}]
+    assert page.total_elements is None and page.has_next()
+    assert len(statements) == 1 and "OVER" not in statements[0]
+    page = repo.find_page(PageRequest(number=1, size=2), total=TotalCount.ESTIMATED)
+    assert page.total_elements == 3 and not page.total_estimated
+
+
+def test_find_all_fields(repo):
+    assert repo.find_all(Sort.by("id", direction=Direction.DES), fields=["value"])[0] == {"id": 3, "value": "value 3"}
+    assert repo.find_page(PageRequest.of_size(1), fields=["id"]).content == [{"id": 1}]
+    assert repo.find_all_by_id([2, 4], fields=["value"]) == [{"id": 2, "value": "value 2"}, None]
+    assert list(repo.iter_all(batch_size=2, fields=["value"]))[-1] == {"id": 3, "value": "value 3"}
+
+
+def test_find_slice_nullable_sort_key(session):
+    repo = NullableRepo(session)
+    repo.save_all([NullableModel(id=i, rank=rank) for i, rank in enumerate([2, None, 1, None, 3, None], 1)])
+    for direction, expected in [(Direction.ASC, [2, 4, 6, 3, 1, 5]), (Direction.DES, [5, 1, 3, 2, 4, 6])]:
+        sort = Sort.by("rank", direction=direction)
+        res = repo.find_slice(2, sort)
+        ids = [r.id for r in res.content]
+        while res.has_next():
+            res = repo.find_slice(2, sort, after=res.next_cursor)
+            ids += [r.id for r in res.content]
+        assert ids == expected
+    query = str(repo._keyset_query(Sort.by("rank"), [1, 2], "postgresql"))
+    assert "nullablemodel.rank IS NULL" in query
+
+
 def test_find_all_by_id(repo):
     assert len(repo.find_all_by_id([1, 2])) == 2
 
 
+def test_find_all_by_id_chunks(session):
+    repo = TestRepo(session, chunk_size=2)
+    statements = []
+    event.listen(session.get_bind(), "before_cursor_execute", lambda *args: statements.append(args[2]))
+    res = repo.find_all_by_id([3, 4, 1, 2])
+    assert len(statements) == 2
+    assert [r.value if r else None for r in res] == ["value 3", None, "value 1", "value 2"]
+
+
 def test_find_by_id(repo):
     assert repo.find_by_id(1).value == "value 1"
     assert repo.find_by_id(4) is None
@@ -105,3 +238,88 @@ def test_save_all(repo):
     ])
     assert len(res) == 2
     assert len(repo.find_all()) == 4
+
+
+def test_save_with_id_generator(session):
+    repo = TestRepo(session, id_generator=SequenceIdGenerator(start=10))
+    assert repo.save(TestModel(value="value 4")).id == 10
+
+    res = repo.save_all([TestModel(value="value 5"), TestModel(value="value 6")])
+    assert [r.id for r in res] == [11, 12]
+
+
+def test_save_all_bulk_insert(session):
+    repo = TestRepo(session, id_generator=SequenceIdGenerator(start=10), batch_size=50)
+    statements = []
+    event.listen(session.get_bind(), "before_cursor_execute", lambda *args: statements.append(args[2]))
+    res = repo.save_all([TestModel(value=f"value {i}") for i in range(100)])
+    assert [r.id for r in res] == list(range(10, 110))
+    assert [r.value for r in res] == [f"value {i}" for i in range(100)]
+    assert len([s for s in statements if s.startswith("INSERT")]) == 2
+    assert not [s for s in statements if s.startswith("SELECT")]
+
+    res[0].value = "value 0bis"
+    repo.save(res[0])
+    assert repo.count() == 103
+    assert repo.find_by_id(10).value == "value 0bis"
+
+
+def test_save_all_bulk_insert_returning(repo, session):
+    statements = []
+    event.listen(session.get_bind(), "before_cursor_execute", lambda *args: statements.append(args[2]))
+    res = repo.save_all([TestModel(value=f"value {i % 8}") for i in range(10)])
+    assert sorted(r.id for r in res) == list(range(4, 14))
+    assert len([s for s in statements if s.startswith("INSERT")]) == 1
+    assert not [s for s in statements if s.startswith("SELECT")]
+    assert all(repo.find_by_id(r.id).value == r.value for r in res)
+
+
+def test_save_all_matches_returned_rows(repo, session):
+    execute = session.execute
+    with mock.patch.object(session, "execute", side_effect=lambda *args: list(execute(*args))[::-1]):
+        res = repo.save_all([TestModel(value=f"value {i}") for i in range(4, 8)])
+    assert [r.id for r in res] == [4, 5, 6, 7]
+    assert all(repo.find_by_id(r.id).value == r.value for r in res)
+
+
+def test_save_all_without_refresh(repo, session):
+    statements = []
+    event.listen(session.get_bind(), "before_cursor_execute", lambda *args: statements.append(args[2]))
+    res = repo.save_all([TestModel(value="value 4"), TestModel(value="value 5")])
+    assert [r.id for r in res] == [4, 5]
+    assert [r.value for r in res] == ["value 4", "value 5"]
+    assert not [s for s in statements if s.startswith("SELECT")]
+
+
+def test_transaction_single_commit(repo, session):
+    commits = []
+    event.listen(session, "after_commit", lambda *args: commits.append(args))
+    other_repo = TestRepo(session)
+    with repo.transaction():
+        res = repo.save(TestModel(value="value 4"))
+        assert res.id == 4
+        other_repo.save_all([TestModel(value="value 5")])
+        other_repo.delete_by_id(1)
+    assert len(commits) == 1
+    assert repo.count() == 4
+
+
+def test_transaction_rollback(repo):
+    with pytest.raises(RuntimeError):
+        with repo.transaction():
+            repo.save(TestModel(value="value 4"))
+            repo.delete_all()
+            raise RuntimeError()
+    assert repo.count() == 3
+
+
+def test_transaction_nested_savepoint(repo, session):
+    with transaction(session):
+        repo.save(TestModel(value="value 4"))
+        with pytest.raises(RuntimeError):
+            with repo.transaction():
+                repo.save(TestModel(value="value 5"))
+                raise RuntimeError()
+        with repo.transaction():
+            repo.save(TestModel(value="value 6"))
+    assert sorted(r.value for r in repo.find_all()) == ["value 1", "value 2", "value 3", "value 4", "value 6"]
@@ -0,0 +1,124 @@
+import pytest
+from mongomock import MongoClient
+from sqlalchemy import Column, Integer, String, create_engine
+from sqlalchemy.orm import Session
+
+from easyrepo.model.mongo import Document
+from easyrepo.model.sql import Entity
+from easyrepo.pytest_plugin import query_recorder  # noqa: F401
+from easyrepo.repository.cache import CachingRepository
+from easyrepo.repository.memory import MemoryRepository
+from easyrepo.repository.mongo import MongoRepository
+from easyrepo.repository.sql import SqlRepository
+from easyrepo.testing import QueryRecorder, assert_max_queries
+
+pytest_plugins = "pytester"
+
+
+class RecordedModel(Entity):
+    id = Column(Integer, primary_key=True, index=True)
+    value: str = Column(String, nullable=False)
+
+
+class MongoModel(Document):
+    value: str
+
+
+class SqlRepo(SqlRepository[RecordedModel]):
+    pass
+
+
+class MongoRepo(MongoRepository[MongoModel]):
+    pass
+
+
+class DictRepo(MemoryRepository[dict]):
+    pass
+
+
+@pytest.fixture
+def sql_repo():
+    engine = create_engine("sqlite:///:memory:")
+    Entity.metadata.create_all(engine)
+    session = Session(bind=engine)
+    session.add_all([RecordedModel(id=i, value=f"value {i}") for i in range(1, 4)])
+    session.commit()
+    session.expunge_all()
+    yield SqlRepo(session)
+
+
+def test_assert_max_queries(sql_repo):
+    with assert_max_queries(1) as recorder:
+        sql_repo.find_all_by_id([1, 2, 3])
+    assert recorder.queries == 1
+    with pytest.raises(AssertionError) as e:
+        with assert_max_queries(1):
+            for id in [1, 2, 3]:
+                sql_repo.find_by_id(id)
+    assert str(e.value) == "Expected at most 1 queries, got 3:\nSqlRepo.find_by_id: 3 calls, 3 round trips"
+
+
+def test_assert_max_calls():
+    repo = DictRepo()
+    repo.save_all([{"name": "entity1"}, {"name": "entity2"}])
+    with pytest.raises(AssertionError, match=r"at most 1 times, got DictRepo.find_by_id \(2\)"):
+        with assert_max_queries(0, calls=1):
+            repo.find_by_id(1)
+            repo.find_by_id(2)
+
+
+def test_recorder_ignores_nested_calls(sql_repo):
+    cached = CachingRepository(sql_repo)
+    with QueryRecorder() as recorder:
+        cached.find_by_id(1)
+        cached.find_by_id(1)
+    assert recorder.queries == 1
+    assert recorder.counts() == {("CachingRepository", "find_by_id"): 2}
+    recorder.reset()
+    assert recorder.calls == []
+
+
+def test_recorder_counts_mongo_commands():
+    repo = MongoRepo(MongoClient().db.collection)
+    with QueryRecorder() as recorder:
+        repo.save_all([MongoModel(value="value 1"), MongoModel(value="value 2")])
+        repo.find_by_id(repo.find_all()[0].id)
+    assert [(e.operation, e.round_trips) for e in recorder.calls] == [
+        ("save_all", 1),
+        ("find_all", 1),
+        ("find_by_id", 1)
+    ]
+
+
+def test_query_recorder_fixture(sql_repo, query_recorder):
+    sql_repo.count()
+    sql_repo.find_by_id(1)
+    assert query_recorder.queries == 2
+
+
+def test_max_queries_marker(pytester):
+    pytester.makepyfile("""
+        import pytest
+        from easyrepo.repository.memory import MemoryRepository
+
+        class DictRepo(MemoryRepository[dict]):
+            pass
+
+        @pytest.fixture
+        def repo():
+            repo = DictRepo()
+            repo.save_all([{"name": "entity1"}, {"name": "entity2"}])
+            return repo
+
+        @pytest.mark.max_queries(0, calls=1)
+        def test_single_call(repo):
+            repo.find_all_by_id([1, 2])
+
+        @pytest.mark.max_queries(0, calls=1)
+        def test_call_per_entity(repo):
+            for id in [1, 2]:
+                repo.find_by_id(id)
+    """)
+    result = pytester.runpytest("-p", "easyrepo.pytest_plugin")
+    result.assert_outcomes(passed=1, failed=1)
+    result.stdout.fnmatch_lines(["*DictRepo.find_by_id (2)*"])